@@ -1,1176 +1,3418 @@
-import streamlit as st
-from datetime import datetime, timedelta
-import plotly.graph_objs as go
-import pandas as pd
-import streamlit_authenticator as stauth
-import os
-import requests
-import bcrypt
-from github import Github 
-from io import StringIO
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib import colors
-from io import BytesIO
-
-# Konstanten
-USER_DATA_FILE = "user_data.csv"
-USER_DATA_COLUMNS = ["username", "password_hash", "name", "vorname", "geschlecht", "geburtstag", "gewicht", "groesse"]
-MEASUREMENTS_DATA_FILE = "measurements_data.csv"
-MEASUREMENTS_DATA_COLUMNS = ["username", "datum", "uhrzeit", "systolic", "diastolic", "pulse", "comments"]
-MEDICATION_DATA_FILE = "medication_data.csv"
-MEDICATION_DATA_COLUMNS = ["username", "Medikament", "morgens", "mittags", "abends", "nachts"]
-FITNESS_DATA_FILE = "fitness_data.csv"
-FITNESS_DATA_COLUMNS= [ "username", "datum", "uhrzeit", "dauer", "intensitaet", "Art", "Kommentare"]
-EMERGENCY_NUMBERS_FILE = "emergency_numbers.csv"
-EMERGENCY_NUMBERS_COLUMNS = ["username", "type", "number"]
-
-#alles zu Login, Registrierung und Home Bildschirm
-
-def display_logo(in_sidebar=False):
-    base_path = os.path.dirname(__file__)  # Basispfad für relative Pfade
-    logo_path = os.path.join(base_path, "Logo.png")  # Pfad zur Logo-Datei
-    if in_sidebar:
-        # Anzeigen des Logos in der Sidebar
-        st.sidebar.image(logo_path, width=100)  # Anpassung der Breite nach Bedarf
-    else:
-        # Anzeigen des Logos im Hauptbereich
-        col1, col2, col3 = st.columns([1,2,1])
-        with col3:
-            st.image(logo_path, width=150)
-
-def init_github():
-    g = Github(st.secrets["github"]["token"])
-    repo = g.get_repo(f"{st.secrets['github']['owner']}/{st.secrets['github']['repo']}")
-    return repo
-
-def upload_csv_to_github(file_path, repo):
-    file_name = os.path.basename(file_path)
-    with open(file_path, "rb") as file:
-        content = file.read()
-    try:
-        contents = repo.get_contents(file_name)
-        repo.update_file(contents.path, "Update user data", content, contents.sha)
-        st.success('CSV updated on GitHub successfully!')
-    except:
-        repo.create_file(file_name, "Create user data file", content)
-        st.success('CSV created on GitHub successfully!')
-
-def load_user_profiles():
-    if os.path.exists(USER_DATA_FILE):
-        return pd.read_csv(USER_DATA_FILE, index_col="username")
-    return pd.DataFrame(columns=USER_DATA_COLUMNS).set_index("username")
-
-def initialize_session_state():
-    if 'page' not in st.session_state:
-        st.session_state['page'] = 'home'
-    if 'users' not in st.session_state:
-        st.session_state['users'] = load_user_profiles()
-    if 'measurements' not in st.session_state:
-        st.session_state['measurements'] = []
-    if 'current_user' not in st.session_state:
-        st.session_state['current_user'] = None
-    if 'medications' not in st.session_state:
-        st.session_state['medications'] = []
-    if 'fitness_activities' not in st.session_state:
-        st.session_state['fitness_activities'] = []
-
-initialize_session_state()
-
-def save_user_profiles_and_upload(user_profiles):
-    try:
-        # Versuche, die CSV lokal zu speichern
-        user_profiles.to_csv(USER_DATA_FILE)
-        st.success('Lokales Speichern der Benutzerdaten erfolgreich!')
-    except Exception as e:
-        st.error(f'Fehler beim lokalen Speichern der Benutzerdaten: {e}')
-        return False  # Beendet die Funktion frühzeitig, wenn das lokale Speichern fehlschlägt
-
-    try:
-        # Initialisiere GitHub-Repository
-        repo = init_github()
-        upload_csv_to_github(USER_DATA_FILE, repo)
-        return True
-    except Exception as e:
-        st.error(f'Fehler beim Hochladen der Daten auf GitHub: {e}')
-        return False
-
-def register_user(username, password, name, vorname, geschlecht, geburtstag, gewicht, groesse):
-    user_profiles = load_user_profiles()
-    if username in user_profiles.index:
-        st.error("Benutzername bereits vergeben. Bitte wählen Sie einen anderen.")
-        return False
-
-    try:
-        # Versuch, das Geburtsdatum zu validieren und zu formatieren
-        geburtstag = datetime.strptime(geburtstag, '%d-%m-%Y').strftime('%Y-%m-%d')
-    except ValueError:
-        st.error("Das Geburtsdatum muss im Format TT-MM-JJJJ eingegeben werden.")
-        return False
-
-    # Passworthash erzeugen
-    hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-    # Vorbereitung der Benutzerdetails für den neuen Benutzer
-    user_details = {
-        'password_hash': hashed_pw,
-        'name': name,
-        'vorname': vorname,
-        'geschlecht': geschlecht,
-        'geburtstag': geburtstag,
-        'gewicht': gewicht,
-        'groesse': groesse
-    }
-
-    # Hinzufügen der neuen Benutzerdaten zum DataFrame
-    user_profiles.loc[username] = user_details
-    if save_user_profiles_and_upload(user_profiles):
-        st.session_state['users'] = user_profiles  # Benutzerdaten in den Session State laden
-        st.success("Benutzer erfolgreich registriert!")
-        return True
-    else:
-        return False
-
-def verify_login(username, password):
-    user_profiles = load_user_profiles()
-    if username in user_profiles.index:
-        # Hier nehmen wir an, dass der Hash als regulärer String gelesen wird
-        stored_hash_str = user_profiles.loc[username, 'password_hash']
-        if stored_hash_str.startswith("b'") and stored_hash_str.endswith("'"):
-            # Entfernen Sie die b''-Klammern und konvertieren Sie den String in Bytes
-            stored_hash = stored_hash_str[2:-1].encode().decode('unicode_escape').encode('latin1')
-        else:
-            # Wenn der String nicht mit b'' beginnt und endet, versuchen Sie, ihn direkt zu verwenden
-            stored_hash = stored_hash_str.encode('latin1')
-        
-        # Verwenden Sie bcrypt, um das eingegebene Passwort zu überprüfen
-        if bcrypt.checkpw(password.encode('utf-8'), stored_hash):
-            st.session_state['current_user'] = username
-            return True
-    st.error("Incorrect username or password.")
-    return False
-    
-def user_interface():
-    display_logo()
-    st.title('User Registration and Login')
-    username = st.text_input("Username")
-    password = st.text_input("Password", type="password")
-
-    if st.button("Login"):
-        if verify_login(username, password):
-            st.session_state['page'] = 'home_screen'
-
-    if st.button("Register"):
-        name = st.text_input("Name")
-        vorname = st.text_input("Vorname")
-        geschlecht = st.radio("Geschlecht", ['Männlich', 'Weiblich', 'Divers'])
-        tag = st.text_input("Tag", max_chars=2)
-        monat = st.text_input("Monat", max_chars=2)
-        jahr = st.text_input("Jahr", max_chars=4)
-        # Stelle sicher, dass das Format TT-MM-JJJJ eingehalten wird
-        geburtstag = f"{tag.zfill(2)}-{monat.zfill(2)}-{jahr}"
-        gewicht = st.number_input("Gewicht (kg)", format='%f')
-        groesse = st.number_input("Größe (cm)", format='%f')
-        if tag and monat and jahr:
-            if register_user(username, password, name, vorname, geschlecht, geburtstag, gewicht, groesse):
-                st.session_state['current_user'] = username
-                st.session_state['page'] = 'home_screen'
-    
-if __name__== "_main_":
-    user_interface()
-
-def show_registration_form():
-    with st.form("registration_form"):
-        st.write("Registrieren")
-        username = st.text_input("Benutzername")
-        password = st.text_input("Passwort", type="password")
-        name = st.text_input("Name")
-        vorname = st.text_input("Vorname")
-        geschlecht = st.radio("Geschlecht", ['Männlich', 'Weiblich', 'Divers'])
-        geburtstag = st.date_input("Geburtstag", min_value=datetime(1920, 1, 1))
-        gewicht = st.number_input("Gewicht (kg)", format='%f')
-        groesse = st.number_input("Größe (cm)", format='%f')
-        submit_button = st.form_submit_button("Registrieren")
-
-        if submit_button:
-            geburtstag_str = geburtstag.strftime('%d-%m-%Y')
-            if register_user(username, password, name, vorname, geschlecht, geburtstag_str, gewicht, groesse):
-                st.success("Registrierung erfolgreich!")
-            else:
-                st.error("Registrierung fehlgeschlagen. Bitte überprüfen Sie die Eingaben.")       
-def show_login_form():
-    with st.form("login_form"):
-        st.write("Einloggen")
-        username = st.text_input("Benutzername")
-        password = st.text_input("Passwort", type="password")
-        if st.form_submit_button("Login"):
-            if verify_login(username, password):
-                st.session_state['current_user'] = username
-                st.session_state['page'] = 'home_screen'
-            else:
-                st.error("Benutzername oder Passwort ist falsch.")
-
-#Home Bildschirm
-def show_home():
-    display_logo()
-    st.title('Herzlich Willkommen bei CardioCheck')
-    st.subheader('Ihr Blutdruck Tagebuch')
-    action = st.selectbox("Aktion wählen", ["Einloggen", "Registrieren"])
-    if action == "Registrieren":
-        show_registration_form()
-    elif action == "Einloggen":
-        show_login_form()
-def logout():
-    # Setzt die session_state Variablen zurück
-    st.session_state['current_user'] = None
-    st.session_state['page'] = 'home'
-    st.info("Sie wurden erfolgreich ausgeloggt.")        
-
-def show_home_screen():
-    display_logo()
-    
-    # Holen Sie sich den Vornamen des aktuellen Benutzers
-    user_profiles = st.session_state['users']
-    current_user = st.session_state.get('current_user', 'Gast')
-    first_name = 'Gast'
-    
-    if current_user in user_profiles.index:
-        first_name = user_profiles.at[current_user, 'vorname']
-    
-    st.title(f'Willkommen, {first_name}!')
-    st.markdown("## CardioCheck Dashboard")
-    st.markdown("### Wähle mit was du heute starten möchtest:")
-    
-    # Spacer zur besseren Positionierung der Buttons
-    st.write("")
-
-    # Definiert das Layout für die Buttons
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        if st.button("👤 Profil"):
-            st.session_state['page'] = 'profile'
-        if st.button("💪 Fitness"):
-            st.session_state['page'] = 'Fitness'
-    with col2:
-        if st.button("📊 Messungen"):
-            st.session_state['page'] = 'measurements'
-        if st.button("🆘 Notfall Nr."):
-            st.session_state['page'] = 'emergency_numbers'
-    with col3:
-        if st.button("💊 Medikamenten Plan"):
-            st.session_state['page'] = 'medication-plan'
-        if st.button("ℹ️ Infos"):  
-            st.session_state['page'] = 'infos'
-
-    # Spacer zur besseren Positionierung des Logout-Buttons
-    st.write("")
-    st.write("")
-    st.write("")
-    st.write("")
-
-    # Logout-Button am unteren Ende der Seite
-    if st.button("🚪 Logout"):
-        logout()
-
-    # Anwenden von zusätzlichem CSS für Stilverbesserungen
-    st.markdown("""
-        <style>
-        .stButton>button {
-            width: 100%;
-            border-radius: 10px;
-            border: 1px solid #FF807A;
-            color: #ffffff;
-            font-size: 24px;  /* Kleinere Schriftgröße für die Buttons */
-            height: 4em;  /* Erhöht die Höhe des Buttons, um den größeren Text aufzunehmen */
-            padding: 0.25em 0.5em;
-            background-color: #FF807A;
-            transition: all 0.3s;
-            cursor: pointer;
-            line-height: 1.6;
-        }
-        .stButton>button:hover {
-            border: 1px solid #FF6859;
-            background-color: #FF6859;
-        }
-        .stButton>button::before {
-            font-size: 1.5em; /* Größere Icons */
-        }
-        </style>
-    """, unsafe_allow_html=True)
-#hier kommt der Code für Profil 
-
-def show_profile():
-    display_logo()
-    if st.button("Zurück zum Homebildschirm"):
-        back_to_home()
-        
-    st.title('Profil')
-    current_user = st.session_state.get('current_user', None)
-    if current_user:
-        user_profiles = st.session_state['users']
-        if current_user in user_profiles.index:
-            user_details = user_profiles.loc[current_user]
-
-            # Display user details except for the password
-            st.markdown("### Benutzerdetails")
-            for detail, value in user_details.items():
-                if detail != 'password_hash':  # Exclude password from display
-                    if detail == 'gewicht':
-                        st.markdown(f"*Gewicht:* {value} kg")  # Add unit kg
-                    elif detail == 'groesse':
-                        st.markdown(f"*Größe:* {value} cm")  # Add unit cm
-                    else:
-                        st.markdown(f"*{detail.title()}:* {value}")
-
-            # Allow user to update weight and height
-            st.markdown("### Aktualisieren Sie Ihr Gewicht und Größe")
-            new_gewicht = st.number_input("Gewicht (kg)", value=float(user_details['gewicht']) if user_details['gewicht'] else 0, format='%f')
-            new_groesse = st.number_input("Größe (cm)", value=float(user_details['groesse']) if user_details['groesse'] else 0, format='%f')
-            update_button = st.button("Update")
-            if update_button:
-                user_profiles.at[current_user, 'gewicht'] = new_gewicht
-                user_profiles.at[current_user, 'groesse'] = new_groesse
-                if save_user_profiles_and_upload(user_profiles):
-                    # Aktualisieren des Session-Zustands nach dem Hochladen
-                    st.session_state['users'] = user_profiles
-                    st.success("Profil erfolgreich aktualisiert!")
-                    # Rerun the current app to update the display
-                    st.experimental_rerun()
-                else:
-                    st.error("Aktualisierung fehlgeschlagen. Bitte versuchen Sie es erneut.")
-        else:
-            st.error("Benutzer nicht gefunden.")
-    else:
-        st.error("Bitte melden Sie sich an, um Ihr Profil zu sehen.")
-
-    # Display norm values
-    st.subheader('Normwerte')
-    st.markdown("Systolisch: 120 mmHg")
-    st.markdown("Diastolisch: 80 mmHg")
-    st.markdown("Puls: 60 - 80")
-    
-#Ende vom Code Profil
-
-#Hier Alles zu Messungen
-def back_to_home():
-    st.session_state['page'] = 'home_screen'
-
-def get_start_end_dates_from_week_number(year, week_number):
-    first_day_of_year = datetime(year, 1, 1)
-    start_of_week = first_day_of_year + timedelta(days=(week_number - 1) * 7)
-    start_of_week -= timedelta(days=start_of_week.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    return start_of_week.date(), end_of_week.date()
-
-def add_measurement(datum, uhrzeit, systolic, diastolic, pulse, comments):
-    current_user = st.session_state.get('current_user')
-    if 'measurements' not in st.session_state:
-        st.session_state['measurements'] = []
-
-    # Erstelle eine neue Messung
-    new_measurement = {
-        "username": current_user,  
-        "datum": datum.strftime('%Y-%m-%d'),
-        "uhrzeit": uhrzeit.strftime('%H:%M'),
-        "systolic": systolic,
-        "diastolic": diastolic,
-        "pulse": pulse,
-        "comments": comments
-    }
-
-    # Überprüfen, ob diese Messung bereits existiert
-    if new_measurement not in st.session_state['measurements']:
-        st.session_state['measurements'].append(new_measurement)
-        save_measurements_to_github()
-    else:
-        st.warning("Diese Messung wurde bereits hinzugefügt.")
-
-def save_measurements_to_github():
-    measurement_list = st.session_state.get('measurements', [])
-    measurement_df = pd.DataFrame(measurement_list)
-    measurement_df.to_csv(MEASUREMENTS_DATA_FILE, index=False)
-
-    g = Github(st.secrets["github"]["token"])
-    repo = g.get_repo(f"{st.secrets['github']['owner']}/{st.secrets['github']['repo']}")
-
-    try:
-        contents = repo.get_contents(MEASUREMENTS_DATA_FILE)
-        updated_csv = contents.decoded_content.decode("utf-8") + "\n" + measurement_df.to_csv(index=False)
-        repo.update_file(contents.path, "Update measurement data", updated_csv, contents.sha)
-        st.success('Measurement data updated on GitHub successfully!')
-    except Exception as e:
-        repo.create_file(MEASUREMENTS_DATA_FILE, "Create measurement data file", measurement_df.to_csv(index=False))
-        st.success('Measurement CSV created on GitHub successfully!')
-
-def show_measurement_options():
-    display_logo(in_sidebar=True)
-    st.sidebar.title("Messungen Optionen")
-    option = st.sidebar.radio(
-        "", ["Neue Messung hinzufügen", "Messhistorie anzeigen", "Trendanalyse"])
-    if option == "Neue Messung hinzufügen":
-        show_add_measurement_form()
-    elif option == "Messhistorie anzeigen":
-        show_measurement_history_weekly()
-    elif option == "Trendanalyse":
-        show_trend_analysis()
-def show_add_measurement_form():
-    display_logo()
-    if st.button('Zurück zum Homebildschirm'):
-        back_to_home()
-    st.title('Messungen')
-    with st.form("measurement_form"):
-        datum = st.date_input("Datum", value=datetime.today())
-        # Standard-Uhrzeit ohne Schrittweite einstellen
-        default_time = datetime.now().time()  # Aktuelle Uhrzeit als Standardwert
-        uhrzeit = st.time_input("Uhrzeit", value=default_time)
-        
-        wert_systolisch = st.number_input("Wert Systolisch (mmHg)", min_value=0)
-        wert_diastolisch = st.number_input("Wert Diastolisch (mmHg)", min_value=0)
-        puls = st.number_input("Puls (bpm)", min_value=0)
-        kommentare = st.text_area("Kommentare")
-        submit_button = st.form_submit_button("Messungen speichern")
-
-        if submit_button:
-            current_user = st.session_state.get('current_user')
-            if current_user is not None:
-                add_measurement(datum, uhrzeit, wert_systolisch, wert_diastolisch, puls, kommentare)
-                st.success("Messungen erfolgreich gespeichert!")
-            else:
-                st.error("Sie sind nicht angemeldet. Bitte melden Sie sich an, um Messungen zu speichern.")
-
-def load_measurement_data():
-    repo = init_github()
-    current_user = st.session_state.get('current_user')
-    try:
-        contents = repo.get_contents(MEASUREMENTS_DATA_FILE)
-        csv_content = contents.decoded_content.decode("utf-8")
-        data = pd.read_csv(StringIO(csv_content))
-        
-        # Filtern der Daten, um nur die des aktuellen Benutzers anzuzeigen
-        user_data = data[data['username'] == current_user]
-        
-        # Entfernen von Duplikaten
-        user_data = user_data.drop_duplicates(subset=["datum", "uhrzeit", "systolic", "diastolic", "pulse", "comments"])
-        
-        return user_data
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Messdaten: {str(e)}")
-        return pd.DataFrame()
-
-def show_measurement_history_weekly():
-    display_logo()
-    username = st.session_state.get('current_user')
-    if not username:
-        st.error("Bitte melden Sie sich an, um Ihre Messungen zu sehen.")
-        return
-
-    if st.button('Zurück zum Homebildschirm'):
-        back_to_home()
-    st.title('Messhistorie - Diese Woche')
-
-    week_number = st.number_input('Wochennummer (1-52)', min_value=1, max_value=52, value=datetime.now().isocalendar()[1])
-    year_to_view = st.number_input('Jahr', min_value=2020, max_value=datetime.now().year, value=datetime.now().year)
-
-    start_date, end_date = get_start_end_dates_from_week_number(year_to_view, week_number)
-    st.write(f"Anzeigen der Messungen für die Woche vom {start_date} bis {end_date}")
-
-    measurement_data = load_measurement_data()
-
-    if not measurement_data.empty:
-        weekly_data = measurement_data[(measurement_data['datum'] >= str(start_date)) & (measurement_data['datum'] <= str(end_date))]
-
-        # Dictionary zum Sammeln der Messungen für jeden Wochentag initialisieren
-        daily_measurements = {day: [] for day in ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']}
-
-        # Messungen nach Wochentagen gruppieren
-        for activity in weekly_data.itertuples():
-            activity_date = datetime.strptime(activity.datum, '%Y-%m-%d').date()
-            day_name = activity_date.strftime("%a")
-            daily_measurements[day_name].append(activity)
-
-        # DataFrame für die Anzeige vorbereiten
-        df_week = pd.DataFrame()
-
-        # Messungen für jeden Wochentag in den DataFrame einfügen
-        for day, measurements in daily_measurements.items():
-            day_data = pd.DataFrame([{
-                'Datum': measurement.datum,
-                'Uhrzeit': measurement.uhrzeit,
-                'Systolisch': measurement.systolic,
-                'Diastolisch': measurement.diastolic,
-                'Puls': measurement.pulse,
-                'Kommentare': measurement.comments
-            } for measurement in measurements])
-            df_week = pd.concat([df_week, day_data], ignore_index=True)
-
-        # DataFrame anzeigen
-        st.table(df_week)
-
-        # Code für den Download-Button
-        pdf_file = create_measurement_pdf(df_week)
-        st.download_button(
-            label="Download Messdaten PDF",
-            data=pdf_file,
-            file_name="messdaten.pdf",
-            mime='application/pdf'
-        )
-    else:
-        st.write("Keine Daten zum Herunterladen verfügbar.")
-
-def show_trend_analysis():
-    display_logo()
-    # Sicherstellen, dass der Nutzer angemeldet ist
-    current_user = st.session_state.get('current_user')
-    if not current_user:
-        st.error("Bitte melden Sie sich an, um die Trendanalyse zu sehen.")
-        return
-    if st.button('Zurück zum Homebildschirm'):
-        back_to_home()
-    st.title('Trendanalyse der Messwerte')
-
-    # Laden der Messdaten für den angemeldeten Nutzer
-    measurement_data = load_measurement_data()
-    user_measurements = measurement_data[measurement_data['username'] == current_user]
-
-    if user_measurements.empty:
-        st.write("Es liegen keine Messdaten zur Analyse vor.")
-        return
-
-    # Umwandeln der Datums- und Zeitangaben in Python datetime Objekte für die Analyse
-    user_measurements['datetime'] = pd.to_datetime(user_measurements['datum'] + ' ' + user_measurements['uhrzeit'])
-
-    # Datentypen der Messwerte sicherstellen
-    user_measurements['systolic'] = pd.to_numeric(user_measurements['systolic'], errors='coerce')
-    user_measurements['diastolic'] = pd.to_numeric(user_measurements['diastolic'], errors='coerce')
-
-    # Sortieren der Messungen nach Datum und Zeit
-    user_measurements.sort_values(by='datetime', ascending=True, inplace=True)
-
-    # Erstellen der Diagramme für Systolischen Druck, Diastolischen Druck und Puls
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=user_measurements['datetime'], y=user_measurements['systolic'], mode='lines+markers', name='Systolisch'))
-    fig.add_trace(go.Scatter(x=user_measurements['datetime'], y=user_measurements['diastolic'], mode='lines+markers', name='Diastolisch'))
-    fig.add_trace(go.Scatter(x=user_measurements['datetime'], y=user_measurements['pulse'], mode='lines+markers', name='Puls'))
-
-    # Hinzufügen von roten Markierungen für alarmierende Werte
-    high_risk = user_measurements[(user_measurements['systolic'] >= 180) | (user_measurements['diastolic'] >= 110)]
-    low_risk = user_measurements[(user_measurements['systolic'] <= 90) | (user_measurements['diastolic'] <= 60)]
-
-    fig.add_trace(go.Scatter(x=high_risk['datetime'], y=high_risk['systolic'], mode='markers', name='Hoher Systolischer Wert', marker=dict(color='red', size=10)))
-    fig.add_trace(go.Scatter(x=high_risk['datetime'], y=high_risk['diastolic'], mode='markers', name='Hoher Diastolischer Wert', marker=dict(color='red', size=10)))
-    fig.add_trace(go.Scatter(x=low_risk['datetime'], y=low_risk['systolic'], mode='markers', name='Niedriger Systolischer Wert', marker=dict(color='blue', size=10)))
-    fig.add_trace(go.Scatter(x=low_risk['datetime'], y=low_risk['diastolic'], mode='markers', name='Niedriger Diastolischer Wert', marker=dict(color='blue', size=10)))
-
-    # Diagramm Layout anpassen
-    fig.update_layout(title='Trendanalyse der Messwerte über die Zeit',
-                      xaxis_title='Datum und Uhrzeit',
-                      yaxis_title='Messwerte',
-                      legend_title='Messwerte',
-                      margin=dict(l=0, r=0, t=30, b=0))
-
-    # Diagramm anzeigen
-    st.plotly_chart(fig, use_container_width=True)
-
-    st.markdown("""
-    <div style='background-color: #ffcccc; padding: 10px; border-radius: 5px;'>
-    <p style='color: red;'>Bei extrem hohen Werten über 180/110mmHg oder bei extrem tiefen Werten unter 90/60mmHg handelt es sich um Extremwerte und Sie sollten sofort Ihren Arzt kontaktieren.</p>
-    </div>
-    """, unsafe_allow_html=True)
-
-def create_measurement_pdf(measurement_data):
-    pdf_buffer = BytesIO()
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    title = Paragraph("Messdaten Report", styles['Title'])
-    elements.append(title)
-
-    # Überprüfen Sie die Spaltennamen
-    data = [["Datum", "Uhrzeit", "Systolisch", "Diastolisch", "Puls", "Kommentare"]]
-    for index, row in measurement_data.iterrows():
-        data.append([
-            row['Datum'], 
-            row['Uhrzeit'], 
-            row['Systolisch'], 
-            row['Diastolisch'], 
-            row['Puls'], 
-            row['Kommentare'] or ""
-        ])
-
-    t = Table(data)
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('BOX', (0,0), (-1,-1), 2, colors.black),
-    ]))
-    elements.append(t)
-    
-    doc.build(elements)
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
-
-#hier alles zu Messungen fertig
-
-#hier kommt Medi-Plan
-
-def back_to_home():
-    st.session_state['page'] = 'home_screen'
-    
-def add_medication(username, med_name, morgens, mittags, abends, nachts):
-    if 'medications' not in st.session_state:
-        st.session_state['medications'] = []
-
-    # Erstelle ein neues Medikament
-    new_medication = {
-        "username": username,
-        "med_name": med_name,
-        "morgens": morgens,
-        "mittags": mittags,
-        "abends": abends,
-        "nachts": nachts
-    }
-
-    # Überprüfen, ob dieses Medikament bereits existiert
-    if new_medication not in st.session_state['medications']:
-        st.session_state['medications'].append(new_medication)
-        save_medications_to_github()
-    else:
-        st.warning("Dieses Medikament wurde bereits hinzugefügt.")
-
-def save_medications_to_github():
-    medication_list = st.session_state['medications']
-    medication_df = pd.DataFrame(medication_list)
-    medication_df.to_csv(MEDICATION_DATA_FILE, index=False)
-    
-    g = Github(st.secrets["github"]["token"])
-    repo = g.get_repo(f"{st.secrets['github']['owner']}/{st.secrets['github']['repo']}")
-
-    try:
-        contents = repo.get_contents(MEDICATION_DATA_FILE)
-        updated_csv = contents.decoded_content.decode("utf-8") + "\n" + medication_df.to_csv(index=False)
-        repo.update_file(contents.path, "Update medication data", updated_csv, contents.sha)
-        st.success('Medication data updated on GitHub successfully!')
-    except Exception as e:
-        repo.create_file(MEDICATION_DATA_FILE, "Create medication data file", medication_df.to_csv(index=False))
-        st.success('Medication CSV created on GitHub successfully!')
-
-def show_medication_plan():
-    display_logo()
-    display_logo(in_sidebar=True)
-    st.sidebar.title("Optionen")
-    option = st.sidebar.radio("", ["Neues Medikament hinzufügen", "Medikamentenplan anzeigen"])
-    if option == "Neues Medikament hinzufügen":
-        if st.button('Zurück zum Homebildschirm'):
-            back_to_home()
-        st.title('Medikamentenplan')
-        with st.form("medication_form"):
-            med_name = st.text_input("Medikament")
-            morgens = st.number_input("Morgens", step=1, min_value=0)
-            mittags = st.number_input("Mittags", step=1, min_value=0)
-            abends = st.number_input("Abends", step=1, min_value=0)
-            nachts = st.number_input("Nachts", step=1, min_value=0)
-            submit_button = st.form_submit_button("Medikament hinzufügen")
-        
-        if submit_button:
-            current_user = st.session_state.get('current_user')
-            if current_user is not None:
-                add_medication(current_user, med_name, morgens, mittags, abends, nachts)
-                st.success("Medikament erfolgreich hinzugefügt!")
-            else:
-                st.error("Sie sind nicht angemeldet. Bitte melden Sie sich an, um Medikamente hinzuzufügen.")
-        
-    elif option == "Medikamentenplan anzeigen":
-        if st.button('Zurück zum Homebildschirm'):
-            back_to_home()
-        show_medication_list()
-
-def load_medication_data():
-    current_user = st.session_state.get('current_user')
-    if current_user is None:
-        st.error("Sie sind nicht angemeldet. Bitte melden Sie sich an, um den Medikamentenplan anzuzeigen.")
-        return pd.DataFrame()
-
-    repo = init_github()
-    try:
-        contents = repo.get_contents(MEDICATION_DATA_FILE)
-        csv_content = contents.decoded_content.decode("utf-8")
-        data = pd.read_csv(StringIO(csv_content))
-        user_medication_data = data[data['username'] == current_user]
-        
-        # Entfernen von Duplikaten
-        user_medication_data = user_medication_data.drop_duplicates(subset=["med_name", "morgens", "mittags", "abends", "nachts"])
-        
-        return user_medication_data
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Medikamentendaten: {str(e)}")
-        return pd.DataFrame()
-
-def show_medication_list():
-    st.title('Medikamentenplan')
-    
-    medication_data = load_medication_data()
-    
-    # Display the medication plan if data is available
-    if not medication_data.empty:
-        # Create a nicely styled table
-        st.write('<style>div.Widget.row-widget.stRadio > div{flex-direction:row;}</style>', unsafe_allow_html=True)
-        st.write('<style>div.Widget.row-widget.stRadio > div > label{padding:5px;}</style>', unsafe_allow_html=True)
-        
-        st.markdown("""
-            <style>
-            .med-table {
-                font-family: Arial, sans-serif;
-                border-collapse: collapse;
-                width: 100%;
-                box-shadow: 0 0 20px rgba(0, 0, 0, 0.15);
-                border-radius: 10px;
-                overflow: hidden;
-            }
-            .med-table td, .med-table th {
-                border: 1px solid #dddddd;
-                padding: 12px;
-                text-align: left;
-            }
-            .med-table tr:nth-child(even) {
-                background-color: #f2f2f2;
-            }
-            .med-table th {
-                background-color: #4CAF50;
-                color: white;
-            }
-            </style>
-            """, unsafe_allow_html=True)
-        
-        st.table(medication_data.style.set_table_attributes('class="med-table"'))
-        
-        # Check if there's medication data to generate a PDF
-        pdf_file = create_medication_pdf(medication_data)
-        st.download_button(label="Download Medikamentenplan PDF",
-                           data=pdf_file,
-                           file_name="medication_plan.pdf",
-                           mime='application/pdf')
-    else:
-        st.write("Es sind keine Medikamentenpläne vorhanden.")
-
-def create_medication_pdf(medication_data):
-    pdf_buffer = BytesIO()
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Adding title
-    title = Paragraph("Medikamentenplan", styles['Title'])
-    elements.append(title)
-
-    # Preparing data for the table
-    data = [["Medikament", "Morgens", "Mittags", "Abends", "Nachts"]]
-    for index, row in medication_data.iterrows():
-        data.append([
-            row['med_name'], 
-            row['morgens'], 
-            row['mittags'], 
-            row['abends'], 
-            row['nachts']
-        ])
-
-    # Creating the table
-    t = Table(data)
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('BOX', (0,0), (-1,-1), 2, colors.black),
-    ]))
-    elements.append(t)
-    
-    # Building the PDF
-    doc.build(elements)
-    pdf_buffer.seek(0)
-    return pdf_buffer
-
-#hier kommt Fitness        
-def back_to_home():
-    st.session_state['page'] = 'home_screen'
-    
-def add_fitness_activity(username, datum, uhrzeit, dauer, intensitaet, art, kommentare):
-    if 'fitness_activities' not in st.session_state:
-        st.session_state['fitness_activities'] = []
-    
-    new_activity = {
-        'username': username,
-        'datum': datum.strftime('%Y-%m-%d'),
-        'uhrzeit': uhrzeit.strftime('%H:%M:%S'),
-        'dauer': dauer,
-        'intensitaet': intensitaet,
-        'art': art,
-        'kommentare': kommentare
-    }
-
-    # Überprüfen, ob diese Aktivität bereits existiert
-    if new_activity not in st.session_state['fitness_activities']:
-        st.session_state['fitness_activities'].append(new_activity)
-        save_fitness_data_to_github()
-    else:
-        st.warning("Diese Aktivität wurde bereits hinzugefügt.")
-
-def save_fitness_data_to_github():
-    fitness_list = st.session_state['fitness_activities']
-    fitness_df = pd.DataFrame(fitness_list)
-    fitness_df.to_csv(FITNESS_DATA_FILE, index=False)
-
-    repo = init_github()
-    
-    try:
-        contents = repo.get_contents(FITNESS_DATA_FILE)
-        existing_data = pd.read_csv(StringIO(contents.decoded_content.decode("utf-8")))
-        updated_data = pd.concat([existing_data, fitness_df]).drop_duplicates()
-        updated_csv = updated_data.to_csv(index=False)
-        repo.update_file(contents.path, "Update fitness data", updated_csv, contents.sha)
-        st.success('Fitnessdaten erfolgreich auf GitHub aktualisiert!')
-    except Exception as e:
-        repo.create_file(FITNESS_DATA_FILE, "Create fitness data file", fitness_df.to_csv(index=False))
-        st.success('Fitness CSV erfolgreich auf GitHub erstellt!')
-
-
-def load_fitness_data():
-    repo = init_github()
-    current_user = st.session_state.get('current_user')
-    try:
-        contents = repo.get_contents(FITNESS_DATA_FILE)
-        csv_content = contents.decoded_content.decode("utf-8")
-        data = pd.read_csv(StringIO(csv_content))
-        
-        # Filtern der Daten, um nur die des aktuellen Benutzers anzuzeigen
-        user_data = data[data['username'] == current_user]
-        
-        # Entfernen von Duplikaten
-        user_data = user_data.drop_duplicates(subset=["datum", "uhrzeit", "dauer", "intensitaet", "art", "kommentare"])
-        
-        return user_data
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Fitnessdaten: {str(e)}")
-        return pd.DataFrame()
-
-def show_fitness():
-    display_logo()
-    display_logo(in_sidebar=True)
-    username = st.session_state.get('current_user')
-
-    if not username:
-        st.error("Bitte melden Sie sich an, um Fitnessdaten zu bearbeiten.")
-        return
-
-    if st.button("Zurück zum Homebildschirm"):
-        back_to_home()
-
-    st.title('Fitness')
-
-    st.sidebar.title("Optionen")
-    fitness_options = ["Aktivität hinzufügen", "History"]
-    choice = st.sidebar.radio("", fitness_options)
-
-    if choice == "Aktivität hinzufügen": 
-        with st.form("fitness_form"):
-            datum = st.date_input("Datum", datetime.now().date())  # Hier wird date.today() verwendet
-            uhrzeit = st.time_input("Uhrzeit", datetime.now().time())
-            dauer = st.text_input("Dauer")
-            intensitaet_options = ["Niedrig", "Moderat", "Hoch", "Sehr hoch"]
-            intensitaet = st.selectbox("Intensität", intensitaet_options)
-            art = st.text_input("Art")
-            kommentare = st.text_area("Kommentare")
-            submit_button = st.form_submit_button("Speichern")
-
-            if submit_button:
-                add_fitness_activity(username, datum, uhrzeit, dauer, intensitaet, art, kommentare)
-                st.success("Fitnessaktivität gespeichert!")
-
-    elif choice == "History":
-        show_fitness_history()
-
-def get_start_end_dates_from_week_number(year, week_number):
-    """Returns the start and end dates of the given week number for the given year."""
-    first_day_of_year = datetime(year, 1, 1)
-    start_of_week = first_day_of_year + pd.Timedelta(days=(week_number - 1) * 7)
-    start_of_week -= pd.Timedelta(days=start_of_week.weekday())
-    end_of_week = start_of_week + pd.Timedelta(days=6)
-    return start_of_week.date(), end_of_week.date()
-
-def show_fitness_history():
-    username = st.session_state.get('current_user')
-    st.title('Fitness History - Diese Woche')
-
-    week_number = st.number_input('Wochennummer (1-52)', min_value=1, max_value=52, value=datetime.now().isocalendar()[1], format='%d')
-    year_to_view = st.number_input('Jahr', min_value=2020, max_value=2100, value=datetime.now().year, format='%d')
-
-    start_date, end_date = get_start_end_dates_from_week_number(year_to_view, week_number)
-    st.write(f"Anzeigen der Fitnessaktivitäten für die Woche vom {start_date} bis {end_date}")
-
-    fitness_data = load_fitness_data()
-
-    if not fitness_data.empty:
-        weekly_data = fitness_data[(fitness_data['datum'] >= str(start_date)) & (fitness_data['datum'] <= str(end_date))]
-
-        # Dictionary zum Sammeln der Aktivitäten für jeden Wochentag initialisieren
-        daily_activities = {day: [] for day in ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']}
-
-        # Aktivitäten nach Wochentagen gruppieren
-        for activity in weekly_data.itertuples():
-            activity_date = datetime.strptime(activity.datum, '%Y-%m-%d').date()
-            day_name = activity_date.strftime("%a")
-            daily_activities[day_name].append(activity)
-
-        # DataFrame für die Anzeige vorbereiten
-        df_week = pd.DataFrame()
-
-        # Aktivitäten für jeden Wochentag in den DataFrame einfügen
-        for day, activities in daily_activities.items():
-            day_data = pd.DataFrame([{
-                'Datum': activity.datum,
-                'Uhrzeit': activity.uhrzeit,
-                'Dauer': activity.dauer,
-                'Intensitaet': activity.intensitaet,
-                'Art': activity.art,
-                'Kommentare': activity.kommentare
-            } for activity in activities])
-            df_week = pd.concat([df_week, day_data], ignore_index=True)
-
-        # DataFrame anzeigen
-        st.table(df_week)
-
-        # Code für den Download-Button
-        pdf_file = create_fitness_pdf(df_week)
-        st.download_button(
-            label="Download Fitnessdaten PDF",
-            data=pdf_file,
-            file_name="fitnessdaten.pdf",
-            mime='application/pdf'
-        )
-    else:
-        st.write("Keine Daten zum Herunterladen verfügbar.")
-
-def create_fitness_pdf(fitness_data):
-    pdf_buffer = BytesIO()
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Adding title
-    title = Paragraph("Fitness Report", styles['Title'])
-    elements.append(title)
-
-    # Data for the table, adapted for fitness data
-    data = [["Datum", "Uhrzeit", "Dauer", "Intensität", "Art", "Kommentare"]]
-    for index, row in fitness_data.iterrows():
-        data.append([
-            row['Datum'], 
-            row['Uhrzeit'], 
-            row['Dauer'], 
-            row['Intensitaet'], 
-            row['Art'], 
-            row['Kommentare'] or ""
-        ])
-
-    # Create the table with the data
-    t = Table(data)
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('BOX', (0,0), (-1,-1), 2, colors.black),
-    ]))
-    elements.append(t)
-    
-    # Build the PDF
-    doc.build(elements)
-    pdf_buffer.seek(0)
-    return pdf_buffer
-    
-# Notfallnummern
-def go_to_home():
-    st.session_state['page'] = 'home_screen'
-def initialize_emergency_numbers():
-    if 'emergency_numbers' not in st.session_state:
-        st.session_state['emergency_numbers'] = []
-def add_emergency_number(username, number_type, number):
-    # Initialisiere die Notfallnummern, wenn noch nicht geschehen
-    initialize_emergency_numbers()
-    existing_entries = st.session_state['emergency_numbers']
-    updated = False
-
-    # Update des bestehenden Eintrags, wenn vorhanden
-    for entry in existing_entries:
-        if entry['username'] == username and entry['type'] == number_type:
-            entry['number'] = number
-            updated = True
-            break
-
-    # Neuer Eintrag, wenn nicht vorhanden
-    if not updated:
-        new_entry = {"username": username, "type": number_type, "number": number}
-        existing_entries.append(new_entry)
-
-    # Aktualisiere den globalen Zustand
-    st.session_state['emergency_numbers'] = existing_entries
-    save_emergency_numbers_to_github(existing_entries)
-
-def save_emergency_numbers_to_github(entries):
-    emergency_df = pd.DataFrame(entries)
-    emergency_df.to_csv(EMERGENCY_NUMBERS_FILE, index=False)
-
-    repo = init_github()
-
-    try:
-        contents = repo.get_contents(EMERGENCY_NUMBERS_FILE)
-        updated_csv = emergency_df.to_csv(index=False)
-        repo.update_file(contents.path, "Update emergency numbers data", updated_csv, contents.sha)
-        st.success('Emergency numbers data updated on GitHub successfully!')
-    except Exception as e:
-        repo.create_file(EMERGENCY_NUMBERS_FILE, "Create emergency numbers data file", emergency_df.to_csv(index=False))
-        st.success('Emergency numbers CSV created on GitHub successfully!')
-
-def load_emergency_numbers():
-    repo = init_github()
-    try:
-        contents = repo.get_contents(EMERGENCY_NUMBERS_FILE)
-        csv_content = contents.decoded_content.decode("utf-8")
-        data = pd.read_csv(StringIO(csv_content))
-        st.session_state['emergency_numbers'] = data.to_dict('records')
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Notfallnummern: {str(e)}")
-        st.session_state['emergency_numbers'] = []
-
-def init_github():
-    g = Github(st.secrets["github"]["token"])
-    repo = g.get_repo(f"{st.secrets['github']['owner']}/{st.secrets['github']['repo']}")
-    return repo
-
-
-def show_emergency_numbers():
-    display_logo()
-    if st.button("Zurück zum Homebildschirm"):
-        go_to_home()
-
-    st.title('Meine Notfallnummern')
-    current_user = st.session_state.get('current_user')
-    if not current_user:
-        st.error("Sie müssen angemeldet sein, um Ihre Notfallnummern anzuzeigen.")
-        return
-
-    load_emergency_numbers()  # Stellen Sie sicher, dass dies am Anfang steht
-
-    # Anzeigen allgemeiner Notfallnummern
-    st.write("Allgemeine Notfallnummern:")
-    st.write("- Polizei: 117")
-    st.write("- Feuerwehr: 118")
-    st.write("- Krankenwagen: 114")
-    st.write("- Rega: 1414")
-    st.write("- Toxzentrum: 143")
-
-    # Laden und Anzeigen benutzerspezifischer Notfallnummern
-    emergency_data = st.session_state.get('emergency_numbers', [])
-    current_numbers = {entry['type']: entry['number'] for entry in emergency_data if entry.get('username') == current_user}
-
-    # Anzeigen der aktuellen Notfallnummern
-    if current_numbers:
-        for number_type, number in current_numbers.items():
-            st.write(f"- {number_type}: {number}")
-    else:
-        st.write("Keine Notfallnummern gespeichert.")
-
-    # Eingabe neuer Notfallnummern
-    with st.form("emergency_numbers_form"):
-        number_types = ['Hausarzt', 'Notfallkontakt']
-        inputs = {}
-        for number_type in number_types:
-            inputs[number_type] = st.text_input(f'{number_type}', value=current_numbers.get(number_type, ''))
-        submit_button = st.form_submit_button("Speichern")
-
-        if submit_button:
-            for number_type, number in inputs.items():
-                if number and (number != current_numbers.get(number_type)):
-                    add_emergency_number(current_user, number_type, number)
-            st.experimental_rerun()  # Neu laden der Seite zur Aktualisierung der angezeigten Daten
-
-#Info- Page
-def go_to_home():
-    st.session_state['page'] = 'home_screen'
-def setup_sidebar():
-    st.sidebar.title("Optionen")  # Titel nur einmal aufrufen
-    info_options = st.sidebar.radio("Kategorie auswählen", ["Blutdruck", "Bewegung und Blutdruck"])
-    return info_options
-
-def show_info_pages():
-    display_logo()
-    display_logo(in_sidebar=True)
-    info_options = setup_sidebar()
-
-    if st.button("Zurück zum Homebildschirm"):
-        go_to_home()
-
-    st.title('Gesundheitsinformationen')
-
-    # Funktion zum Lesen des Textes aus der Datei
-    def read_text_from_file(filename):
-        base_path = os.path.dirname(__file__)  # Basispfad für relative Pfade
-        filepath = os.path.join(base_path, filename)  # Pfad zur Datei
-        encodings = ['utf-8', 'ISO-8859-1']  # Verschiedene Zeichenformate ausprobieren
-        for encoding in encodings:
-            try:
-                with open(filepath, "r", encoding=encoding) as file:
-                    return file.read()
-            except FileNotFoundError as e:
-                st.error(f"Datei nicht gefunden: {filepath}")
-                raise e
-            except UnicodeDecodeError:
-                continue
-        st.error("Fehler beim Lesen der Datei. Bitte überprüfen Sie das Zeichenformat.")
-        return ""
-
-    blutdruck_info = read_text_from_file("blutdruck_info.txt")
-    bewegung_blutdruck_info = read_text_from_file("bewegung_blutdruck_info.txt")
-
-    if info_options == "Blutdruck":
-        st.markdown("### Informationen zum Blutdruck")
-        st.markdown(blutdruck_info)
-    elif info_options == "Bewegung und Blutdruck":
-        st.markdown("### Informationen zu Bewegung und Blutdruck")
-        st.markdown(bewegung_blutdruck_info)
-
-    elif st.session_state['page'] == 'infos':
-        show_info_pages()
-
-# Infotexte fertig
-
-# Display pages based on session state
-if st.session_state['page'] == 'home':
-    show_home()
-elif st.session_state['page'] == 'home_screen':
-    show_home_screen()
-elif st.session_state['page'] == 'profile':
-    show_profile()
-elif st.session_state['page'] == 'measurements':
-    show_measurement_options()
-elif st.session_state['page'] == 'medication-plan':
-    show_medication_plan()
-elif st.session_state['page'] == 'Fitness':
-    show_fitness()
-elif st.session_state['page'] == 'emergency_numbers':
-    show_emergency_numbers()
-elif st.session_state['page'] == 'infos':
-    show_info_pages()   
+import streamlit as st
+from datetime import date, datetime, timedelta
+import pandas as pd
+import numpy as np
+import os
+from io import StringIO
+from io import BytesIO
+import sqlite3
+import threading
+import time
+import random
+import functools
+import copy
+import bisect
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from urllib.parse import quote, unquote
+import json
+import logging
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import zipfile
+import io
+import tempfile
+# plotly, reportlab, PyGithub, bcrypt und streamlit-authenticator werden erst in den Funktionen importiert,
+# die sie brauchen; die Login-Seite lädt sie nicht (siehe cardiocheck_admin.py import-report)
+
+# Konstanten
+USER_DATA_FILE = "user_data.csv"
+USER_DATA_COLUMNS = ["username", "password_hash", "name", "vorname", "geschlecht", "geburtstag", "gewicht", "groesse"]
+MEASUREMENTS_DATA_FILE = "measurements_data.csv"
+MEASUREMENTS_DATA_COLUMNS = ["username", "datum", "uhrzeit", "systolic", "diastolic", "pulse", "comments"]
+MEDICATION_DATA_FILE = "medication_data.csv"
+MEDICATION_DATA_COLUMNS = ["username", "med_name", "morgens", "mittags", "abends", "nachts"]
+FITNESS_DATA_FILE = "fitness_data.csv"
+FITNESS_DATA_COLUMNS= [ "username", "datum", "uhrzeit", "dauer", "intensitaet", "art", "kommentare"]
+EMERGENCY_NUMBERS_FILE = "emergency_numbers.csv"
+EMERGENCY_NUMBERS_COLUMNS = ["username", "type", "number"]
+LOCAL_DB_FILE = "cardiocheck.db"
+PARQUET_DIR = "cardiocheck_parquet"
+PARQUET_MAX_FILES = 20  # ab so vielen Dateien pro Benutzer wird die Partition zusammengefasst
+TREND_MAX_POINTS = 1500  # höchstens so viele Punkte pro Linie im Trenddiagramm
+PDF_CACHE_MAX_ENTRIES = 32  # fertige PDFs im Speicher, Schlüssel ist der Inhalt der Tabelle
+PDF_ROWS_PER_TABLE = 40  # grosse Tabellen werden in Blöcke dieser Grösse geteilt
+PDF_WRAP_LENGTH = 30  # längere Kommentare werden im PDF umgebrochen
+GITHUB_POOL_SIZE = 10  # Anzahl offener HTTP-Verbindungen zu GitHub pro Prozess
+CSV_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Obergrenze für geparste CSV-Dateien im Speicher
+WRITE_JOURNAL_FILE = "write_journal.db"
+WRITE_BEHIND_FLUSH_SECONDS = 10  # spätestens nach so vielen Sekunden wird committet
+WRITE_BEHIND_FLUSH_CHANGES = 50  # oder sobald so viele Änderungen warten
+GITHUB_WRITE_ATTEMPTS = 25  # so oft wird ein Schreibvorgang bei einem Konflikt (SHA veraltet) wiederholt
+GITHUB_RETRY_BASE_SECONDS = 0.2  # Pause vor der ersten Wiederholung, danach verdoppelt (mit Zufallsanteil)
+GITHUB_RETRY_MAX_SECONDS = 3
+GITHUB_STREAM_CHUNK_BYTES = 1024 * 1024  # grosse Dateien werden in Stücken dieser Grösse heruntergeladen
+CSV_CHUNK_ROWS = 50000  # und in Blöcken dieser Grösse geparst
+GITHUB_READ_RESERVE = 200  # so viele Anfragen pro Stunde bleiben für Schreibvorgänge, darunter kommen Daten aus dem Cache
+SYNC_INTERVAL_SECONDS = 30  # so oft gleicht das Backend "local-first" die lokale Datenbank mit GitHub ab
+IMPORT_CHUNK_ROWS = 5000  # Importdateien werden in Blöcken dieser Grösse gelesen
+EXPORT_BATCH_ROWS = 2000  # Exporte lesen die Daten in Blöcken dieser Grösse
+SESSION_COOKIE_NAME = "cardiocheck_session"
+SESSION_COOKIE_EXPIRY_DAYS = 30  # so lange bleibt man im Browser angemeldet
+LOGIN_MAX_CONCURRENT = max(1, (os.cpu_count() or 2) // 2)  # gleichzeitige bcrypt-Prüfungen pro Prozess
+STARTUP_BUDGET_SECONDS = 1.0  # Obergrenze für den Import dieser Datei (ohne streamlit), siehe import-report
+RERUN_TIMING_SAMPLES = 200  # so viele Laufzeiten werden pro Seite bzw. Fragment aufbewahrt
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Histogrammgrenzen in Sekunden
+METRICS_SAMPLE_RATE = 1.0  # Anteil der gemessenen Vorgänge, überschreibbar mit [metrics] sample_rate
+METRICS_EXPORT_SECONDS = 15  # so oft wird [metrics] export_file neu geschrieben
+LAZY_MODULES = ["plotly.graph_objs", "reportlab.platypus", "github", "bcrypt", "streamlit_authenticator"]  # erst bei Bedarf geladen
+
+logger = logging.getLogger("cardiocheck")
+
+# Beschreibung der Datenarten (Datei auf GitHub, Spalten und Schlüssel für die lokale Datenbank)
+ENTITIES = {
+    "measurements": {
+        "file": MEASUREMENTS_DATA_FILE,
+        "columns": MEASUREMENTS_DATA_COLUMNS,
+        "index": ["username", "datum", "uhrzeit"],
+        "primary_key": None,
+        "dedup_key": ["username", "datum", "uhrzeit", "systolic", "diastolic", "pulse"],
+        "numeric": ["systolic", "diastolic", "pulse"],
+    },
+    "medications": {
+        "file": MEDICATION_DATA_FILE,
+        "columns": MEDICATION_DATA_COLUMNS,
+        "index": ["username"],
+        "primary_key": None,
+        "dedup_key": ["username", "med_name", "morgens", "mittags", "abends", "nachts"],
+        "numeric": ["morgens", "mittags", "abends", "nachts"],
+    },
+    "fitness": {
+        "file": FITNESS_DATA_FILE,
+        "columns": FITNESS_DATA_COLUMNS,
+        "index": ["username", "datum", "uhrzeit"],
+        "primary_key": None,
+        "dedup_key": ["username", "datum", "uhrzeit", "dauer", "intensitaet", "art"],
+        "numeric": [],
+    },
+    "emergency_numbers": {
+        "file": EMERGENCY_NUMBERS_FILE,
+        "columns": EMERGENCY_NUMBERS_COLUMNS,
+        "index": ["username"],
+        "primary_key": ["username", "type"],
+        "dedup_key": None,  # Notfallnummern werden über den Primärschlüssel ersetzt
+        "numeric": [],  # Telefonnummern bleiben Text, sonst gehen führende Nullen verloren
+    },
+}
+
+NUMERIC_COLUMNS = {column for spec in ENTITIES.values() for column in spec["numeric"]}
+
+def text_dtypes(entity):
+    # Für pd.read_csv: alle Spalten ausser den Zahlenspalten als Text lesen
+    if entity not in ENTITIES:
+        return None
+    return {column: str for column in ENTITIES[entity]["columns"] if column not in ENTITIES[entity]["numeric"]}
+
+def get_setting(section, key, default=None):
+    # Liest einen Wert aus st.secrets, ohne Fehler wenn die Datei oder der Abschnitt fehlt
+    try:
+        return st.secrets[section][key]
+    except Exception:
+        return default
+
+#Laufzeiten der Seiten und Fragmente
+
+class RerunTimings:
+    """Die letzten Laufzeiten pro Seite bzw. Fragment, gemeinsam für alle Sessions des Prozesses."""
+
+    def __init__(self, samples=RERUN_TIMING_SAMPLES):
+        self.samples = samples
+        self.lock = threading.Lock()
+        self.durations = {}
+
+    def record(self, label, seconds):
+        with self.lock:
+            self.durations.setdefault(label, deque(maxlen=self.samples)).append(seconds)
+
+    def summary(self):
+        with self.lock:
+            durations = {label: np.array(values) for label, values in self.durations.items()}
+        rows = [
+            [label, len(values), round(float(np.median(values)) * 1000, 1), round(float(np.percentile(values, 95)) * 1000, 1)]
+            for label, values in sorted(durations.items())
+        ]
+        return pd.DataFrame(rows, columns=["Bereich", "Anzahl", "Median ms", "P95 ms"])
+
+@st.cache_resource
+def get_rerun_timings():
+    return RerunTimings()
+
+@contextmanager
+def measure(label):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        get_rerun_timings().record(label, elapsed)
+        logger.debug("%s: %.1f ms", label, elapsed * 1000)
+
+def timed(label):
+    # Misst jeden Aufruf, bei einem Fragment also auch die Teil-Reruns ohne den Rest der Seite
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def show_rerun_timings():
+    # Nur sichtbar mit [debug] timings = true in den Secrets
+    if get_setting("debug", "timings", False):
+        with st.sidebar.expander("Laufzeiten"):
+            st.dataframe(get_rerun_timings().summary(), hide_index=True)
+
+#Messpunkte (Spans) für GitHub-Anfragen, CSV, DataFrames, Diagramme, PDFs und Passwörter
+
+class SpanMetrics:
+    """Histogramme der Laufzeiten pro (Vorgang, Seite, Datenart), gemeinsam für alle Sessions des Prozesses."""
+
+    def __init__(self, sample_rate=METRICS_SAMPLE_RATE, buckets=METRICS_BUCKETS):
+        self.sample_rate = sample_rate
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.histograms = {}  # (Vorgang, Seite, Datenart) -> [Anzahl pro Bucket inkl. +Inf, Summe, Anzahl]
+
+    def record(self, operation, page, entity, seconds):
+        key = (operation, page, entity)
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bucket] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def quantile(self, counts, q):
+        # Wie histogram_quantile in Prometheus: linear innerhalb des Buckets, in dem das Quantil liegt
+        rank = q * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+    def summary(self):
+        rows = [
+            [operation, page, entity, count, round(total / count * 1000, 2),
+             round(self.quantile(counts, 0.5) * 1000, 2), round(self.quantile(counts, 0.95) * 1000, 2), round(total, 3)]
+            for (operation, page, entity), (counts, total, count) in self.snapshot().items()
+        ]
+        return pd.DataFrame(rows, columns=["Vorgang", "Seite", "Datenart", "Anzahl", "Mittel ms", "P50 ms", "P95 ms", "Summe s"])
+
+    def prometheus(self):
+        # Textformat für Prometheus (z.B. über den Textfile-Collector des node_exporter)
+        def label(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = [
+            "# HELP cardiocheck_span_seconds Laufzeit von GitHub-Anfragen, CSV-Parsen, DataFrame-Filtern, Diagrammen, PDFs und bcrypt",
+            "# TYPE cardiocheck_span_seconds histogram",
+        ]
+        for (operation, page, entity), (counts, total, count) in self.snapshot().items():
+            labels = f'operation="{label(operation)}",page="{label(page)}",entity="{label(entity)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f'cardiocheck_span_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"cardiocheck_span_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"cardiocheck_span_seconds_count{{{labels}}} {count}")
+        lines += [
+            "# HELP cardiocheck_span_sample_rate Anteil der gemessenen Vorgänge",
+            "# TYPE cardiocheck_span_sample_rate gauge",
+            f"cardiocheck_span_sample_rate {self.sample_rate}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        spans = [
+            {"operation": operation, "page": page, "entity": entity, "count": count, "sum_seconds": round(total, 6), "buckets": counts}
+            for (operation, page, entity), (counts, total, count) in self.snapshot().items()
+        ]
+        return json.dumps({"created": datetime.now().isoformat(timespec="seconds"), "sample_rate": self.sample_rate,
+                           "buckets": list(self.buckets), "spans": spans}, indent=2)
+
+    def export(self, path):
+        # .json als JSON, alles andere im Prometheus-Textformat; über eine temporäre Datei, damit nie halb geschriebene Dateien gelesen werden
+        text = self.to_json() if path.endswith(".json") else self.prometheus()
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, encoding="utf-8") as file:
+            file.write(text)
+        os.replace(file.name, path)
+
+    def run_export(self, path, seconds):
+        while True:
+            time.sleep(seconds)
+            try:
+                self.export(path)
+            except Exception:
+                logger.exception("Could not export metrics to %s", path)
+
+@st.cache_resource
+def get_span_metrics():
+    # st.cache_resource und keine globale Variable: "streamlit run" führt diese Datei bei jedem Rerun neu aus
+    metrics = SpanMetrics(float(get_setting("metrics", "sample_rate", METRICS_SAMPLE_RATE)))
+    export_file = get_setting("metrics", "export_file")
+    if export_file:
+        seconds = get_setting("metrics", "export_seconds", METRICS_EXPORT_SECONDS)
+        threading.Thread(target=metrics.run_export, args=(export_file, seconds), daemon=True, name="metrics-export").start()
+    return metrics
+
+def current_page():
+    # Seite der Session, in deren Durchlauf gemessen wird; Sync, Write-behind und Hilfsskripte laufen ohne Session
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return "background"
+    return st.session_state.get('page', '')
+
+@contextmanager
+def span(operation, entity=""):
+    # Misst nur den mit sample_rate gezogenen Anteil; bei 0 kostet ein Span nur den Zufallswert
+    metrics = get_span_metrics()
+    if metrics.sample_rate < 1 and random.random() >= metrics.sample_rate:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.record(operation, current_page(), entity, time.perf_counter() - started)
+
+def traced(operation, entity=""):
+    # Wie timed(), aber als Span mit Datenart
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(operation, entity):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def path_entity(path):
+    # Datenart zu einem Pfad auf GitHub, z.B. measurements_data.csv oder measurements/<user>.csv
+    top = str(path).split("/")[0]
+    for entity, spec in ENTITIES.items():
+        if top in (entity, spec["file"]):
+            return entity
+    return "users" if top == USER_DATA_FILE else ""
+
+class InstrumentedRepo:
+    """Hülle um das PyGithub-Repository: jeder API-Aufruf (get_contents, update_file, create_file, ...) ist ein Span."""
+
+    def __init__(self, repo):
+        self.repo = repo
+
+    def __getattr__(self, name):
+        attribute = getattr(self.repo, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            path = args[0] if args and isinstance(args[0], str) else kwargs.get("path", "")
+            with span(f"github.{name}", path_entity(path)):
+                return attribute(*args, **kwargs)
+        return call
+
+#Cache für CSV-Dateien von GitHub
+
+class CSVCache:
+    """LRU-Cache für geparste CSV-Dateien, geprüft über SHA und ETag der Datei auf GitHub."""
+
+    def __init__(self, max_bytes=CSV_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # Pfad -> (ContentFile, SHA, DataFrame, Grösse in Bytes)
+        self.checked = {}  # Pfad -> Zeitpunkt, zu dem der Stand zuletzt mit GitHub verglichen wurde
+        self.stale = {}  # Pfade, die ohne Vergleich aus dem Cache geliefert wurden, weil das Kontingent knapp ist
+        self.size = 0
+        self.lock = threading.Lock()
+        self.path_locks = {}
+
+    def path_lock(self, path):
+        with self.lock:
+            return self.path_locks.setdefault(path, threading.Lock())
+
+    def get(self, repo, path):
+        # Pro Datei nur eine Anfrage gleichzeitig, damit das ContentFile nicht parallel aktualisiert wird
+        requested = time.time()
+        with self.path_lock(path):
+            with self.lock:
+                entry = self.entries.get(path)
+                checked = self.checked.get(path, 0)
+            if entry is None:
+                content_file = repo.get_contents(path)
+            else:
+                content_file = entry[0]
+                budget = get_github_budget()
+                # Hat eine andere Session die Datei verglichen, während diese hier gewartet hat, gilt deren
+                # Ergebnis (single-flight). Ist das Kontingent knapp, bleibt es für Schreibvorgänge.
+                if checked >= requested:
+                    changed = False
+                elif not budget.reads_allowed():
+                    with self.lock:
+                        self.stale.setdefault(path, checked)
+                    changed = False
+                else:
+                    from github import UnknownObjectException
+
+                    # Bedingte Anfrage mit If-None-Match; ein 304 zählt nicht gegen das Rate-Limit
+                    try:
+                        with span("github.update", path_entity(path)):
+                            changed = content_file.update()
+                    except UnknownObjectException:
+                        # Datei inzwischen gelöscht: nicht mehr aus dem Cache liefern
+                        self.invalidate(path)
+                        raise
+                    finally:
+                        budget.update(getattr(content_file, "requester", None))
+                    with self.lock:
+                        self.checked[path] = time.time()
+                        self.stale.pop(path, None)
+                if not changed or content_file.sha == entry[1]:
+                    with self.lock:
+                        if path in self.entries:
+                            self.entries.move_to_end(path)
+                    return entry[2]
+            with span("csv.parse", path_entity(path)):
+                data = read_csv_file(repo, content_file)
+            self.put(path, content_file, data)
+            return data
+
+    def put(self, path, content_file, data):
+        nbytes = int(data.memory_usage(deep=True).sum())
+        with self.lock:
+            self.remove(path)
+            self.entries[path] = (content_file, content_file.sha, data, nbytes)
+            self.checked[path] = time.time()
+            self.stale.pop(path, None)
+            self.size += nbytes
+            # Älteste Einträge verdrängen, bis die Obergrenze wieder eingehalten ist
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                oldest = next(iter(self.entries))
+                self.remove(oldest)
+
+    def remove(self, path):
+        entry = self.entries.pop(path, None)
+        self.checked.pop(path, None)
+        self.stale.pop(path, None)
+        if entry is not None:
+            self.size -= entry[3]
+
+    def invalidate(self, path):
+        with self.lock:
+            self.remove(path)
+
+    def stale_since(self):
+        # Ältester Stand, der gerade ungeprüft angezeigt wird, oder None
+        with self.lock:
+            return min(self.stale.values()) if self.stale else None
+
+@st.cache_resource
+def get_csv_cache():
+    return CSVCache()
+
+#Dateiaufteilung auf GitHub: eine Datei pro Datenart ("single") oder pro Benutzer ("sharded")
+
+def shard_file_path(entity, username):
+    # z.B. measurements/<user>.csv; der Name wird für den Pfad maskiert
+    return f"{entity}/{quote(str(username), safe='')}.csv"
+
+def data_file_path(entity, username):
+    if get_setting("storage", "layout", "single") == "sharded":
+        return shard_file_path(entity, username)
+    return ENTITIES[entity]["file"]
+
+def split_by_file(entity, data):
+    # Liefert (Pfad, Zeilen) pro Zieldatei, damit jede Datei nur einmal geschrieben wird
+    if data.empty:
+        return []
+    if get_setting("storage", "layout", "single") != "sharded":
+        return [(ENTITIES[entity]["file"], data)]
+    return [(data_file_path(entity, username), rows) for username, rows in data.groupby('username', sort=False)]
+
+#Speicher-Backends: alle Lade- und Speicherfunktionen laufen über get_storage()
+
+class GitHubCSVStorage:
+    """Bisheriger Weg: eine CSV-Datei pro Datenart im GitHub-Repository."""
+
+    name = "github"
+
+    def load(self, entity, username, start=None, end=None):
+        # Noch nicht committete Änderungen aus dem Journal gleich mit anzeigen. Das Journal wird vor der
+        # Datei gelesen: läuft dazwischen ein Commit, erscheinen Zeilen doppelt statt gar nicht.
+        from github import UnknownObjectException
+
+        pending = get_write_queue().pending(entity, username) if get_setting("storage", "write_behind", False) else []
+        try:
+            data = get_csv_cache().get(init_github(), data_file_path(entity, username))
+        except UnknownObjectException:
+            # Datei gibt es noch nicht (neues Repository, Benutzer ohne eigene Datei): keine Daten statt Fehler
+            data = pd.DataFrame(columns=ENTITIES[entity]["columns"])
+        with span("dataframe.filter", entity):
+            data = data[data['username'] == username]
+            if pending:
+                data = pd.concat([data, pd.DataFrame(pending)], ignore_index=True)
+                if ENTITIES[entity]["primary_key"]:
+                    data = data.drop_duplicates(subset=ENTITIES[entity]["primary_key"], keep='last')
+            if start is not None and 'datum' in data.columns:
+                data = data[data['datum'] >= str(start)]
+            if end is not None and 'datum' in data.columns:
+                data = data[data['datum'] <= str(end)]
+        return data
+
+    def iter_batches(self, entity, username, batch_size=EXPORT_BATCH_ROWS):
+        # Die CSV-Datei liegt ohnehin ganz geparst im Cache; die Blöcke sind nur Ausschnitte davon, am
+        # Speicherbedarf ändert das Blockweise hier nichts
+        data = self.load(entity, username)
+        for start in range(0, len(data), batch_size):
+            yield data.iloc[start:start + batch_size].to_dict('records')
+
+    def deduplicate(self, entity):
+        # Einmalige Bereinigung alter Duplikate; danach verhindert der Dedup-Index neue
+        from github import UnknownObjectException
+
+        if not ENTITIES[entity]["dedup_key"]:
+            return 0
+        repo = init_github()
+        if get_setting("storage", "layout", "single") == "sharded":
+            try:
+                files = [item for item in repo.get_contents(entity) if item.path.endswith(".csv")]
+            except UnknownObjectException:
+                files = []
+        else:
+            try:
+                files = [repo.get_contents(ENTITIES[entity]["file"])]
+            except UnknownObjectException:
+                files = []
+        removed = 0
+        for contents in files:
+            data = read_csv_file(repo, contents)
+            duplicated = pd.Series(record_keys(entity, data)).duplicated().to_numpy()
+            if duplicated.any():
+                repo.update_file(contents.path, f"Remove duplicate {entity}", data[~duplicated].to_csv(index=False), contents.sha)
+                get_csv_cache().invalidate(contents.path)
+                removed += int(duplicated.sum())
+        return removed
+
+    def save(self, entity, records):
+        if get_setting("storage", "write_behind", False):
+            get_write_queue().enqueue(entity, records)
+            return
+        # Die bestehenden Upload-Funktionen arbeiten mit den Listen im Session State
+        if entity == "measurements":
+            save_measurements_to_github()
+        elif entity == "medications":
+            save_medications_to_github(records)
+        elif entity == "fitness":
+            save_fitness_data_to_github(records)
+        elif entity == "emergency_numbers":
+            save_emergency_numbers_to_github(records)
+
+class SQLiteStorage:
+    """Lokale SQLite-Datenbank mit Index auf (username, datum, uhrzeit)."""
+
+    name = "sqlite"
+
+    def __init__(self, path=LOCAL_DB_FILE):
+        self.path = path
+        # Streamlit führt jede Session in einem eigenen Thread aus, daher eine Verbindung mit Lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.create_tables()
+
+    def create_tables(self):
+        with self.lock, self.conn:
+            for entity, spec in ENTITIES.items():
+                columns = ", ".join(f'"{column}"' for column in spec["columns"])
+                if spec["primary_key"]:
+                    columns += ", PRIMARY KEY (" + ", ".join(spec["primary_key"]) + ")"
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {entity} ({columns})")
+                index_columns = ", ".join(spec["index"])
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{entity}_{'_'.join(spec['index'])} ON {entity} ({index_columns})")
+
+    def load(self, entity, username, start=None, end=None):
+        query = f"SELECT * FROM {entity} WHERE username = ?"
+        params = [username]
+        # Datumsbereich als Range-Abfrage über den Index
+        if start is not None and "datum" in ENTITIES[entity]["columns"]:
+            query += " AND datum >= ?"
+            params.append(str(start))
+        if end is not None and "datum" in ENTITIES[entity]["columns"]:
+            query += " AND datum <= ?"
+            params.append(str(end))
+        if "datum" in ENTITIES[entity]["columns"]:
+            query += " ORDER BY datum, uhrzeit"
+        with self.lock:
+            return pd.read_sql_query(query, self.conn, params=params)
+
+    def iter_batches(self, entity, username, batch_size=EXPORT_BATCH_ROWS):
+        # Seitenweise über rowid (Keyset), damit die Verbindung zwischen den Blöcken nicht gesperrt bleibt
+        columns = ENTITIES[entity]["columns"]
+        column_names = ", ".join(f'"{column}"' for column in columns)
+        last = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT rowid, {column_names} FROM {entity} WHERE username = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (username, last, batch_size)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [dict(zip(columns, row[1:])) for row in rows]
+
+    def deduplicate(self, entity):
+        if not ENTITIES[entity]["dedup_key"]:
+            return 0
+        with self.lock:
+            data = pd.read_sql_query(f"SELECT rowid AS row_id, * FROM {entity}", self.conn)
+        duplicated = pd.Series(record_keys(entity, data)).duplicated().to_numpy()
+        with self.lock, self.conn:
+            self.conn.executemany(f"DELETE FROM {entity} WHERE rowid = ?", [(int(row_id),) for row_id in data.loc[duplicated, 'row_id']])
+        return int(duplicated.sum())
+
+    def insert_statement(self, entity):
+        columns = ENTITIES[entity]["columns"]
+        placeholders = ", ".join("?" for _ in columns)
+        column_names = ", ".join(f'"{column}"' for column in columns)
+        verb = "INSERT OR REPLACE" if ENTITIES[entity]["primary_key"] else "INSERT"
+        return f"{verb} INTO {entity} ({column_names}) VALUES ({placeholders})"
+
+    def rows(self, entity, records):
+        # Fehlende Werte (auch NaN aus einer CSV-Datei) als NULL
+        return [tuple(None if pd.isna(value) else value for value in (record.get(column) for column in ENTITIES[entity]["columns"])) for record in records]
+
+    def save(self, entity, records):
+        with self.lock, self.conn:
+            self.conn.executemany(self.insert_statement(entity), self.rows(entity, records))
+
+# Spaltenformat für Messungen und Fitness: Datentypen und Uhrzeitformat der App
+PARQUET_ENTITIES = {
+    "measurements": {
+        "time_format": "%H:%M",
+        "dtypes": {"systolic": "int16", "diastolic": "int16", "pulse": "int16", "comments": "string"},
+    },
+    "fitness": {
+        "time_format": "%H:%M:%S",
+        "dtypes": {"dauer": "string", "intensitaet": "category", "art": "string", "kommentare": "string"},
+    },
+}
+
+class ParquetStorage(SQLiteStorage):
+    """Messungen und Fitness als typisierte Parquet-Dateien, nach Benutzer partitioniert; der Rest in SQLite."""
+
+    name = "parquet"
+
+    def __init__(self, path=LOCAL_DB_FILE, parquet_dir=PARQUET_DIR):
+        super().__init__(path)
+        self.parquet_dir = parquet_dir
+        self.parquet_lock = threading.Lock()
+
+    def dataset_dir(self, entity):
+        return os.path.join(self.parquet_dir, entity)
+
+    def to_frame(self, entity, records):
+        # Datum und Uhrzeit werden zu einer Zeitstempel-Spalte, Messwerte zu int16
+        spec = PARQUET_ENTITIES[entity]
+        frame = pd.DataFrame(records, columns=ENTITIES[entity]["columns"])
+        frame['timestamp'] = pd.to_datetime(frame['datum'] + ' ' + frame['uhrzeit'], format=f"%Y-%m-%d {spec['time_format']}")
+        frame = frame.drop(columns=['datum', 'uhrzeit']).astype(spec['dtypes'])
+        return frame.sort_values('timestamp')
+
+    def load(self, entity, username, start=None, end=None, columns=None):
+        if entity not in PARQUET_ENTITIES:
+            return super().load(entity, username, start, end)
+        import pyarrow.dataset as ds
+
+        root = self.dataset_dir(entity)
+        if not os.path.isdir(root):
+            return pd.DataFrame(columns=ENTITIES[entity]["columns"] + ['datetime'])
+        # username ist die Partition (Dictionary -> Kategorie), das Datum filtert über die Row-Group-Statistik
+        partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+        dataset = ds.dataset(root, format="parquet", partitioning=partitioning)
+        condition = ds.field('username') == username
+        if start is not None:
+            condition &= ds.field('timestamp') >= pd.Timestamp(start)
+        if end is not None:
+            condition &= ds.field('timestamp') < pd.Timestamp(end) + timedelta(days=1)
+        if columns is not None:
+            columns = [column for column in columns if column not in ('datum', 'uhrzeit')] + ['timestamp']
+        with self.parquet_lock:
+            data = dataset.to_table(columns=columns, filter=condition).to_pandas()
+        data = data.sort_values('timestamp', ignore_index=True)
+        # Die Anzeige arbeitet weiterhin mit den Textspalten datum und uhrzeit
+        data['datum'] = data['timestamp'].dt.strftime('%Y-%m-%d')
+        data['uhrzeit'] = data['timestamp'].dt.strftime(PARQUET_ENTITIES[entity]['time_format'])
+        data = data.rename(columns={'timestamp': 'datetime'})
+        ordered = [column for column in ENTITIES[entity]["columns"] + ['datetime'] if column in data.columns]
+        return data[ordered]
+
+    def iter_batches(self, entity, username, batch_size=EXPORT_BATCH_ROWS):
+        if entity not in PARQUET_ENTITIES:
+            yield from super().iter_batches(entity, username, batch_size)
+            return
+        import pyarrow.dataset as ds
+
+        root = self.dataset_dir(entity)
+        if not os.path.isdir(root):
+            return
+        partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+        # Die Sperre bleibt während des Lesens bestehen, damit das Zusammenfassen keine Dateien entfernt
+        with self.parquet_lock:
+            dataset = ds.dataset(root, format="parquet", partitioning=partitioning)
+            for batch in dataset.to_batches(filter=ds.field('username') == username, batch_size=batch_size):
+                if batch.num_rows == 0:
+                    continue
+                data = batch.to_pandas()
+                data['datum'] = data['timestamp'].dt.strftime('%Y-%m-%d')
+                data['uhrzeit'] = data['timestamp'].dt.strftime(PARQUET_ENTITIES[entity]['time_format'])
+                data['username'] = data['username'].astype(str)
+                yield data[ENTITIES[entity]["columns"]].astype(object).where(data[ENTITIES[entity]["columns"]].notna(), None).to_dict('records')
+
+    def save(self, entity, records):
+        if entity not in PARQUET_ENTITIES:
+            return super().save(entity, records)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(self.to_frame(entity, records), preserve_index=False)
+        with self.parquet_lock:
+            pq.write_to_dataset(table, self.dataset_dir(entity), partition_cols=['username'],
+                                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet")
+            for username in {record['username'] for record in records}:
+                self.compact(entity, username)
+
+    def deduplicate(self, entity):
+        if entity not in PARQUET_ENTITIES:
+            return super().deduplicate(entity)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        root = self.dataset_dir(entity)
+        if not os.path.isdir(root):
+            return 0
+        removed = 0
+        with self.parquet_lock:
+            for name in os.listdir(root):
+                partition = os.path.join(root, name)
+                files = [os.path.join(partition, file) for file in os.listdir(partition) if file.endswith(".parquet")]
+                if not files:
+                    continue
+                # Die Dateien einer Partition enthalten den Benutzer nicht als Spalte, er steht im Verzeichnisnamen
+                table = pq.read_table(files)
+                data = table.to_pandas()
+                data['username'] = unquote(name.split("=", 1)[1])
+                data['datum'] = data['timestamp'].dt.strftime('%Y-%m-%d')
+                data['uhrzeit'] = data['timestamp'].dt.strftime(PARQUET_ENTITIES[entity]['time_format'])
+                keep = ~pd.Series(record_keys(entity, data)).duplicated().to_numpy()
+                if keep.all():
+                    continue
+                pq.write_table(table.filter(pa.array(keep)).sort_by('timestamp'), os.path.join(partition, f"part-{uuid.uuid4().hex}-0.parquet"))
+                for file in files:
+                    os.remove(file)
+                removed += int((~keep).sum())
+        return removed
+
+    def compact(self, entity, username):
+        # Viele kleine Dateien (eine pro Speichern) zu einer sortierten Datei zusammenfassen
+        import pyarrow.parquet as pq
+
+        partition = os.path.join(self.dataset_dir(entity), f"username={quote(str(username), safe='')}")
+        if not os.path.isdir(partition):
+            return
+        files = [os.path.join(partition, name) for name in os.listdir(partition) if name.endswith(".parquet")]
+        if len(files) <= PARQUET_MAX_FILES:
+            return
+        table = pq.read_table(files).sort_by('timestamp')
+        pq.write_table(table, os.path.join(partition, f"part-{uuid.uuid4().hex}-0.parquet"))
+        for file in files:
+            os.remove(file)
+
+# Abgleich lokal <-> GitHub: Datensätze werden über ihren Schlüssel verglichen (Notfallnummern über
+# Benutzer und Typ, alles andere über die Spalten der Duplikaterkennung), Werte in kanonischer Form
+
+def sync_key(entity, record):
+    columns = ENTITIES[entity]["primary_key"] or ENTITIES[entity]["dedup_key"]
+    return tuple(canonical_value(column, record.get(column)) for column in columns)
+
+def sync_value(entity, record):
+    if record is None:
+        return None
+    return tuple(canonical_value(column, record.get(column)) for column in ENTITIES[entity]["columns"])
+
+def merge_records(entity, base, local, remote):
+    # Dreiweg-Abgleich pro Schlüssel gegen den Stand der letzten Synchronisierung (base):
+    # was nur eine Seite geändert, ergänzt oder gelöscht hat, wird übernommen; haben beide Seiten
+    # denselben Datensatz unterschiedlich geändert, gewinnt die lokale Änderung
+    base, local, remote = ({sync_key(entity, record): record for record in records} for records in (base, local, remote))
+    merged, conflicts = [], 0
+    for key in list(remote) + [key for key in local if key not in remote]:
+        base_value, local_value, remote_value = (sync_value(entity, side.get(key)) for side in (base, local, remote))
+        if local_value == remote_value or remote_value == base_value:
+            chosen = local.get(key)
+        elif local_value == base_value:
+            chosen = remote.get(key)
+        else:
+            chosen = local.get(key)
+            conflicts += 1
+        if chosen is not None:
+            merged.append(chosen)
+    return merged, conflicts
+
+def csv_records(entity, text):
+    # Als Text lesen (z.B. "0797654321" bleibt so), nur die Zahlenspalten als Zahl
+    if not text.strip():
+        return []
+    data = pd.read_csv(StringIO(text), dtype=str, keep_default_na=False)
+    for column in ENTITIES[entity]["numeric"]:
+        if column in data.columns:
+            data[column] = pd.to_numeric(data[column], errors='coerce')
+    return [{column: None if value == "" else value for column, value in record.items()} for record in data.to_dict('records')]
+
+class LocalFirstStorage(SQLiteStorage):
+    """Lesen und Schreiben nur lokal in SQLite; ein Hintergrund-Thread gleicht die Änderungen mit GitHub ab."""
+
+    name = "local-first"
+
+    def __init__(self, path=LOCAL_DB_FILE, sync_seconds=SYNC_INTERVAL_SECONDS):
+        super().__init__(path)
+        self.sync_seconds = sync_seconds
+        self.sync_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        with self.lock, self.conn:
+            # Änderungsprotokoll: was lokal gespeichert, aber noch nicht auf GitHub ist
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sync_log (id INTEGER PRIMARY KEY AUTOINCREMENT, entity TEXT, path TEXT, record TEXT)")
+            # Stand jeder Datei bei der letzten Synchronisierung (gemeinsame Basis für den Dreiweg-Abgleich)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sync_base (path TEXT PRIMARY KEY, entity TEXT, sha TEXT, content TEXT)")
+        self.thread = threading.Thread(target=self.run, name="cardiocheck-sync", daemon=True)
+        self.thread.start()
+
+    def save(self, entity, records):
+        log_rows = [(entity, data_file_path(entity, record['username']), json.dumps(record, default=str)) for record in records]
+        with self.lock, self.conn:
+            self.conn.executemany(self.insert_statement(entity), self.rows(entity, records))
+            self.conn.executemany("INSERT INTO sync_log (entity, path, record) VALUES (?, ?, ?)", log_rows)
+
+    def pending_changes(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sync_log").fetchone()[0]
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.sync_seconds)
+            self.wakeup.clear()
+            try:
+                self.sync()
+            except Exception:
+                # GitHub nicht erreichbar oder Rate-Limit: die App arbeitet lokal weiter, nächster Versuch später
+                logger.exception("Sync with GitHub failed, will retry")
+
+    def remote_files(self, repo):
+        # Pfad -> (Datenart, SHA) aller Datendateien auf GitHub, eine Anfrage pro Verzeichnis
+        from github import UnknownObjectException
+
+        if get_setting("storage", "layout", "single") != "sharded":
+            entities = {spec["file"]: entity for entity, spec in ENTITIES.items()}
+            return {item.path: (entities[item.path], item.sha) for item in repo.get_contents("") if item.path in entities}
+        files = {}
+        for entity in ENTITIES:
+            try:
+                items = repo.get_contents(entity)
+            except UnknownObjectException:
+                continue
+            files.update({item.path: (entity, item.sha) for item in items if item.path.endswith(".csv")})
+        return files
+
+    def sync(self):
+        # Abgeglichen werden Dateien mit lokalen Änderungen und Dateien, deren SHA auf GitHub sich bewegt hat
+        with self.sync_lock:
+            repo = init_github()
+            with self.lock:
+                dirty = dict(self.conn.execute("SELECT DISTINCT path, entity FROM sync_log").fetchall())
+                bases = dict(self.conn.execute("SELECT path, sha FROM sync_base").fetchall())
+            paths = dict(dirty)
+            # Ist das Kontingent knapp, nur lokale Änderungen hochladen; Änderungen anderer holt ein späterer Abgleich
+            if get_github_budget().reads_allowed():
+                for path, (entity, sha) in self.remote_files(repo).items():
+                    if bases.get(path) != sha:
+                        paths[path] = entity
+            results = {}
+            for path, entity in paths.items():
+                try:
+                    results[path] = self.sync_file(repo, entity, path)
+                except Exception as e:
+                    # Diese Datei beim nächsten Durchlauf erneut versuchen, die anderen trotzdem abgleichen
+                    logger.exception("Sync of %s failed", path)
+                    results[path] = {"fehler": str(e)}
+            return results
+
+    def scope(self, path):
+        # Welche lokalen Zeilen zu einer Datei gehören: alle (eine Datei pro Datenart) oder die eines Benutzers
+        if get_setting("storage", "layout", "single") != "sharded":
+            return "", []
+        return " WHERE username = ?", [unquote(os.path.basename(path)[:-len(".csv")])]
+
+    def sync_file(self, repo, entity, path):
+        from github import UnknownObjectException
+
+        where, params = self.scope(path)
+        with self.lock:
+            local = pd.read_sql_query(f"SELECT * FROM {entity}{where}", self.conn, params=params).to_dict('records')
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM sync_log").fetchone()[0]
+            base_row = self.conn.execute("SELECT content FROM sync_base WHERE path = ?", (path,)).fetchone()
+        base = csv_records(entity, base_row[0]) if base_row else []
+        try:
+            contents = repo.get_contents(path)
+            remote = csv_records(entity, file_text(repo, contents))
+        except UnknownObjectException:
+            contents, remote = None, []
+        merged, conflicts = merge_records(entity, base, local, remote)
+        merged_csv = pd.DataFrame(merged, columns=ENTITIES[entity]["columns"]).to_csv(index=False)
+
+        # Zuerst GitHub: schlägt das fehl (z.B. SHA inzwischen geändert), bleibt lokal alles wie es war
+        remote_values = {sync_value(entity, record) for record in remote}
+        merged_values = {sync_value(entity, record) for record in merged}
+        sha = contents.sha if contents is not None else None
+        if merged_values != remote_values:
+            if contents is None:
+                result = repo.create_file(path, f"Sync {entity}", merged_csv)
+            else:
+                result = repo.update_file(path, f"Sync {entity}", merged_csv, contents.sha)
+            sha = result["content"].sha
+
+        # Lokal übernehmen, was von GitHub kam; inzwischen lokal Gespeichertes bleibt erhalten
+        local_values = {sync_value(entity, record) for record in local}
+        with self.lock, self.conn:
+            newer = [json.loads(row[0]) for row in self.conn.execute("SELECT record FROM sync_log WHERE path = ? AND id > ?", (path, last_id))]
+            if merged_values != local_values:
+                self.conn.execute(f"DELETE FROM {entity}{where}", params)
+                self.conn.executemany(self.insert_statement(entity), self.rows(entity, merged + newer))
+            self.conn.execute("INSERT OR REPLACE INTO sync_base VALUES (?, ?, ?, ?)", (path, entity, sha, merged_csv))
+            self.conn.execute("DELETE FROM sync_log WHERE path = ? AND id <= ?", (path, last_id))
+        changed_users = {record['username'] for record in local + merged if sync_value(entity, record) in local_values ^ merged_values}
+        if changed_users:
+            self.refresh_derived(entity, changed_users)
+        if conflicts:
+            logger.warning("Sync %s: %d conflicting records, kept the local version", path, conflicts)
+        return {"hochgeladen": len(merged_values - remote_values), "heruntergeladen": len(merged_values - local_values), "konflikte": conflicts}
+
+    def refresh_derived(self, entity, usernames):
+        # Dedup-Schlüssel und Kennzahlen der betroffenen Benutzer aus den neuen lokalen Daten ableiten
+        if ENTITIES[entity]["dedup_key"]:
+            get_dedup_index().forget(entity, usernames)
+        if entity == "measurements":
+            data = pd.concat([self.load("measurements", username) for username in usernames], ignore_index=True)
+            get_rollups().rebuild(data, usernames)
+
+@st.cache_resource
+def create_storage(backend, path, parquet_dir):
+    # Ein Backend pro Prozess, das sich alle Sessions teilen
+    if backend == "github":
+        return GitHubCSVStorage()
+    if backend == "parquet":
+        return ParquetStorage(path, parquet_dir)
+    if backend == "local-first":
+        return LocalFirstStorage(path, get_setting("storage", "sync_seconds", SYNC_INTERVAL_SECONDS))
+    return SQLiteStorage(path)
+
+def get_storage():
+    # Standard bleiben die CSV-Dateien auf GitHub; eine lokale Datenbank nur, wenn sie eingestellt ist
+    backend = get_setting("storage", "backend", "github")
+    path = get_setting("storage", "path", LOCAL_DB_FILE)
+    parquet_dir = get_setting("storage", "parquet_dir", PARQUET_DIR)
+    return create_storage(backend, path, parquet_dir)
+
+#Kennzahlen (Rollups) pro Benutzer und Tag, ISO-Woche und Monat
+
+ROLLUP_METRICS = ["systolic", "diastolic", "pulse"]
+ROLLUP_GRANULARITIES = ["day", "week", "month"]
+
+def rollup_keys(timestamps):
+    # Perioden-Schlüssel (Tag, ISO-Woche, Monat) und Tageszeit (vor 12 Uhr morgens, sonst abends)
+    iso = timestamps.dt.isocalendar()
+    periods = {
+        "day": timestamps.dt.strftime('%Y-%m-%d'),
+        "week": iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2),
+        "month": timestamps.dt.strftime('%Y-%m'),
+    }
+    slots = pd.Series(np.where(timestamps.dt.hour < 12, 'morgens', 'abends'), index=timestamps.index)
+    return periods, slots
+
+def compute_rollups(data):
+    # Aggregiert Rohdaten vektorisiert: Anzahl, Summe, Quadratsumme, Min und Max pro Periode und Tageszeit
+    timestamps = pd.to_datetime(data['datum'] + ' ' + data['uhrzeit'], format='ISO8601', errors='coerce')
+    data = data.loc[timestamps.notna()].copy()
+    timestamps = timestamps[timestamps.notna()]
+    for metric in ROLLUP_METRICS:
+        data[metric] = pd.to_numeric(data[metric], errors='coerce')
+        data[f"{metric}_sq"] = data[metric] ** 2
+    periods, slots = rollup_keys(timestamps)
+    # Anzahl pro Wert statt pro Zeile, damit sie zur Summe passt (leere Werte zählen nicht mit)
+    aggregations = {}
+    for metric in ROLLUP_METRICS:
+        aggregations[f"{metric}_count"] = (metric, "count")
+        aggregations[f"{metric}_sum"] = (metric, "sum")
+        aggregations[f"{metric}_sumsq"] = (f"{metric}_sq", "sum")
+        aggregations[f"{metric}_min"] = (metric, "min")
+        aggregations[f"{metric}_max"] = (metric, "max")
+    frames = []
+    for granularity in ROLLUP_GRANULARITIES:
+        for slot in ['alle', slots]:
+            grouped = data.assign(granularity=granularity, period=periods[granularity], slot=slot)
+            frames.append(grouped.groupby(['username', 'granularity', 'period', 'slot'], as_index=False).agg(**aggregations))
+    return pd.concat(frames, ignore_index=True)
+
+class RollupStore:
+    """Vorberechnete Kennzahlen der Messungen in SQLite, beim Speichern laufend nachgeführt."""
+
+    def __init__(self, path=LOCAL_DB_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.value_columns = [f"{metric}_{part}" for metric in ROLLUP_METRICS for part in ["count", "sum", "sumsq", "min", "max"]]
+        columns = ", ".join(f"{column} {'INTEGER' if column.endswith('_count') else 'REAL'}" for column in self.value_columns)
+        with self.lock, self.conn:
+            # Tabellen im alten Format (eine Anzahl für alle Werte) verwerfen; sie werden neu aufgebaut
+            existing = [row[1] for row in self.conn.execute("PRAGMA table_info(measurement_rollups)")]
+            if existing and existing[4:] != self.value_columns:
+                self.conn.execute("DROP TABLE measurement_rollups")
+                self.conn.execute("DROP TABLE IF EXISTS measurement_rollup_users")
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS measurement_rollups (username TEXT, granularity TEXT, period TEXT, slot TEXT, {columns}, "
+                              "PRIMARY KEY (username, granularity, period, slot))")
+            # Benutzer, deren Kennzahlen bereits aus den Daten aufgebaut wurden
+            self.conn.execute("CREATE TABLE IF NOT EXISTS measurement_rollup_users (username TEXT PRIMARY KEY)")
+
+    def built_users(self, usernames):
+        with self.lock:
+            return {username for username in usernames
+                    if self.conn.execute("SELECT 1 FROM measurement_rollup_users WHERE username = ?", (username,)).fetchone()}
+
+    def ensure(self, username):
+        # Beim ersten Zugriff pro Benutzer einmalig aus den gespeicherten Messungen aufbauen (wie die Dedup-Schlüssel)
+        if not self.built_users([username]):
+            self.rebuild(get_storage().load("measurements", username), [username])
+
+    def add(self, records):
+        # Inkrementell: neue Messungen in die bestehenden Zeilen einrechnen (Upsert). Noch nicht aufgebaute
+        # Benutzer überspringen; ihre Messungen sind bereits gespeichert und kommen beim ersten Zugriff mit
+        built = self.built_users({record['username'] for record in records})
+        records = [record for record in records if record['username'] in built]
+        if not records:
+            return
+        rollups = compute_rollups(pd.DataFrame(records, columns=MEASUREMENTS_DATA_COLUMNS))
+        updates = []
+        for column in self.value_columns:
+            # Ein leerer Wert (NULL) auf einer Seite darf Minimum und Maximum nicht löschen
+            if column.endswith("_min"):
+                updates.append(f"{column} = min(COALESCE({column}, excluded.{column}), COALESCE(excluded.{column}, {column}))")
+            elif column.endswith("_max"):
+                updates.append(f"{column} = max(COALESCE({column}, excluded.{column}), COALESCE(excluded.{column}, {column}))")
+            else:
+                updates.append(f"{column} = {column} + excluded.{column}")
+        self.write(rollups, "ON CONFLICT (username, granularity, period, slot) DO UPDATE SET " + ", ".join(updates))
+
+    def rebuild(self, data, usernames=None):
+        # Alles aus den Rohdaten neu berechnen (für alle oder nur die angegebenen Benutzer)
+        rollups = compute_rollups(data)
+        with self.lock, self.conn:
+            if usernames is None:
+                self.conn.execute("DELETE FROM measurement_rollups")
+                self.conn.execute("DELETE FROM measurement_rollup_users")
+                usernames = data['username'].unique().tolist()
+            else:
+                self.conn.executemany("DELETE FROM measurement_rollups WHERE username = ?", [(username,) for username in usernames])
+        self.write(rollups, "")
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO measurement_rollup_users VALUES (?)", [(username,) for username in usernames])
+        return len(rollups)
+
+    def clear(self):
+        # Nach dem Bereinigen der Daten: alle Kennzahlen beim nächsten Zugriff neu aufbauen
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM measurement_rollups")
+            self.conn.execute("DELETE FROM measurement_rollup_users")
+
+    def write(self, rollups, conflict_clause):
+        columns = ["username", "granularity", "period", "slot"] + self.value_columns
+        placeholders = ", ".join("?" for _ in columns)
+        rows = [tuple(row) for row in rollups[columns].astype(object).itertuples(index=False)]
+        with self.lock, self.conn:
+            self.conn.executemany(f"INSERT INTO measurement_rollups ({', '.join(columns)}) VALUES ({placeholders}) {conflict_clause}", rows)
+
+    def load(self, username, granularity, slot='alle', start_period=None, end_period=None):
+        # Liest O(Perioden) Zeilen und berechnet Mittelwert und Standardabweichung
+        self.ensure(username)
+        query = "SELECT * FROM measurement_rollups WHERE username = ? AND granularity = ? AND slot = ?"
+        params = [username, granularity, slot]
+        if start_period is not None:
+            query += " AND period >= ?"
+            params.append(start_period)
+        if end_period is not None:
+            query += " AND period <= ?"
+            params.append(end_period)
+        with self.lock:
+            data = pd.read_sql_query(query + " ORDER BY period", self.conn, params=params)
+        for metric in ROLLUP_METRICS:
+            count = data[f"{metric}_count"].astype(float)
+            data[f"{metric}_mean"] = (data[f"{metric}_sum"] / count).where(count > 0)
+            variance = (data[f"{metric}_sumsq"] - data[f"{metric}_sum"] ** 2 / count) / (count - 1)
+            data[f"{metric}_sd"] = np.sqrt(variance.clip(lower=0)).where(count > 1)
+        return data
+
+@st.cache_resource
+def create_rollup_store(path):
+    return RollupStore(path)
+
+def get_rollups():
+    return create_rollup_store(get_setting("storage", "path", LOCAL_DB_FILE))
+
+#Duplikaterkennung über kanonische Schlüssel (Benutzer, Zeitpunkt, Werte)
+
+def canonical_value(column, value):
+    # Gleicher Wert ergibt gleichen Text, egal aus welchem Backend: 120, "120" und 120.0 -> "120";
+    # Uhrzeiten auf die Minute, fehlende Werte -> "". Text wird nur in Zahlenspalten als Zahl gelesen,
+    # sonst wären "0441234567" und "441234567" gleich.
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return ""
+    number = None
+    if column in NUMERIC_COLUMNS or isinstance(value, (int, float, np.number)):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            pass
+    text = str(int(number)) if number is not None and number.is_integer() else str(value).strip()
+    return text[:5] if column == "uhrzeit" else text
+
+def record_key(entity, values):
+    # 64-Bit-Hash über die Schlüsselspalten (als int64, damit er in eine SQLite-Spalte passt)
+    text = "\x1f".join(canonical_value(column, value) for column, value in zip(ENTITIES[entity]["dedup_key"], values))
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+def record_keys(entity, data):
+    if data.empty:
+        return np.array([], dtype=np.int64)
+    rows = data[ENTITIES[entity]["dedup_key"]].itertuples(index=False, name=None)
+    return np.fromiter((record_key(entity, row) for row in rows), dtype=np.int64, count=len(data))
+
+class DedupIndex:
+    """Hash-Set der Schlüssel pro Datenart und Benutzer; im Speicher für O(1)-Prüfungen, in SQLite dauerhaft."""
+
+    def __init__(self, path=LOCAL_DB_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.sets = {}
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS record_keys (entity TEXT, username TEXT, key INTEGER, "
+                              "PRIMARY KEY (entity, username, key)) WITHOUT ROWID")
+            # Benutzer, deren Schlüssel bereits aus den Daten aufgebaut wurden
+            self.conn.execute("CREATE TABLE IF NOT EXISTS record_key_users (entity TEXT, username TEXT, PRIMARY KEY (entity, username))")
+
+    def keys(self, entity, username):
+        # Beim ersten Zugriff aus der Tabelle geladen; fehlt der Benutzer dort, einmalig aus den Daten aufgebaut
+        with self.lock:
+            keys = self.sets.get((entity, username))
+            if keys is not None:
+                return keys
+            built = self.conn.execute("SELECT 1 FROM record_key_users WHERE entity = ? AND username = ?", (entity, username)).fetchone()
+            if built:
+                keys = {row[0] for row in self.conn.execute("SELECT key FROM record_keys WHERE entity = ? AND username = ?", (entity, username))}
+        if keys is None:
+            keys = set(record_keys(entity, get_storage().load(entity, username)).tolist())
+            with self.lock, self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO record_keys VALUES (?, ?, ?)", [(entity, username, key) for key in keys])
+                self.conn.execute("INSERT OR IGNORE INTO record_key_users VALUES (?, ?)", (entity, username))
+        with self.lock:
+            return self.sets.setdefault((entity, username), keys)
+
+    def add(self, entity, records):
+        # Trägt die Schlüssel ein und gibt nur die Datensätze zurück, die noch nicht vorhanden waren
+        columns = ENTITIES[entity]["dedup_key"]
+        keys = [record_key(entity, [record.get(column) for column in columns]) for record in records]
+        new_records, rows = [], []
+        user_sets = {}
+        for record, key in zip(records, keys):
+            if record['username'] not in user_sets:
+                user_sets[record['username']] = self.keys(entity, record['username'])
+            user_keys = user_sets[record['username']]
+            with self.lock:
+                if key in user_keys:
+                    continue
+                user_keys.add(key)
+            new_records.append(record)
+            rows.append((entity, record['username'], key))
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO record_keys VALUES (?, ?, ?)", rows)
+        return new_records
+
+    def discard(self, entity, records):
+        # Schlüssel wieder austragen, wenn das Speichern dieser Datensätze fehlgeschlagen ist
+        columns = ENTITIES[entity]["dedup_key"]
+        rows = [(entity, record['username'], record_key(entity, [record.get(column) for column in columns])) for record in records]
+        with self.lock, self.conn:
+            for _, username, key in rows:
+                self.sets.get((entity, username), set()).discard(key)
+            self.conn.executemany("DELETE FROM record_keys WHERE entity = ? AND username = ? AND key = ?", rows)
+
+    def forget(self, entity, usernames):
+        # Schlüssel dieser Benutzer verwerfen (z.B. nach einer Synchronisierung); sie werden neu aufgebaut
+        with self.lock, self.conn:
+            for username in usernames:
+                self.conn.execute("DELETE FROM record_keys WHERE entity = ? AND username = ?", (entity, username))
+                self.conn.execute("DELETE FROM record_key_users WHERE entity = ? AND username = ?", (entity, username))
+                self.sets.pop((entity, username), None)
+
+    def clear(self):
+        # Nach dem Bereinigen der Daten: alles wird beim nächsten Zugriff neu aufgebaut
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM record_keys")
+            self.conn.execute("DELETE FROM record_key_users")
+            self.sets.clear()
+
+@st.cache_resource
+def create_dedup_index(path):
+    return DedupIndex(path)
+
+def get_dedup_index():
+    return create_dedup_index(get_setting("storage", "path", LOCAL_DB_FILE))
+
+# Ergebnis von save_new_records; die Formulare zeigen nur bei SAVED eine Erfolgsmeldung
+SAVED, DUPLICATE, FAILED = "saved", "duplicate", "failed"
+
+def save_new_records(entity, records, session_key):
+    # Nur noch nicht vorhandene Datensätze speichern. Schlägt das Speichern fehl, werden Schlüssel und
+    # Session-Liste zurückgenommen, damit ein neuer Versuch nicht als Duplikat abgewiesen wird.
+    # Gibt (Status, gespeicherte Datensätze) zurück: SAVED, DUPLICATE (alles schon vorhanden) oder FAILED.
+    index = get_dedup_index()
+    records = index.add(entity, records)
+    if not records:
+        return DUPLICATE, []
+    session_list = st.session_state.setdefault(session_key, [])
+    start = len(session_list)
+    session_list.extend(records)
+    try:
+        get_storage().save(entity, records)
+    except Exception as e:
+        del session_list[start:]
+        index.discard(entity, records)
+        logger.exception("Saving %s failed", entity)
+        st.error(f"Speichern fehlgeschlagen, bitte erneut versuchen: {e}")
+        return FAILED, []
+    return SAVED, records
+
+#Schreib-Warteschlange (write-behind) für das GitHub-Backend
+
+def apply_records(entity, existing_csv, records):
+    # Neue Zeilen an eine bestehende CSV anhängen; bei Notfallnummern (username, type) ersetzen
+    new_rows = pd.DataFrame(records, columns=ENTITIES[entity]["columns"])
+    key = ENTITIES[entity]["primary_key"]
+    if key:
+        new_rows = new_rows.drop_duplicates(subset=key, keep='last')
+    if not existing_csv.strip():
+        return new_rows.to_csv(index=False)
+    if key:
+        # Als Text lesen und unverändert zurückschreiben, auch die Zeilen anderer Benutzer
+        with span("csv.parse", entity):
+            existing = pd.read_csv(StringIO(existing_csv), dtype=str, keep_default_na=False)
+        replaced = existing.set_index(key).index.isin(new_rows.set_index(key).index)
+        return pd.concat([existing[~replaced], new_rows], ignore_index=True).to_csv(index=False)
+    if not existing_csv.endswith("\n"):
+        existing_csv += "\n"
+    return existing_csv + new_rows.to_csv(index=False, header=False)
+
+def commit_files_to_github(repo, changes, message):
+    # Alle geänderten Dateien in einem Commit über die Git Data API: Baum, Commit, Ref-Update.
+    # changes: Pfad -> (Datenart, Liste neuer Datensätze)
+    from github import InputGitTreeElement, UnknownObjectException
+
+    ref = repo.get_git_ref(f"heads/{repo.default_branch}")
+    base_commit = repo.get_git_commit(ref.object.sha)
+    elements = []
+    for path, (entity, records) in changes.items():
+        try:
+            existing_csv = file_text(repo, repo.get_contents(path, ref=base_commit.sha))
+        except UnknownObjectException:
+            existing_csv = ""
+        elements.append(InputGitTreeElement(path, "100644", "blob", content=apply_records(entity, existing_csv, records)))
+    tree = repo.create_git_tree(elements, base_commit.tree)
+    commit = repo.create_git_commit(message, tree, [base_commit])
+    # Schlägt fehl, wenn der Branch inzwischen weitergezogen ist; dann beim nächsten Durchlauf neu aufbauen
+    ref.edit(commit.sha)
+    return commit.sha
+
+class WriteBehindQueue:
+    """Schreibt Änderungen in ein lokales Journal und committet sie gesammelt in einem Hintergrund-Thread."""
+
+    def __init__(self, repo, cache, journal_path=WRITE_JOURNAL_FILE, flush_seconds=WRITE_BEHIND_FLUSH_SECONDS, flush_changes=WRITE_BEHIND_FLUSH_CHANGES):
+        self.repo = repo
+        self.cache = cache
+        self.flush_seconds = flush_seconds
+        self.flush_changes = flush_changes
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.conn = sqlite3.connect(journal_path, check_same_thread=False)
+        # Erst wenn der Eintrag auf der Platte ist, gilt die Änderung als gespeichert
+        self.conn.execute("PRAGMA synchronous=FULL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS journal (id INTEGER PRIMARY KEY AUTOINCREMENT, entity TEXT, path TEXT, record TEXT)")
+        self.thread = threading.Thread(target=self.run, name="cardiocheck-write-behind", daemon=True)
+        self.thread.start()
+
+    def enqueue(self, entity, records):
+        rows = [(entity, data_file_path(entity, record['username']), json.dumps(record, default=str)) for record in records]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT INTO journal (entity, path, record) VALUES (?, ?, ?)", rows)
+            waiting = self.conn.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+        if waiting >= self.flush_changes:
+            self.wakeup.set()
+
+    def pending(self, entity, username):
+        with self.lock:
+            rows = self.conn.execute("SELECT record FROM journal WHERE entity = ? ORDER BY id", (entity,)).fetchall()
+        records = [json.loads(row[0]) for row in rows]
+        return [record for record in records if record.get('username') == username]
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.flush_seconds)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Einträge bleiben im Journal und werden beim nächsten Durchlauf erneut versucht
+                logger.exception("Write-behind commit failed, will retry")
+
+    def flush(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT id, entity, path, record FROM journal ORDER BY id").fetchall()
+        if not rows:
+            return
+        changes = {}
+        for _, entity, path, record in rows:
+            changes.setdefault(path, (entity, []))[1].append(json.loads(record))
+        commit_files_to_github(self.repo, changes, f"Update {len(rows)} records in {len(changes)} files")
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM journal WHERE id = ?", [(row[0],) for row in rows])
+        for path in changes:
+            self.cache.invalidate(path)
+
+@st.cache_resource
+def create_write_queue(journal_path, flush_seconds, flush_changes):
+    return WriteBehindQueue(init_github(), get_csv_cache(), journal_path, flush_seconds, flush_changes)
+
+def get_write_queue():
+    queue = create_write_queue(
+        get_setting("storage", "journal_path", WRITE_JOURNAL_FILE),
+        get_setting("storage", "flush_seconds", WRITE_BEHIND_FLUSH_SECONDS),
+        get_setting("storage", "flush_changes", WRITE_BEHIND_FLUSH_CHANGES),
+    )
+    queue.repo = init_github()  # falls der Token gewechselt hat
+    return queue
+
+#alles zu Login, Registrierung und Home Bildschirm
+
+def display_logo(in_sidebar=False):
+    base_path = os.path.dirname(__file__)  # Basispfad für relative Pfade
+    logo_path = os.path.join(base_path, "Logo.png")  # Pfad zur Logo-Datei
+    if in_sidebar:
+        # Anzeigen des Logos in der Sidebar
+        st.sidebar.image(logo_path, width=100)  # Anpassung der Breite nach Bedarf
+    else:
+        # Anzeigen des Logos im Hauptbereich
+        col1, col2, col3 = st.columns([1,2,1])
+        with col3:
+            st.image(logo_path, width=150)
+
+@st.cache_resource(max_entries=1)
+def get_github_repo(token, owner, repo_name):
+    # Ein Client pro Prozess, den alle Sessions teilen; ändert sich der Token, wird er neu gebaut.
+    # PyGithub nutzt eine requests-Session, die Verbindungen offen hält (Keep-Alive).
+    from github import Auth, Github
+
+    g = Github(auth=Auth.Token(token), pool_size=GITHUB_POOL_SIZE)
+    return BudgetedRepo(InstrumentedRepo(g.get_repo(f"{owner}/{repo_name}")), get_github_budget())
+
+def init_github():
+    return get_github_repo(st.secrets["github"]["token"], st.secrets["github"]["owner"], st.secrets["github"]["repo"])
+
+#Kontingent der GitHub-API (Rate-Limit): gemeinsam für alle Sessions, Schreiben vor Lesen
+
+class Flight:
+    """Eine laufende Leseanfrage, auf deren Ergebnis gleichzeitige identische Anfragen warten."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class RateLimitBudget:
+    """Stand des Kontingents aus den Headern X-RateLimit-Remaining/-Limit/-Reset der letzten Antwort."""
+
+    def __init__(self, read_reserve=GITHUB_READ_RESERVE):
+        self.read_reserve = read_reserve
+        self.lock = threading.Lock()
+        self.remaining = None  # unbekannt bis zur ersten Antwort
+        self.limit = None
+        self.reset = 0
+        self.flights = {}
+
+    def update(self, requester):
+        # PyGithub merkt sich die Header der letzten Antwort im Requester (-1 vor der ersten Antwort)
+        if requester is None:
+            return
+        remaining, limit = requester.rate_limiting
+        self.record(remaining, limit, requester.rate_limiting_resettime)
+
+    def record(self, remaining, limit, reset):
+        if remaining < 0:
+            return
+        with self.lock:
+            self.remaining, self.limit, self.reset = remaining, limit, reset
+
+    def reads_allowed(self):
+        # Unter der Reserve wird nur noch geschrieben, bis GitHub das Kontingent zurücksetzt
+        with self.lock:
+            return self.remaining is None or self.remaining > self.read_reserve or time.time() >= self.reset
+
+    def single_flight(self, key, function):
+        # Gleichzeitige identische Anfragen aller Sessions teilen sich eine Anfrage an GitHub
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            # Eigene Kopie: der CSV-Cache aktualisiert sein ContentFile mit update(), die SHA eines anderen
+            # Aufrufers (compare-and-swap) darf sich dabei nicht mitändern
+            return copy.copy(flight.result)
+        try:
+            flight.result = function()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            self.land(key, flight)
+        return flight.result
+
+    def land(self, key, flight):
+        with self.lock:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+        flight.done.set()
+
+    def forget(self, path):
+        # Nach einem Schreibvorgang: wer danach liest, darf nicht auf eine ältere, noch laufende Anfrage warten
+        with self.lock:
+            for key in [key for key in self.flights if key[0] == path]:
+                del self.flights[key]
+
+    def status(self):
+        with self.lock:
+            return {"remaining": self.remaining, "limit": self.limit, "reset": self.reset}
+
+@st.cache_resource
+def get_github_budget():
+    return RateLimitBudget(get_setting("github", "read_reserve", GITHUB_READ_RESERVE))
+
+class BudgetedRepo:
+    """Hülle um das Repository: liest nach jeder Anfrage das Kontingent und fasst gleiche get_contents zusammen."""
+
+    def __init__(self, repo, budget):
+        self.repo = repo
+        self.budget = budget
+
+    def call(self, function, *args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.budget.update(getattr(self.repo, "requester", None))
+
+    def get_contents(self, path, ref=None):
+        kwargs = {"ref": ref} if ref else {}
+        return self.budget.single_flight((path, ref), lambda: self.call(self.repo.get_contents, path, **kwargs))
+
+    def create_file(self, path, *args, **kwargs):
+        try:
+            return self.call(self.repo.create_file, path, *args, **kwargs)
+        finally:
+            self.budget.forget(path)
+
+    def update_file(self, path, *args, **kwargs):
+        try:
+            return self.call(self.repo.update_file, path, *args, **kwargs)
+        finally:
+            self.budget.forget(path)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.repo, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            return self.call(attribute, *args, **kwargs)
+        return call
+
+def show_stale_data_notice():
+    # Hinweis, solange Daten wegen des knappen Kontingents ungeprüft aus dem Cache kommen
+    since = get_csv_cache().stale_since()
+    budget = get_github_budget()
+    if since is not None and not budget.reads_allowed():
+        reset = datetime.fromtimestamp(budget.status()["reset"])
+        st.sidebar.warning(f"Angezeigt werden gespeicherte Daten (Stand {datetime.fromtimestamp(since):%H:%M}), "
+                           f"ab {reset:%H:%M} wieder aktuell. Neue Einträge werden weiterhin gespeichert.")
+
+#Grosse Dateien: über 1 MB liefert die Contents-API keinen Inhalt mehr, dann über die Git-Blob-API
+
+@st.cache_resource
+def get_http_session():
+    # Die Blob-API als Rohdaten-Stream gibt es in PyGithub nicht, daher direkt über requests
+    import requests
+
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=GITHUB_POOL_SIZE, pool_maxsize=GITHUB_POOL_SIZE))
+    return session
+
+def iter_blob(repo, sha, chunk_size=GITHUB_STREAM_CHUNK_BYTES):
+    # Rohdaten einer Datei (bis 100 MB) Stück für Stück, ohne base64 und ohne die ganze Datei im Speicher
+    headers = {"Accept": "application/vnd.github.raw+json", "Authorization": f"Bearer {st.secrets['github']['token']}"}
+    with span("github.get_blob"):
+        response = get_http_session().get(f"{repo.url}/git/blobs/{sha}", headers=headers, stream=True, timeout=60)
+    get_github_budget().record(int(response.headers.get("X-RateLimit-Remaining", -1)),
+                               int(response.headers.get("X-RateLimit-Limit", -1)), int(response.headers.get("X-RateLimit-Reset", 0)))
+    with response:
+        response.raise_for_status()
+        yield from response.iter_content(chunk_size)
+
+class ChunkStream(io.RawIOBase):
+    """Datei-Objekt über den heruntergeladenen Stücken, damit pandas direkt aus dem Download liest."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.rest = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.rest:
+            self.rest = memoryview(next((chunk for chunk in self.chunks if chunk), b""))
+        size = min(len(buffer), len(self.rest))
+        buffer[:size] = self.rest[:size]
+        self.rest = self.rest[size:]
+        return size
+
+def is_truncated(content_file):
+    # Grosse Dateien kommen von der Contents-API ohne Inhalt (encoding "none"), decoded_content schlägt dann fehl
+    return content_file.encoding != "base64"
+
+def iter_csv_chunks(repo, content_file, chunk_rows=CSV_CHUNK_ROWS):
+    dtype = text_dtypes(path_entity(content_file.path))
+    if not is_truncated(content_file):
+        yield pd.read_csv(StringIO(content_file.decoded_content.decode("utf-8")), dtype=dtype)
+        return
+    logger.info("%s is %d bytes, streaming it from the blob API", content_file.path, content_file.size)
+    with pd.read_csv(io.BufferedReader(ChunkStream(iter_blob(repo, content_file.sha))), dtype=dtype, chunksize=chunk_rows) as reader:
+        yield from reader
+
+def read_csv_file(repo, content_file):
+    # Im Speicher liegen höchstens die geparsten Blöcke und ein Stück des Downloads, nie der ganze Text
+    chunks = list(iter_csv_chunks(repo, content_file))
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+def file_text(repo, content_file):
+    # Ganzer Inhalt als Text, für Schreibvorgänge, die die Datei ohnehin vollständig neu bauen
+    if not is_truncated(content_file):
+        return content_file.decoded_content.decode("utf-8")
+    return b"".join(iter_blob(repo, content_file.sha)).decode("utf-8")
+
+#Schreiben auf GitHub mit optimistischer Nebenläufigkeit (compare-and-swap)
+
+def compare_and_swap(repo, path, message, build):
+    # Lesen, neuen Inhalt aus dem gelesenen bauen, mit der gelesenen SHA schreiben. Hat eine andere Session
+    # die Datei inzwischen geändert (409) oder angelegt (422), wird nach einer zufälligen, exponentiell
+    # wachsenden Pause neu gelesen und neu gebaut. build(bestehender Inhalt, Versuch) -> Inhalt oder None
+    from github import GithubException, UnknownObjectException
+
+    for attempt in range(GITHUB_WRITE_ATTEMPTS):
+        try:
+            contents = repo.get_contents(path)
+            existing_csv = file_text(repo, contents)
+        except UnknownObjectException:
+            contents, existing_csv = None, ""
+        updated = build(existing_csv, attempt)
+        if updated is None:
+            break
+        try:
+            if contents is None:
+                repo.create_file(path, message, updated)
+            else:
+                repo.update_file(path, message, updated, contents.sha)
+            break
+        except GithubException as e:
+            if e.status not in (409, 422) or attempt == GITHUB_WRITE_ATTEMPTS - 1:
+                raise
+            logger.info("Write conflict on %s (attempt %d), retrying", path, attempt + 1)
+            time.sleep(random.uniform(0, min(GITHUB_RETRY_MAX_SECONDS, GITHUB_RETRY_BASE_SECONDS * 2 ** attempt)))
+    get_csv_cache().invalidate(path)
+
+def missing_records(entity, existing_csv, records):
+    # Nur bei Wiederholungen: Datensätze weglassen, die schon in der Datei stehen (ein Versuch kann
+    # angekommen sein, obwohl die Antwort ein Fehler war)
+    if not ENTITIES[entity]["dedup_key"] or not existing_csv.strip():
+        return records
+    with span("csv.parse", entity):
+        existing = pd.read_csv(StringIO(existing_csv), dtype=text_dtypes(entity))
+    existing = existing[existing['username'].isin({record['username'] for record in records})]
+    keys = set(record_keys(entity, existing).tolist())
+    columns = ENTITIES[entity]["dedup_key"]
+    return [record for record in records if record_key(entity, [record.get(column) for column in columns]) not in keys]
+
+def write_records_to_github(entity, records, message):
+    # Neue Datensätze in die Datei(en) auf GitHub einfügen, ohne gleichzeitige Änderungen anderer Sessions zu überschreiben
+    repo = init_github()
+    for path, rows in split_by_file(entity, pd.DataFrame(records, columns=ENTITIES[entity]["columns"])):
+        pending = rows.to_dict('records')
+
+        def build(existing_csv, attempt, pending=pending):
+            if attempt:
+                pending[:] = missing_records(entity, existing_csv, pending)
+            return apply_records(entity, existing_csv, pending) if pending else None
+
+        compare_and_swap(repo, path, message, build)
+
+def upload_csv_to_github(file_path, repo):
+    file_name = os.path.basename(file_path)
+    with open(file_path, "rb") as file:
+        content = file.read()
+
+    def build(existing_csv, attempt):
+        # Profile, die eine andere Session inzwischen registriert hat, bleiben erhalten; eigene ersetzen die alten
+        if not existing_csv.strip():
+            return content
+        ours = pd.read_csv(BytesIO(content))
+        theirs = pd.read_csv(StringIO(existing_csv))
+        return pd.concat([theirs[~theirs['username'].isin(ours['username'])], ours], ignore_index=True).to_csv(index=False)
+
+    compare_and_swap(repo, file_name, "Update user data", build)
+    st.success('CSV updated on GitHub successfully!')
+
+def normalize_password_hash(stored_hash):
+    # Einheitliches Format ist der bcrypt-Hash als Text ("$2b$12$..."); ältere Einträge stehen als "b'...'" in der Datei
+    stored_hash = str(stored_hash)
+    if stored_hash.startswith("b'") and stored_hash.endswith("'"):
+        stored_hash = stored_hash[2:-1].encode().decode('unicode_escape').encode('latin1').decode('utf-8')
+    return stored_hash
+
+class UserDirectory:
+    """Benutzerprofile im Speicher mit Suche über den Benutzernamen; wird neu geladen, sobald sich user_data.csv ändert."""
+
+    def __init__(self, path=USER_DATA_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.version = None
+        self.profiles = pd.DataFrame(columns=USER_DATA_COLUMNS).set_index("username")
+        self.password_hashes = {}
+
+    def file_version(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        # Ein stat() pro Zugriff; die Datei wird nur gelesen, wenn ein anderer Prozess sie geändert hat
+        version = self.file_version()
+        if version == self.version:
+            return
+        with self.lock:
+            if version is None:
+                profiles = pd.DataFrame(columns=USER_DATA_COLUMNS).set_index("username")
+            else:
+                profiles = pd.read_csv(self.path, index_col="username", dtype={"username": str, "password_hash": str})
+            self.set_profiles(profiles, version)
+
+    def set_profiles(self, profiles, version):
+        self.profiles = profiles
+        self.password_hashes = {
+            username: normalize_password_hash(stored_hash).encode('utf-8')
+            for username, stored_hash in profiles['password_hash'].dropna().items()
+        }
+        self.version = version
+
+    def get_profiles(self):
+        self.refresh()
+        return self.profiles
+
+    def __contains__(self, username):
+        self.refresh()
+        return username in self.password_hashes
+
+    def password_hash(self, username):
+        self.refresh()
+        return self.password_hashes.get(username)
+
+    def save(self, profiles):
+        # Schreiben und die eigene Kopie gleich ersetzen
+        with self.lock:
+            profiles.to_csv(self.path)
+            self.set_profiles(profiles.copy(), self.file_version())
+
+@st.cache_resource
+def get_user_directory():
+    return UserDirectory()
+
+def load_user_profiles():
+    # Eigene Kopie für den Aufrufer, das Verzeichnis selbst bleibt unverändert
+    return get_user_directory().get_profiles().copy()
+
+def initialize_session_state():
+    if 'page' not in st.session_state:
+        st.session_state['page'] = 'home'
+    if 'users' not in st.session_state:
+        st.session_state['users'] = load_user_profiles()
+    if 'measurements' not in st.session_state:
+        st.session_state['measurements'] = []
+    if 'measurements_flushed' not in st.session_state:
+        st.session_state['measurements_flushed'] = 0  # Anzahl Messungen, die bereits auf GitHub sind
+    if 'current_user' not in st.session_state:
+        st.session_state['current_user'] = None
+    if 'medications' not in st.session_state:
+        st.session_state['medications'] = []
+    if 'fitness_activities' not in st.session_state:
+        st.session_state['fitness_activities'] = []
+    if 'logout' not in st.session_state:
+        st.session_state['logout'] = False  # wird von streamlit-authenticator beim Lesen des Cookies geprüft
+
+def save_user_profiles_and_upload(user_profiles):
+    try:
+        # Versuche, die CSV lokal zu speichern
+        get_user_directory().save(user_profiles)
+        st.success('Lokales Speichern der Benutzerdaten erfolgreich!')
+    except Exception as e:
+        st.error(f'Fehler beim lokalen Speichern der Benutzerdaten: {e}')
+        return False  # Beendet die Funktion frühzeitig, wenn das lokale Speichern fehlschlägt
+
+    try:
+        # Initialisiere GitHub-Repository
+        repo = init_github()
+        upload_csv_to_github(USER_DATA_FILE, repo)
+        return True
+    except Exception as e:
+        st.error(f'Fehler beim Hochladen der Daten auf GitHub: {e}')
+        return False
+
+def register_user(username, password, name, vorname, geschlecht, geburtstag, gewicht, groesse):
+    if username in get_user_directory():
+        st.error("Benutzername bereits vergeben. Bitte wählen Sie einen anderen.")
+        return False
+
+    try:
+        # Versuch, das Geburtsdatum zu validieren und zu formatieren
+        geburtstag = datetime.strptime(geburtstag, '%d-%m-%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        st.error("Das Geburtsdatum muss im Format TT-MM-JJJJ eingegeben werden.")
+        return False
+
+    # Passworthash erzeugen
+    hashed_pw = hash_password(password)
+
+    # Vorbereitung der Benutzerdetails für den neuen Benutzer
+    user_details = {
+        'password_hash': hashed_pw,
+        'name': name,
+        'vorname': vorname,
+        'geschlecht': geschlecht,
+        'geburtstag': geburtstag,
+        'gewicht': gewicht,
+        'groesse': groesse
+    }
+
+    # Hinzufügen der neuen Benutzerdaten zum DataFrame
+    user_profiles = load_user_profiles()
+    user_profiles.loc[username] = user_details
+    if save_user_profiles_and_upload(user_profiles):
+        st.session_state['users'] = user_profiles  # Benutzerdaten in den Session State laden
+        st.success("Benutzer erfolgreich registriert!")
+        return True
+    else:
+        return False
+
+def verify_login(username, password):
+    # Der Hash kommt aus dem Benutzerverzeichnis im Speicher, bereits im einheitlichen Format
+    stored_hash = get_user_directory().password_hash(username)
+    if stored_hash is not None:
+        # Verwenden Sie bcrypt, um das eingegebene Passwort zu überprüfen
+        if check_password(password, stored_hash):
+            st.session_state['current_user'] = username
+            remember_session(username)
+            return True
+    st.error("Incorrect username or password.")
+    return False
+
+#Passwörter und Sitzungs-Cookies
+
+@st.cache_resource
+def get_password_executor():
+    # bcrypt gibt den GIL frei; der Pool begrenzt, wie viele Prüfungen aller Sessions gleichzeitig rechnen
+    return ThreadPoolExecutor(max_workers=LOGIN_MAX_CONCURRENT, thread_name_prefix="bcrypt")
+
+def check_password(password, stored_hash):
+    import bcrypt
+
+    with span("bcrypt.check", "users"):
+        return get_password_executor().submit(bcrypt.checkpw, password.encode('utf-8'), stored_hash).result()
+
+def hash_password(password):
+    import bcrypt
+
+    with span("bcrypt.hash", "users"):
+        return get_password_executor().submit(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt()).result().decode('utf-8')
+
+def create_session_cookies():
+    # Signierte, ablaufende Sitzungs-Cookies (JWT) von streamlit-authenticator; ohne [auth] cookie_key abgeschaltet.
+    # Der CookieManager ist eine Komponente und darf pro Durchlauf nur einmal erzeugt werden.
+    cookie_key = get_setting("auth", "cookie_key")
+    if not cookie_key:
+        return None
+    from streamlit_authenticator.controllers import CookieController
+
+    return CookieController(
+        get_setting("auth", "cookie_name", SESSION_COOKIE_NAME),
+        cookie_key,
+        get_setting("auth", "cookie_expiry_days", SESSION_COOKIE_EXPIRY_DAYS),
+    )
+
+def session_cookies():
+    # Erst erzeugt, wenn ein Cookie gelesen, gesetzt oder gelöscht wird; danach für den Rest des Durchlaufs gemerkt
+    if st.session_state.get('session_cookies') is None:
+        st.session_state['session_cookies'] = create_session_cookies()
+    return st.session_state['session_cookies']
+
+def restore_session():
+    # Wiederkehrende Benutzer mit gültigem Cookie werden ohne Passwort (und ohne bcrypt) angemeldet.
+    # Ohne Cookie im Request wird streamlit-authenticator gar nicht erst geladen.
+    if st.session_state.get('current_user') or get_setting("auth", "cookie_name", SESSION_COOKIE_NAME) not in st.context.cookies:
+        return
+    cookies = session_cookies()
+    if cookies is None:
+        return
+    token = cookies.get_cookie()
+    if token and token['username'] in get_user_directory():
+        st.session_state['current_user'] = token['username']
+        if st.session_state['page'] == 'home':
+            st.session_state['page'] = 'home_screen'
+
+def remember_session(username):
+    cookies = session_cookies()
+    if cookies is None:
+        return
+    st.session_state['username'] = username
+    st.session_state['logout'] = False
+    cookies.set_cookie()
+
+def forget_session():
+    cookies = session_cookies()
+    st.session_state['logout'] = True
+    if cookies is not None:
+        cookies.delete_cookie()
+    
+def user_interface():
+    display_logo()
+    st.title('User Registration and Login')
+    username = st.text_input("Username")
+    password = st.text_input("Password", type="password")
+
+    if st.button("Login"):
+        if verify_login(username, password):
+            st.session_state['page'] = 'home_screen'
+
+    if st.button("Register"):
+        name = st.text_input("Name")
+        vorname = st.text_input("Vorname")
+        geschlecht = st.radio("Geschlecht", ['Männlich', 'Weiblich', 'Divers'])
+        tag = st.text_input("Tag", max_chars=2)
+        monat = st.text_input("Monat", max_chars=2)
+        jahr = st.text_input("Jahr", max_chars=4)
+        # Stelle sicher, dass das Format TT-MM-JJJJ eingehalten wird
+        geburtstag = f"{tag.zfill(2)}-{monat.zfill(2)}-{jahr}"
+        gewicht = st.number_input("Gewicht (kg)", format='%f')
+        groesse = st.number_input("Größe (cm)", format='%f')
+        if tag and monat and jahr:
+            if register_user(username, password, name, vorname, geschlecht, geburtstag, gewicht, groesse):
+                st.session_state['current_user'] = username
+                st.session_state['page'] = 'home_screen'
+    
+if __name__== "_main_":
+    user_interface()
+
+def show_registration_form():
+    with st.form("registration_form"):
+        st.write("Registrieren")
+        username = st.text_input("Benutzername")
+        password = st.text_input("Passwort", type="password")
+        name = st.text_input("Name")
+        vorname = st.text_input("Vorname")
+        geschlecht = st.radio("Geschlecht", ['Männlich', 'Weiblich', 'Divers'])
+        geburtstag = st.date_input("Geburtstag", min_value=datetime(1920, 1, 1))
+        gewicht = st.number_input("Gewicht (kg)", format='%f')
+        groesse = st.number_input("Größe (cm)", format='%f')
+        submit_button = st.form_submit_button("Registrieren")
+
+        if submit_button:
+            geburtstag_str = geburtstag.strftime('%d-%m-%Y')
+            if register_user(username, password, name, vorname, geschlecht, geburtstag_str, gewicht, groesse):
+                st.success("Registrierung erfolgreich!")
+            else:
+                st.error("Registrierung fehlgeschlagen. Bitte überprüfen Sie die Eingaben.")       
+def show_login_form():
+    with st.form("login_form"):
+        st.write("Einloggen")
+        username = st.text_input("Benutzername")
+        password = st.text_input("Passwort", type="password")
+        if st.form_submit_button("Login"):
+            if verify_login(username, password):
+                st.session_state['current_user'] = username
+                st.session_state['page'] = 'home_screen'
+            else:
+                st.error("Benutzername oder Passwort ist falsch.")
+
+#Home Bildschirm
+def show_home():
+    display_logo()
+    st.title('Herzlich Willkommen bei CardioCheck')
+    st.subheader('Ihr Blutdruck Tagebuch')
+    action = st.selectbox("Aktion wählen", ["Einloggen", "Registrieren"])
+    if action == "Registrieren":
+        show_registration_form()
+    elif action == "Einloggen":
+        show_login_form()
+def logout():
+    # Setzt die session_state Variablen zurück und löscht das Sitzungs-Cookie
+    forget_session()
+    st.session_state['current_user'] = None
+    st.session_state['page'] = 'home'
+    st.info("Sie wurden erfolgreich ausgeloggt.")        
+
+def show_home_screen():
+    display_logo()
+    
+    # Holen Sie sich den Vornamen des aktuellen Benutzers
+    user_profiles = st.session_state['users']
+    current_user = st.session_state.get('current_user', 'Gast')
+    first_name = 'Gast'
+    
+    if current_user in user_profiles.index:
+        first_name = user_profiles.at[current_user, 'vorname']
+    
+    st.title(f'Willkommen, {first_name}!')
+    st.markdown("## CardioCheck Dashboard")
+    st.markdown("### Wähle mit was du heute starten möchtest:")
+    
+    # Spacer zur besseren Positionierung der Buttons
+    st.write("")
+
+    # Definiert das Layout für die Buttons
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("👤 Profil"):
+            st.session_state['page'] = 'profile'
+        if st.button("💪 Fitness"):
+            st.session_state['page'] = 'Fitness'
+    with col2:
+        if st.button("📊 Messungen"):
+            st.session_state['page'] = 'measurements'
+        if st.button("🆘 Notfall Nr."):
+            st.session_state['page'] = 'emergency_numbers'
+    with col3:
+        if st.button("💊 Medikamenten Plan"):
+            st.session_state['page'] = 'medication-plan'
+        if st.button("ℹ️ Infos"):  
+            st.session_state['page'] = 'infos'
+        if is_metrics_admin() and st.button("⏱️ Messpunkte"):
+            st.session_state['page'] = 'metrics'
+
+    # Spacer zur besseren Positionierung des Logout-Buttons
+    st.write("")
+    st.write("")
+    st.write("")
+    st.write("")
+
+    # Logout-Button am unteren Ende der Seite
+    if st.button("🚪 Logout"):
+        logout()
+
+    # Anwenden von zusätzlichem CSS für Stilverbesserungen
+    st.markdown("""
+        <style>
+        .stButton>button {
+            width: 100%;
+            border-radius: 10px;
+            border: 1px solid #FF807A;
+            color: #ffffff;
+            font-size: 24px;  /* Kleinere Schriftgröße für die Buttons */
+            height: 4em;  /* Erhöht die Höhe des Buttons, um den größeren Text aufzunehmen */
+            padding: 0.25em 0.5em;
+            background-color: #FF807A;
+            transition: all 0.3s;
+            cursor: pointer;
+            line-height: 1.6;
+        }
+        .stButton>button:hover {
+            border: 1px solid #FF6859;
+            background-color: #FF6859;
+        }
+        .stButton>button::before {
+            font-size: 1.5em; /* Größere Icons */
+        }
+        </style>
+    """, unsafe_allow_html=True)
+#hier kommt der Code für Profil 
+
+def show_profile():
+    display_logo()
+    if st.button("Zurück zum Homebildschirm"):
+        back_to_home()
+        
+    st.title('Profil')
+    current_user = st.session_state.get('current_user', None)
+    if current_user:
+        user_profiles = st.session_state['users']
+        if current_user in user_profiles.index:
+            user_details = user_profiles.loc[current_user]
+
+            # Display user details except for the password
+            st.markdown("### Benutzerdetails")
+            for detail, value in user_details.items():
+                if detail != 'password_hash':  # Exclude password from display
+                    if detail == 'gewicht':
+                        st.markdown(f"*Gewicht:* {value} kg")  # Add unit kg
+                    elif detail == 'groesse':
+                        st.markdown(f"*Größe:* {value} cm")  # Add unit cm
+                    else:
+                        st.markdown(f"*{detail.title()}:* {value}")
+
+            # Allow user to update weight and height
+            st.markdown("### Aktualisieren Sie Ihr Gewicht und Größe")
+            new_gewicht = st.number_input("Gewicht (kg)", value=float(user_details['gewicht']) if user_details['gewicht'] else 0, format='%f')
+            new_groesse = st.number_input("Größe (cm)", value=float(user_details['groesse']) if user_details['groesse'] else 0, format='%f')
+            update_button = st.button("Update")
+            if update_button:
+                user_profiles.at[current_user, 'gewicht'] = new_gewicht
+                user_profiles.at[current_user, 'groesse'] = new_groesse
+                if save_user_profiles_and_upload(user_profiles):
+                    # Aktualisieren des Session-Zustands nach dem Hochladen
+                    st.session_state['users'] = user_profiles
+                    st.success("Profil erfolgreich aktualisiert!")
+                    # Rerun the current app to update the display
+                    st.rerun()
+                else:
+                    st.error("Aktualisierung fehlgeschlagen. Bitte versuchen Sie es erneut.")
+
+            show_data_export(current_user)
+        else:
+            st.error("Benutzer nicht gefunden.")
+    else:
+        st.error("Bitte melden Sie sich an, um Ihr Profil zu sehen.")
+
+    # Display norm values
+    st.subheader('Normwerte')
+    st.markdown("Systolisch: 120 mmHg")
+    st.markdown("Diastolisch: 80 mmHg")
+    st.markdown("Puls: 60 - 80")
+    
+#Ende vom Code Profil
+
+#Hier Alles zu Messungen
+def back_to_home():
+    st.session_state['page'] = 'home_screen'
+
+def get_start_end_dates_from_week_number(year, week_number):
+    """Returns the start and end dates of the given ISO week number for the given year."""
+    start_of_week = date.fromisocalendar(year, week_number, 1)
+    end_of_week = start_of_week + timedelta(days=6)
+    return start_of_week, end_of_week
+
+def get_period_range(view, year, number):
+    # Zeitraum für die History: Woche (ISO), Monat (1-12) oder Quartal (1-4)
+    if view == "Woche":
+        return get_start_end_dates_from_week_number(year, number)
+    first_month = number if view == "Monat" else (number - 1) * 3 + 1
+    months = 1 if view == "Monat" else 3
+    start = date(year, first_month, 1)
+    next_start = date(year + (first_month + months - 1) // 12, (first_month + months - 1) % 12 + 1, 1)
+    return start, next_start - timedelta(days=1)
+
+# Spalten der History-Tabellen und ihre Überschriften
+HISTORY_COLUMNS = {
+    "measurements": {"datum": "Datum", "uhrzeit": "Uhrzeit", "systolic": "Systolisch", "diastolic": "Diastolisch", "pulse": "Puls", "comments": "Kommentare"},
+    "fitness": {"datum": "Datum", "uhrzeit": "Uhrzeit", "dauer": "Dauer", "intensitaet": "Intensitaet", "art": "Art", "kommentare": "Kommentare"},
+}
+WEEKDAY_NAMES = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']
+
+def build_history_table(entity, data, start_date, end_date):
+    # Vektorisiert: Zeitstempel einmal berechnen, Zeitraum filtern, nach Zeit sortieren
+    with span("dataframe.history_table", entity):
+        columns = HISTORY_COLUMNS[entity]
+        if data.empty:
+            return pd.DataFrame(columns=['Wochentag'] + list(columns.values()))
+        if 'datetime' in data.columns:
+            timestamps = data['datetime']
+        else:
+            timestamps = pd.to_datetime(data['datum'] + ' ' + data['uhrzeit'], format='ISO8601', errors='coerce')
+        in_range = (timestamps >= pd.Timestamp(start_date)) & (timestamps < pd.Timestamp(end_date) + timedelta(days=1))
+        positions = np.flatnonzero(in_range.to_numpy())
+        positions = positions[np.argsort(timestamps.to_numpy()[positions], kind='stable')]
+        table = data[list(columns)].iloc[positions].rename(columns=columns).reset_index(drop=True)
+        # Gruppierung nach Tag: der Wochentag steht als erste Spalte, die Zeilen sind bereits nach Tagen geordnet
+        weekdays = timestamps.iloc[positions].dt.weekday.to_numpy()
+        table.insert(0, 'Wochentag', pd.Categorical.from_codes(weekdays, WEEKDAY_NAMES))
+        table['Kommentare'] = table['Kommentare'].astype(object).fillna("")
+        return table
+
+def select_history_period():
+    # Auswahl des Zeitraums (Woche, Monat oder Quartal) für die History-Seiten
+    today = datetime.now()
+    view = st.radio('Zeitraum', ["Woche", "Monat", "Quartal"], horizontal=True)
+    year = st.number_input('Jahr', min_value=2020, max_value=today.year, value=today.year, format='%d')
+    if view == "Woche":
+        number = st.number_input('Wochennummer (1-53)', min_value=1, max_value=53, value=today.isocalendar()[1], format='%d')
+        # Jahre mit nur 52 ISO-Wochen
+        number = min(number, date(year, 12, 28).isocalendar()[1])
+    elif view == "Monat":
+        number = st.number_input('Monat (1-12)', min_value=1, max_value=12, value=today.month, format='%d')
+    else:
+        number = st.number_input('Quartal (1-4)', min_value=1, max_value=4, value=(today.month - 1) // 3 + 1, format='%d')
+    start_date, end_date = get_period_range(view, year, number)
+    return view, start_date, end_date
+
+def show_history_table(view, table):
+    # Eine Woche als feste Tabelle, längere Zeiträume scrollbar
+    if view == "Woche":
+        st.table(table)
+    else:
+        st.dataframe(table, use_container_width=True, hide_index=True)
+
+def add_measurement(datum, uhrzeit, systolic, diastolic, pulse, comments):
+    current_user = st.session_state.get('current_user')
+    if 'measurements' not in st.session_state:
+        st.session_state['measurements'] = []
+
+    # Erstelle eine neue Messung
+    new_measurement = {
+        "username": current_user,  
+        "datum": datum.strftime('%Y-%m-%d'),
+        "uhrzeit": uhrzeit.strftime('%H:%M'),
+        "systolic": systolic,
+        "diastolic": diastolic,
+        "pulse": pulse,
+        "comments": comments
+    }
+
+    # Überprüfen, ob diese Messung bereits existiert (Hash-Index statt Suche in der Liste)
+    status, records = save_new_records("measurements", [new_measurement], 'measurements')
+    if status == SAVED:
+        get_rollups().add(records)
+    elif status == DUPLICATE:
+        st.warning("Diese Messung wurde bereits hinzugefügt.")
+    return status
+
+def save_measurements_to_github():
+    measurement_list = st.session_state.get('measurements', [])
+    # Nur die Messungen seit dem letzten erfolgreichen Upload senden (High-Water-Mark pro Session)
+    flushed = st.session_state.get('measurements_flushed', 0)
+    pending = measurement_list[flushed:]
+    if not pending:
+        return
+    pending_df = pd.DataFrame(pending, columns=MEASUREMENTS_DATA_COLUMNS)
+
+    # Lokale Kopie ebenfalls nur ergänzen, Kopfzeile nur beim Anlegen der Datei
+    local_exists = os.path.exists(MEASUREMENTS_DATA_FILE)
+    pending_df.to_csv(MEASUREMENTS_DATA_FILE, mode='a', header=not local_exists, index=False)
+
+    write_records_to_github("measurements", pending, "Update measurement data")
+    st.success('Measurement data updated on GitHub successfully!')
+    st.session_state['measurements_flushed'] = len(measurement_list)
+
+def show_measurement_options():
+    display_logo(in_sidebar=True)
+    st.sidebar.title("Messungen Optionen")
+    option = st.sidebar.radio(
+        "", ["Neue Messung hinzufügen", "Messungen importieren", "Messhistorie anzeigen", "Trendanalyse", "Arztbericht"])
+    if option == "Neue Messung hinzufügen":
+        show_add_measurement_form()
+    elif option == "Messungen importieren":
+        show_import_measurements()
+    elif option == "Messhistorie anzeigen":
+        show_measurement_history_weekly()
+    elif option == "Trendanalyse":
+        show_trend_analysis()
+    elif option == "Arztbericht":
+        show_doctor_report()
+def show_add_measurement_form():
+    display_logo()
+    if st.button('Zurück zum Homebildschirm'):
+        back_to_home()
+    st.title('Messungen')
+    with st.form("measurement_form"):
+        datum = st.date_input("Datum", value=datetime.today())
+        # Standard-Uhrzeit ohne Schrittweite einstellen
+        default_time = datetime.now().time()  # Aktuelle Uhrzeit als Standardwert
+        uhrzeit = st.time_input("Uhrzeit", value=default_time)
+        
+        wert_systolisch = st.number_input("Wert Systolisch (mmHg)", min_value=0)
+        wert_diastolisch = st.number_input("Wert Diastolisch (mmHg)", min_value=0)
+        puls = st.number_input("Puls (bpm)", min_value=0)
+        kommentare = st.text_area("Kommentare")
+        submit_button = st.form_submit_button("Messungen speichern")
+
+        if submit_button:
+            current_user = st.session_state.get('current_user')
+            if current_user is not None:
+                if add_measurement(datum, uhrzeit, wert_systolisch, wert_diastolisch, puls, kommentare) == SAVED:
+                    st.success("Messungen erfolgreich gespeichert!")
+            else:
+                st.error("Sie sind nicht angemeldet. Bitte melden Sie sich an, um Messungen zu speichern.")
+
+#Import von Messungen aus Exporten von Blutdruckmessgeräten (CSV/JSON)
+
+# Spaltennamen gängiger Exporte (Omron, Withings, Beurer, Apple Health u.a.), klein geschrieben
+IMPORT_COLUMN_ALIASES = {
+    "datum": ["datum", "date", "measurement date", "messdatum", "tag"],
+    "uhrzeit": ["uhrzeit", "time", "measurement time", "messzeit", "zeit"],
+    "zeitpunkt": ["zeitpunkt", "date/time", "datetime", "date time", "timestamp", "startdate", "start date", "measured at"],
+    "systolic": ["systolic", "sys", "systolisch", "systole", "sys (mmhg)", "systolic (mmhg)", "systolic blood pressure"],
+    "diastolic": ["diastolic", "dia", "diastolisch", "diastole", "dia (mmhg)", "diastolic (mmhg)", "diastolic blood pressure"],
+    "pulse": ["pulse", "puls", "pul", "heart rate", "herzfrequenz", "pulse (bpm)", "puls (bpm)", "hr"],
+    "comments": ["comments", "comment", "kommentar", "kommentare", "notes", "note", "notiz", "notizen", "memo"],
+}
+IMPORT_DATE_FORMATS = ['%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']
+# Plausible Bereiche; Zeilen ausserhalb werden nicht importiert
+IMPORT_LIMITS = {"systolic": (60, 260), "diastolic": (30, 160), "pulse": (25, 240)}
+
+def read_import_chunks(file, file_name):
+    # Liest die Datei blockweise; CSV mit Komma, Semikolon oder Tab, JSON als Liste oder JSON Lines
+    if file_name.lower().endswith((".json", ".jsonl", ".ndjson")):
+        first = file.read(1)
+        file.seek(0)
+        if first in (b"[", "[", b"{", "{") and not file_name.lower().endswith((".jsonl", ".ndjson")):
+            # Eine JSON-Liste lässt sich nicht stückweise lesen; sie wird einmal geladen und in Blöcken verarbeitet
+            content = json.load(file)
+            if isinstance(content, dict):
+                content = next((value for value in content.values() if isinstance(value, list)), [])
+            for start in range(0, len(content), IMPORT_CHUNK_ROWS):
+                yield pd.DataFrame(content[start:start + IMPORT_CHUNK_ROWS])
+            return
+        yield from pd.read_json(file, lines=True, chunksize=IMPORT_CHUNK_ROWS, dtype=False)
+        return
+    header = file.readline()
+    file.seek(0)
+    if isinstance(header, bytes):
+        header = header.decode("utf-8-sig", errors="replace")
+    sep = max([",", ";", "\t"], key=header.count)
+    yield from pd.read_csv(file, sep=sep, chunksize=IMPORT_CHUNK_ROWS, dtype=str, encoding="utf-8-sig", skipinitialspace=True)
+
+def map_import_columns(columns):
+    # Ordnet die Spalten der Datei den Spalten der App zu
+    lookup = {alias: target for target, aliases in IMPORT_COLUMN_ALIASES.items() for alias in aliases}
+    mapping = {}
+    for column in columns:
+        target = lookup.get(str(column).strip().lower())
+        if target and target not in mapping.values():
+            mapping[column] = target
+    return mapping
+
+def parse_import_dates(values):
+    # Das Datumsformat mit den meisten gültigen Werten gewinnt (z.B. TT.MM.JJJJ oder MM/TT/JJJJ)
+    best = None
+    for date_format in IMPORT_DATE_FORMATS:
+        parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+        if best is None or parsed.notna().sum() > best.notna().sum():
+            best = parsed
+    return best
+
+def parse_import_times(values):
+    # Uhrzeit als HH:MM, auch aus "8:05 PM" oder "08:05:00Z"
+    parts = values.str.extract(r'(\d{1,2}):(\d{2})(?::\d{2})?(?:\.\d+)?\s*([AaPp][Mm])?')
+    hours = pd.to_numeric(parts[0], errors='coerce')
+    minutes = pd.to_numeric(parts[1], errors='coerce')
+    pm = parts[2].str.lower().eq('pm').fillna(False).to_numpy()
+    am = parts[2].str.lower().eq('am').fillna(False).to_numpy()
+    hours = hours.mask(pm & (hours < 12), hours + 12).mask(am & (hours == 12), 0)
+    valid = hours.between(0, 23) & minutes.between(0, 59)
+    times = hours.astype('Int64').astype(str).str.zfill(2) + ':' + minutes.astype('Int64').astype(str).str.zfill(2)
+    return times.where(valid)
+
+def normalize_import_chunk(chunk, username):
+    # Spalten zuordnen, Datum/Uhrzeit vereinheitlichen und unplausible Zeilen verwerfen (vektorisiert)
+    chunk = chunk.rename(columns=map_import_columns(chunk.columns))
+    if "zeitpunkt" in chunk.columns:
+        timestamp = chunk["zeitpunkt"].astype(str).str.strip()
+        date_text = chunk["datum"].astype(str) if "datum" in chunk.columns else timestamp.str.split(r'[ T]', n=1, regex=True).str[0]
+        time_text = chunk["uhrzeit"].astype(str) if "uhrzeit" in chunk.columns else timestamp.str.split(r'[ T]', n=1, regex=True).str[1]
+    elif "datum" in chunk.columns and "uhrzeit" in chunk.columns:
+        date_text, time_text = chunk["datum"].astype(str), chunk["uhrzeit"].astype(str)
+    else:
+        raise ValueError("Die Datei braucht Spalten für Datum und Uhrzeit (oder einen Zeitpunkt).")
+    missing = [column for column in ["systolic", "diastolic", "pulse"] if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"Keine Spalte gefunden für: {', '.join(missing)}")
+
+    dates = parse_import_dates(date_text.str.strip())
+    result = pd.DataFrame({
+        "username": username,
+        "datum": dates.dt.strftime('%Y-%m-%d'),
+        "uhrzeit": parse_import_times(time_text.fillna('')),
+    })
+    valid = dates.notna() & result["uhrzeit"].notna() & (dates <= pd.Timestamp(datetime.now()))
+    for column, (low, high) in IMPORT_LIMITS.items():
+        values = pd.to_numeric(chunk[column].astype(str).str.extract(r'(\d+(?:[.,]\d+)?)')[0].str.replace(',', '.'), errors='coerce').round()
+        valid &= values.between(low, high)
+        result[column] = values
+    valid &= result["diastolic"] < result["systolic"]
+    result["comments"] = chunk["comments"].astype(object).where(chunk["comments"].notna(), "") if "comments" in chunk.columns else ""
+    accepted = result[valid.to_numpy()].astype({"systolic": int, "diastolic": int, "pulse": int})
+    return accepted, int((~valid).sum())
+
+def prepare_import(file, file_name, username, known_keys):
+    # Liest die Datei blockweise und behält nur neue, plausible Messungen (known_keys aus dem Dedup-Index)
+    seen = set(known_keys)
+    accepted = []
+    stats = {"gelesen": 0, "unplausibel": 0, "doppelt": 0}
+    for chunk in read_import_chunks(file, file_name):
+        stats["gelesen"] += len(chunk)
+        rows, rejected = normalize_import_chunk(chunk, username)
+        stats["unplausibel"] += rejected
+        keys = record_keys("measurements", rows)
+        # Duplikate gegen bestehende Daten und innerhalb der Datei
+        new = np.fromiter((key not in seen and not seen.add(key) for key in keys.tolist()), dtype=bool, count=len(keys))
+        stats["doppelt"] += int((~new).sum())
+        accepted.append(rows[new])
+    data = pd.concat(accepted, ignore_index=True) if accepted else pd.DataFrame(columns=MEASUREMENTS_DATA_COLUMNS)
+    stats["neu"] = len(data)
+    return data.sort_values(["datum", "uhrzeit"], ignore_index=True), stats
+
+def save_imported_measurements(data):
+    # Ein einziger Schreibvorgang für den ganzen Import
+    status, records = save_new_records("measurements", data[MEASUREMENTS_DATA_COLUMNS].to_dict('records'), 'measurements')
+    if status == SAVED:
+        get_rollups().add(records)
+    return status
+
+def show_import_measurements():
+    display_logo()
+    current_user = st.session_state.get('current_user')
+    if not current_user:
+        st.error("Bitte melden Sie sich an, um Messungen zu importieren.")
+        return
+    if st.button('Zurück zum Homebildschirm'):
+        back_to_home()
+    st.title('Messungen importieren')
+    st.write("Exportdatei Ihres Messgeräts oder Ihrer Blutdruck-App als CSV oder JSON hochladen. "
+             "Erkannt werden Spalten für Datum, Uhrzeit, Systolisch, Diastolisch, Puls und Kommentare.")
+    uploaded = st.file_uploader("Datei", type=["csv", "txt", "json", "jsonl", "ndjson"])
+    if uploaded is None:
+        return
+    try:
+        data, stats = prepare_import(uploaded, uploaded.name, current_user, get_dedup_index().keys("measurements", current_user))
+    except Exception as e:
+        st.error(f"Die Datei konnte nicht gelesen werden: {str(e)}")
+        return
+    st.write(f"{stats['gelesen']} Zeilen gelesen: {stats['neu']} neue Messungen, "
+             f"{stats['doppelt']} bereits vorhanden, {stats['unplausibel']} unvollständig oder unplausibel.")
+    if data.empty:
+        return
+    st.dataframe(data.drop(columns=['username']).head(20), hide_index=True)
+    if st.button(f"{stats['neu']} Messungen importieren"):
+        status = save_imported_measurements(data)
+        if status == SAVED:
+            st.success("Messungen erfolgreich importiert!")
+        elif status == DUPLICATE:
+            st.warning("Diese Messungen wurden bereits importiert.")
+
+def load_measurement_data(start_date=None, end_date=None):
+    current_user = st.session_state.get('current_user')
+    try:
+        # Nur die Daten des aktuellen Benutzers (optional nur ein Datumsbereich)
+        # Duplikate werden schon beim Speichern abgewiesen (Dedup-Index)
+        return get_storage().load("measurements", current_user, start_date, end_date)
+    except Exception as e:
+        st.error(f"Fehler beim Laden der Messdaten: {str(e)}")
+        return pd.DataFrame()
+
+@timed("Messhistorie")
+def show_measurement_history_weekly():
+    display_logo()
+    username = st.session_state.get('current_user')
+    if not username:
+        st.error("Bitte melden Sie sich an, um Ihre Messungen zu sehen.")
+        return
+
+    if st.button('Zurück zum Homebildschirm'):
+        back_to_home()
+    st.title('Messhistorie')
+
+    # Einmal pro Seitenaufruf laden; ein anderer Zeitraum läuft nur im Fragment und filtert diese Daten
+    measurement_history_fragment(load_measurement_data())
+
+@st.fragment
+@timed("Messhistorie (Zeitraum)")
+def measurement_history_fragment(measurement_data):
+    view, start_date, end_date = select_history_period()
+    st.write(f"Anzeigen der Messungen vom {start_date} bis {end_date}")
+
+    df_week = build_history_table("measurements", measurement_data, start_date, end_date)
+
+    if not df_week.empty:
+        # DataFrame anzeigen
+        show_history_table(view, df_week)
+
+        # Code für den Download-Button
+        pdf_file = lazy_pdf("measurements", df_week)
+        st.download_button(
+            label="Download Messdaten PDF",
+            data=pdf_file,
+            file_name="messdaten.pdf",
+            mime='application/pdf'
+        )
+    else:
+        st.write("Keine Daten zum Herunterladen verfügbar.")
+
+@timed("Trendanalyse")
+def show_trend_analysis():
+    display_logo()
+    # Sicherstellen, dass der Nutzer angemeldet ist
+    current_user = st.session_state.get('current_user')
+    if not current_user:
+        st.error("Bitte melden Sie sich an, um die Trendanalyse zu sehen.")
+        return
+    if st.button('Zurück zum Homebildschirm'):
+        back_to_home()
+    st.title('Trendanalyse der Messwerte')
+
+    # Laden der Messdaten für den angemeldeten Nutzer
+    measurement_data = load_measurement_data()
+    user_measurements = measurement_data[measurement_data['username'] == current_user]
+
+    if user_measurements.empty:
+        st.write("Es liegen keine Messdaten zur Analyse vor.")
+        return
+
+    # Schieberegler und Diagramm laufen als Fragment auf den bereits geladenen Daten
+    trend_chart_fragment(prepare_trend_data(user_measurements))
+
+    # Monatsübersicht aus den vorberechneten Kennzahlen
+    monthly = get_rollups().load(current_user, "month")
+    if not monthly.empty:
+        st.subheader('Monatsübersicht')
+        overview = monthly[['period', 'systolic_count', 'systolic_mean', 'systolic_sd', 'diastolic_mean', 'diastolic_sd', 'pulse_mean']].round(1)
+        overview.columns = ['Monat', 'Anzahl', 'Systolisch Ø', 'Systolisch SD', 'Diastolisch Ø', 'Diastolisch SD', 'Puls Ø']
+        st.dataframe(overview, hide_index=True)
+
+    st.markdown("""
+    <div style='background-color: #ffcccc; padding: 10px; border-radius: 5px;'>
+    <p style='color: red;'>Bei extrem hohen Werten über 180/110mmHg oder bei extrem tiefen Werten unter 90/60mmHg handelt es sich um Extremwerte und Sie sollten sofort Ihren Arzt kontaktieren.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+@traced("dataframe.trend_data", "measurements")
+def prepare_trend_data(user_measurements):
+    user_measurements = user_measurements.copy()
+    # Umwandeln der Datums- und Zeitangaben in Python datetime Objekte für die Analyse
+    # (das Parquet-Backend liefert die Spalte bereits als Zeitstempel)
+    if 'datetime' not in user_measurements.columns:
+        user_measurements['datetime'] = pd.to_datetime(user_measurements['datum'] + ' ' + user_measurements['uhrzeit'])
+
+    # Datentypen der Messwerte sicherstellen
+    for column in ['systolic', 'diastolic', 'pulse']:
+        user_measurements[column] = pd.to_numeric(user_measurements[column], errors='coerce')
+
+    # Sortieren der Messungen nach Datum und Zeit
+    return user_measurements.sort_values(by='datetime', ascending=True)
+
+@st.fragment
+@timed("Trendanalyse (Zeitraum)")
+def trend_chart_fragment(user_measurements):
+    # Sichtbarer Zeitraum: nur dieser Ausschnitt wird ausgedünnt und ans Diagramm geschickt,
+    # ein engerer Zeitraum zeigt also mehr Details
+    first_day = user_measurements['datetime'].iloc[0].date()
+    last_day = user_measurements['datetime'].iloc[-1].date()
+    if first_day < last_day:
+        window_start, window_end = st.slider('Zeitraum', min_value=first_day, max_value=last_day, value=(first_day, last_day), format="DD.MM.YYYY")
+        in_window = (user_measurements['datetime'] >= pd.Timestamp(window_start)) & (user_measurements['datetime'] < pd.Timestamp(window_end) + timedelta(days=1))
+        user_measurements = user_measurements[in_window]
+
+    fig = build_trend_figure(user_measurements)
+
+    # Diagramm anzeigen
+    st.plotly_chart(fig, use_container_width=True)
+
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: wählt pro Bucket den Punkt, der die Form der Kurve am besten erhält
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    bucket_size = (n - 2) / (threshold - 2)
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected]) - (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    return indices
+
+def downsample_series(times, values, max_points, keep=None):
+    # Ausgedünnte Linie; Punkte in keep (Extremwerte) bleiben immer exakt erhalten
+    valid = values.notna().to_numpy()
+    x = times.to_numpy()[valid].astype('datetime64[ns]').astype(np.int64).astype(float)
+    y = values.to_numpy()[valid].astype(float)
+    positions = np.flatnonzero(valid)[lttb_indices(x, y, max_points)]
+    if keep is not None:
+        positions = np.union1d(positions, np.flatnonzero(keep.to_numpy() & valid))
+    return times.iloc[positions], values.iloc[positions]
+
+@traced("plotly.figure", "measurements")
+def build_trend_figure(user_measurements, max_points=TREND_MAX_POINTS):
+    # WebGL-Diagramm (Scattergl) mit serverseitig ausgedünnten Linien, die Datenmenge bleibt begrenzt
+    times = user_measurements['datetime']
+    systolic = user_measurements['systolic']
+    diastolic = user_measurements['diastolic']
+    high_systolic, high_diastolic = systolic >= 180, diastolic >= 110
+    low_systolic, low_diastolic = systolic <= 90, diastolic <= 60
+    mode = 'lines+markers' if len(user_measurements) <= max_points else 'lines'
+
+    # Erstellen der Diagramme für Systolischen Druck, Diastolischen Druck und Puls
+    import plotly.graph_objs as go
+
+    fig = go.Figure()
+    x, y = downsample_series(times, systolic, max_points, keep=high_systolic | low_systolic)
+    fig.add_trace(go.Scattergl(x=x, y=y, mode=mode, name='Systolisch'))
+    x, y = downsample_series(times, diastolic, max_points, keep=high_diastolic | low_diastolic)
+    fig.add_trace(go.Scattergl(x=x, y=y, mode=mode, name='Diastolisch'))
+    x, y = downsample_series(times, user_measurements['pulse'], max_points)
+    fig.add_trace(go.Scattergl(x=x, y=y, mode=mode, name='Puls'))
+
+    # Hinzufügen von roten und blauen Markierungen für alarmierende Werte, jeweils nur für den betroffenen Wert
+    fig.add_trace(go.Scattergl(x=times[high_systolic], y=systolic[high_systolic], mode='markers', name='Hoher Systolischer Wert', marker=dict(color='red', size=10)))
+    fig.add_trace(go.Scattergl(x=times[high_diastolic], y=diastolic[high_diastolic], mode='markers', name='Hoher Diastolischer Wert', marker=dict(color='red', size=10)))
+    fig.add_trace(go.Scattergl(x=times[low_systolic], y=systolic[low_systolic], mode='markers', name='Niedriger Systolischer Wert', marker=dict(color='blue', size=10)))
+    fig.add_trace(go.Scattergl(x=times[low_diastolic], y=diastolic[low_diastolic], mode='markers', name='Niedriger Diastolischer Wert', marker=dict(color='blue', size=10)))
+
+    # Diagramm Layout anpassen
+    fig.update_layout(title='Trendanalyse der Messwerte über die Zeit',
+                      xaxis_title='Datum und Uhrzeit',
+                      yaxis_title='Messwerte',
+                      legend_title='Messwerte',
+                      margin=dict(l=0, r=0, t=30, b=0))
+    return fig
+
+def pdf_table_style():
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    return TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0,0), (-1,0), 12),
+        ('BACKGROUND', (0,1), (-1,-1), colors.beige),
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('BOX', (0,0), (-1,-1), 2, colors.black),
+    ])
+
+def build_table_pdf(title, header, rows, col_widths, wrap_column=None):
+    # Gemeinsamer Aufbau der PDF-Berichte mit Titel und einer Tabelle
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph
+
+    pdf_buffer = BytesIO()
+    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = [Paragraph(title, styles['Title'])]
+    elements += table_flowables(header, rows, col_widths, wrap_column)
+    doc.build(elements)
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+def table_flowables(header, rows, col_widths, wrap_column=None):
+    # Lange Tabellen werden in Blöcke mit fester Spaltenbreite geteilt; jeder Block bricht bei Bedarf
+    # über die Seite um und wiederholt die Kopfzeile.
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import LongTable, Paragraph
+
+    styles = getSampleStyleSheet()
+    table_style = pdf_table_style()
+    elements = []
+    for start in range(0, max(len(rows), 1), PDF_ROWS_PER_TABLE):
+        chunk = rows[start:start + PDF_ROWS_PER_TABLE]
+        if wrap_column is not None:
+            # Lange Kommentare umbrechen statt über den Rand zu laufen (kurze bleiben einfacher Text, das ist schneller)
+            chunk = [row[:wrap_column] + [Paragraph(str(row[wrap_column]), styles['BodyText']) if len(str(row[wrap_column])) > PDF_WRAP_LENGTH else row[wrap_column]] + row[wrap_column + 1:] for row in chunk]
+        table = LongTable([header] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(table_style)
+        elements.append(table)
+    return elements
+
+def table_rows(data, columns):
+    # Zeilen für die PDF-Tabelle ohne iterrows; fehlende Werte als leerer Text
+    return data[columns].astype(object).fillna("").values.tolist()
+
+PDF_BUILDERS = {
+    "measurements": lambda data: create_measurement_pdf(data),
+    "medications": lambda data: create_medication_pdf(data),
+    "fitness": lambda data: create_fitness_pdf(data),
+}
+
+def rows_hash(data):
+    # Inhalts-Hash der Tabelle (Spalten und Werte), unabhängig vom Index
+    digest = hashlib.sha256(",".join(map(str, data.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(data.astype(str), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+@st.cache_data(max_entries=PDF_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_pdf_bytes(kind, content_hash, _data):
+    # _data wird von Streamlit nicht gehasht; der Cache-Schlüssel ist (kind, content_hash)
+    with span("pdf.build", kind):
+        return PDF_BUILDERS[kind](_data).getvalue()
+
+def lazy_pdf(kind, data):
+    # Für st.download_button: das PDF wird erst beim Klick erstellt und pro Inhalt nur einmal gebaut
+    content_hash = rows_hash(data)
+    return lambda: build_pdf_bytes(kind, content_hash, data)
+
+def create_measurement_pdf(measurement_data):
+    header = ["Datum", "Uhrzeit", "Systolisch", "Diastolisch", "Puls", "Kommentare"]
+    rows = table_rows(measurement_data, header)
+    return build_table_pdf("Messdaten Report", header, rows, [70, 50, 60, 60, 40, 188], wrap_column=5)
+
+
+#hier alles zu Messungen fertig
+
+#hier kommt Medi-Plan
+
+def back_to_home():
+    st.session_state['page'] = 'home_screen'
+    
+def add_medication(username, med_name, morgens, mittags, abends, nachts):
+    if 'medications' not in st.session_state:
+        st.session_state['medications'] = []
+
+    # Erstelle ein neues Medikament
+    new_medication = {
+        "username": username,
+        "med_name": med_name,
+        "morgens": morgens,
+        "mittags": mittags,
+        "abends": abends,
+        "nachts": nachts
+    }
+
+    # Überprüfen, ob dieses Medikament bereits existiert
+    status, _ = save_new_records("medications", [new_medication], 'medications')
+    if status == DUPLICATE:
+        st.warning("Dieses Medikament wurde bereits hinzugefügt.")
+    return status
+
+def save_medications_to_github(records):
+    medication_list = st.session_state['medications']
+    medication_df = pd.DataFrame(medication_list)
+    medication_df.to_csv(MEDICATION_DATA_FILE, index=False)
+    
+    # Nur die neuen Einträge anhängen, nicht die ganze Liste der Session
+    write_records_to_github("medications", records, "Update medication data")
+    st.success('Medication data updated on GitHub successfully!')
+
+def show_medication_plan():
+    display_logo()
+    display_logo(in_sidebar=True)
+    st.sidebar.title("Optionen")
+    option = st.sidebar.radio("", ["Neues Medikament hinzufügen", "Medikamentenplan anzeigen"])
+    if option == "Neues Medikament hinzufügen":
+        if st.button('Zurück zum Homebildschirm'):
+            back_to_home()
+        st.title('Medikamentenplan')
+        with st.form("medication_form"):
+            med_name = st.text_input("Medikament")
+            morgens = st.number_input("Morgens", step=1, min_value=0)
+            mittags = st.number_input("Mittags", step=1, min_value=0)
+            abends = st.number_input("Abends", step=1, min_value=0)
+            nachts = st.number_input("Nachts", step=1, min_value=0)
+            submit_button = st.form_submit_button("Medikament hinzufügen")
+        
+        if submit_button:
+            current_user = st.session_state.get('current_user')
+            if current_user is not None:
+                if add_medication(current_user, med_name, morgens, mittags, abends, nachts) == SAVED:
+                    st.success("Medikament erfolgreich hinzugefügt!")
+            else:
+                st.error("Sie sind nicht angemeldet. Bitte melden Sie sich an, um Medikamente hinzuzufügen.")
+        
+    elif option == "Medikamentenplan anzeigen":
+        if st.button('Zurück zum Homebildschirm'):
+            back_to_home()
+        show_medication_list()
+
+def load_medication_data():
+    current_user = st.session_state.get('current_user')
+    if current_user is None:
+        st.error("Sie sind nicht angemeldet. Bitte melden Sie sich an, um den Medikamentenplan anzuzeigen.")
+        return pd.DataFrame()
+
+    try:
+        # Duplikate werden schon beim Speichern abgewiesen (Dedup-Index)
+        return get_storage().load("medications", current_user)
+    except Exception as e:
+        st.error(f"Fehler beim Laden der Medikamentendaten: {str(e)}")
+        return pd.DataFrame()
+
+def show_medication_list():
+    st.title('Medikamentenplan')
+    
+    medication_data = load_medication_data()
+    
+    # Display the medication plan if data is available
+    if not medication_data.empty:
+        # Create a nicely styled table
+        st.write('<style>div.Widget.row-widget.stRadio > div{flex-direction:row;}</style>', unsafe_allow_html=True)
+        st.write('<style>div.Widget.row-widget.stRadio > div > label{padding:5px;}</style>', unsafe_allow_html=True)
+        
+        st.markdown("""
+            <style>
+            .med-table {
+                font-family: Arial, sans-serif;
+                border-collapse: collapse;
+                width: 100%;
+                box-shadow: 0 0 20px rgba(0, 0, 0, 0.15);
+                border-radius: 10px;
+                overflow: hidden;
+            }
+            .med-table td, .med-table th {
+                border: 1px solid #dddddd;
+                padding: 12px;
+                text-align: left;
+            }
+            .med-table tr:nth-child(even) {
+                background-color: #f2f2f2;
+            }
+            .med-table th {
+                background-color: #4CAF50;
+                color: white;
+            }
+            </style>
+            """, unsafe_allow_html=True)
+        
+        st.table(medication_data.style.set_table_attributes('class="med-table"'))
+        
+        # Check if there's medication data to generate a PDF
+        pdf_file = lazy_pdf("medications", medication_data)
+        st.download_button(label="Download Medikamentenplan PDF",
+                           data=pdf_file,
+                           file_name="medication_plan.pdf",
+                           mime='application/pdf')
+    else:
+        st.write("Es sind keine Medikamentenpläne vorhanden.")
+
+def create_medication_pdf(medication_data):
+    header = ["Medikament", "Morgens", "Mittags", "Abends", "Nachts"]
+    rows = table_rows(medication_data, ["med_name", "morgens", "mittags", "abends", "nachts"])
+    return build_table_pdf("Medikamentenplan", header, rows, [188, 70, 70, 70, 70])
+
+#hier kommt Fitness        
+def back_to_home():
+    st.session_state['page'] = 'home_screen'
+    
+def add_fitness_activity(username, datum, uhrzeit, dauer, intensitaet, art, kommentare):
+    if 'fitness_activities' not in st.session_state:
+        st.session_state['fitness_activities'] = []
+    
+    new_activity = {
+        'username': username,
+        'datum': datum.strftime('%Y-%m-%d'),
+        'uhrzeit': uhrzeit.strftime('%H:%M:%S'),
+        'dauer': dauer,
+        'intensitaet': intensitaet,
+        'art': art,
+        'kommentare': kommentare
+    }
+
+    # Überprüfen, ob diese Aktivität bereits existiert
+    status, _ = save_new_records("fitness", [new_activity], 'fitness_activities')
+    if status == DUPLICATE:
+        st.warning("Diese Aktivität wurde bereits hinzugefügt.")
+    return status
+
+def save_fitness_data_to_github(records):
+    fitness_list = st.session_state['fitness_activities']
+    fitness_df = pd.DataFrame(fitness_list)
+    fitness_df.to_csv(FITNESS_DATA_FILE, index=False)
+
+    # Nur die neuen Aktivitäten anhängen; Duplikate hat der Dedup-Index schon abgewiesen
+    write_records_to_github("fitness", records, "Update fitness data")
+    st.success('Fitnessdaten erfolgreich auf GitHub aktualisiert!')
+
+
+def load_fitness_data(start_date=None, end_date=None):
+    current_user = st.session_state.get('current_user')
+    try:
+        # Nur die Daten des aktuellen Benutzers (optional nur ein Datumsbereich)
+        # Duplikate werden schon beim Speichern abgewiesen (Dedup-Index)
+        return get_storage().load("fitness", current_user, start_date, end_date)
+    except Exception as e:
+        st.error(f"Fehler beim Laden der Fitnessdaten: {str(e)}")
+        return pd.DataFrame()
+
+def show_fitness():
+    display_logo()
+    display_logo(in_sidebar=True)
+    username = st.session_state.get('current_user')
+
+    if not username:
+        st.error("Bitte melden Sie sich an, um Fitnessdaten zu bearbeiten.")
+        return
+
+    if st.button("Zurück zum Homebildschirm"):
+        back_to_home()
+
+    st.title('Fitness')
+
+    st.sidebar.title("Optionen")
+    fitness_options = ["Aktivität hinzufügen", "History"]
+    choice = st.sidebar.radio("", fitness_options)
+
+    if choice == "Aktivität hinzufügen": 
+        with st.form("fitness_form"):
+            datum = st.date_input("Datum", datetime.now().date())  # Hier wird date.today() verwendet
+            uhrzeit = st.time_input("Uhrzeit", datetime.now().time())
+            dauer = st.text_input("Dauer")
+            intensitaet_options = ["Niedrig", "Moderat", "Hoch", "Sehr hoch"]
+            intensitaet = st.selectbox("Intensität", intensitaet_options)
+            art = st.text_input("Art")
+            kommentare = st.text_area("Kommentare")
+            submit_button = st.form_submit_button("Speichern")
+
+            if submit_button:
+                if add_fitness_activity(username, datum, uhrzeit, dauer, intensitaet, art, kommentare) == SAVED:
+                    st.success("Fitnessaktivität gespeichert!")
+
+    elif choice == "History":
+        show_fitness_history()
+
+@timed("Fitness History")
+def show_fitness_history():
+    st.title('Fitness History')
+    # Wie bei der Messhistorie: laden einmal pro Seitenaufruf, der Zeitraum ist ein Fragment
+    fitness_history_fragment(load_fitness_data())
+
+@st.fragment
+@timed("Fitness History (Zeitraum)")
+def fitness_history_fragment(fitness_data):
+    view, start_date, end_date = select_history_period()
+    st.write(f"Anzeigen der Fitnessaktivitäten vom {start_date} bis {end_date}")
+
+    df_week = build_history_table("fitness", fitness_data, start_date, end_date)
+
+    if not df_week.empty:
+
+        # DataFrame anzeigen
+        show_history_table(view, df_week)
+
+        # Code für den Download-Button
+        pdf_file = lazy_pdf("fitness", df_week)
+        st.download_button(
+            label="Download Fitnessdaten PDF",
+            data=pdf_file,
+            file_name="fitnessdaten.pdf",
+            mime='application/pdf'
+        )
+    else:
+        st.write("Keine Daten zum Herunterladen verfügbar.")
+
+def create_fitness_pdf(fitness_data):
+    header = ["Datum", "Uhrzeit", "Dauer", "Intensität", "Art", "Kommentare"]
+    rows = table_rows(fitness_data, ["Datum", "Uhrzeit", "Dauer", "Intensitaet", "Art", "Kommentare"])
+    return build_table_pdf("Fitness Report", header, rows, [70, 55, 50, 65, 80, 148], wrap_column=5)
+
+# Arztbericht: Messungen, Medikamente und Fitness in einem PDF
+
+REPORT_CHART_POINTS = 300  # so viele Punkte pro Linie im Diagramm des Berichts
+
+def load_report_data(username, start_date, end_date, storage=None):
+    # Lädt alle Daten für den Bericht direkt über das Backend (ohne Streamlit-Meldungen, auch im Worker-Prozess)
+    storage = storage or get_storage()
+    measurements = storage.load("measurements", username, start_date, end_date)
+    medications = storage.load("medications", username)
+    fitness = storage.load("fitness", username, start_date, end_date)
+    return measurements, medications, fitness
+
+def measurement_summary_rows(measurements):
+    # Kennzahlen für den Bericht: Anzahl, Mittelwert ± SD, Minimum und Maximum, morgens/abends
+    if 'datetime' in measurements.columns:
+        timestamps = measurements['datetime']
+    else:
+        timestamps = pd.to_datetime(measurements['datum'] + ' ' + measurements['uhrzeit'], format='ISO8601', errors='coerce')
+    morning = timestamps.dt.hour < 12
+    rows = []
+    for column, label in [('systolic', 'Systolisch'), ('diastolic', 'Diastolisch'), ('pulse', 'Puls')]:
+        values = pd.to_numeric(measurements[column], errors='coerce')
+        rows.append([
+            label,
+            int(values.count()),
+            f"{values.mean():.0f} ± {values.std():.0f}" if values.count() > 1 else f"{values.mean():.0f}",
+            f"{values.min():.0f}",
+            f"{values.max():.0f}",
+            f"{values[morning].mean():.0f}" if morning.any() else "-",
+            f"{values[~morning].mean():.0f}" if (~morning).any() else "-",
+        ])
+    systolic = pd.to_numeric(measurements['systolic'], errors='coerce')
+    diastolic = pd.to_numeric(measurements['diastolic'], errors='coerce')
+    extremes = int(((systolic >= 180) | (diastolic >= 110) | (systolic <= 90) | (diastolic <= 60)).sum())
+    return rows, timestamps, extremes
+
+def trend_drawing(timestamps, measurements, width=468, height=200):
+    # Trenddiagramm direkt mit ReportLab gezeichnet (kein Bild), Linien mit LTTB ausgedünnt
+    from reportlab.graphics.shapes import Drawing, String
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.lib import colors
+
+    drawing = Drawing(width, height)
+    order = np.argsort(timestamps.to_numpy(), kind='stable')
+    timestamps = timestamps.iloc[order]
+    origin = timestamps.iloc[0]
+    days = ((timestamps - origin).dt.total_seconds() / 86400).to_numpy()
+    lines = []
+    for column, color in [('systolic', colors.red), ('diastolic', colors.blue), ('pulse', colors.green)]:
+        values = pd.to_numeric(measurements[column].iloc[order], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        keep = lttb_indices(days[valid], values[valid], REPORT_CHART_POINTS)
+        lines.append((list(zip(days[valid][keep], values[valid][keep])), color))
+    plot = LinePlot()
+    plot.x, plot.y, plot.width, plot.height = 40, 30, width - 60, height - 50
+    plot.data = [points for points, _ in lines]
+    for index, (_, color) in enumerate(lines):
+        plot.lines[index].strokeColor = color
+    plot.xValueAxis.valueMin = 0
+    plot.xValueAxis.valueMax = max(days[-1], 1)
+    plot.xValueAxis.labelTextFormat = lambda value: (origin + timedelta(days=value)).strftime('%d.%m.%y')
+    drawing.add(plot)
+    for index, (label, color) in enumerate([('Systolisch', colors.red), ('Diastolisch', colors.blue), ('Puls', colors.green)]):
+        drawing.add(String(40 + index * 90, height - 12, label, fillColor=color, fontSize=9))
+    return drawing
+
+@traced("pdf.build", "report")
+def create_doctor_report(username, start_date, end_date, storage=None, display_name=None):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph
+
+    measurements, medications, fitness = load_report_data(username, start_date, end_date, storage)
+    pdf_buffer = BytesIO()
+    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = [
+        Paragraph("Arztbericht", styles['Title']),
+        Paragraph(f"Patient: {display_name or username}<br/>Zeitraum: {start_date} bis {end_date}", styles['Normal']),
+        Paragraph("Blutdruck", styles['Heading2']),
+    ]
+    if measurements.empty:
+        elements.append(Paragraph("Keine Messungen im gewählten Zeitraum.", styles['Normal']))
+    else:
+        summary, timestamps, extremes = measurement_summary_rows(measurements)
+        header = ["", "Anzahl", "Ø ± SD", "Min", "Max", "Ø morgens", "Ø abends"]
+        elements += table_flowables(header, summary, [70, 50, 78, 50, 50, 85, 85])
+        elements.append(Paragraph(f"Extremwerte (≥180/110 oder ≤90/60 mmHg): {extremes}", styles['Normal']))
+        elements.append(trend_drawing(timestamps, measurements))
+
+    elements.append(Paragraph("Medikamentenplan", styles['Heading2']))
+    if medications.empty:
+        elements.append(Paragraph("Keine Medikamente erfasst.", styles['Normal']))
+    else:
+        rows = table_rows(medications, ["med_name", "morgens", "mittags", "abends", "nachts"])
+        elements += table_flowables(["Medikament", "Morgens", "Mittags", "Abends", "Nachts"], rows, [188, 70, 70, 70, 70])
+
+    elements.append(Paragraph("Aktivitäten", styles['Heading2']))
+    if fitness.empty:
+        elements.append(Paragraph("Keine Aktivitäten im gewählten Zeitraum.", styles['Normal']))
+    else:
+        activities = build_history_table("fitness", fitness, start_date, end_date)
+        rows = table_rows(activities, ["Datum", "Uhrzeit", "Dauer", "Intensitaet", "Art", "Kommentare"])
+        elements += table_flowables(["Datum", "Uhrzeit", "Dauer", "Intensität", "Art", "Kommentare"], rows, [70, 55, 50, 65, 80, 148], wrap_column=5)
+
+    doc.build(elements)
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+def report_storage():
+    # Backend im Worker-Prozess: bei "local-first" nur die lokale Datenbank lesen. get_storage() würde
+    # in jedem Worker einen eigenen Abgleich-Thread mit GitHub starten
+    if get_setting("storage", "backend", "github") == "local-first":
+        return SQLiteStorage(get_setting("storage", "path", LOCAL_DB_FILE))
+    return get_storage()
+
+def generate_report_file(username, start_date, end_date, out_dir):
+    # Läuft im Worker-Prozess: Bericht erstellen und als Datei ablegen
+    path = os.path.join(out_dir, f"arztbericht_{quote(str(username), safe='')}_{start_date}_{end_date}.pdf")
+    with open(path, "wb") as file:
+        file.write(create_doctor_report(username, start_date, end_date, report_storage()).getvalue())
+    return path
+
+def generate_reports(usernames, start_date, end_date, out_dir, workers=None):
+    # Berichte für viele Patienten parallel in einem Prozess-Pool. Generator als Fortschritts-API:
+    # liefert pro fertigem Bericht (erledigt, gesamt, Benutzer, Pfad, Fehler).
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from multiprocessing import get_context
+
+    os.makedirs(out_dir, exist_ok=True)
+    usernames = list(usernames)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        futures = {pool.submit(generate_report_file, username, start_date, end_date, out_dir): username for username in usernames}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                yield done, len(usernames), futures[future], future.result(), None
+            except Exception as e:
+                yield done, len(usernames), futures[future], None, e
+
+def show_doctor_report():
+    display_logo()
+    current_user = st.session_state.get('current_user')
+    if not current_user:
+        st.error("Bitte melden Sie sich an, um einen Arztbericht zu erstellen.")
+        return
+    if st.button('Zurück zum Homebildschirm'):
+        back_to_home()
+    st.title('Arztbericht')
+    st.write("Messwerte, Medikamentenplan und Aktivitäten in einem PDF für das Gespräch mit Ihrem Arzt.")
+
+    user_profiles = st.session_state['users']
+    display_name = current_user
+    if current_user in user_profiles.index:
+        display_name = f"{user_profiles.at[current_user, 'vorname']} {user_profiles.at[current_user, 'name']}"
+    doctor_report_fragment(current_user, display_name)
+
+@st.fragment
+def doctor_report_fragment(current_user, display_name):
+    today = datetime.now().date()
+    start_date = st.date_input("Von", value=today - timedelta(days=30))
+    end_date = st.date_input("Bis", value=today)
+    st.download_button(
+        label="Download Arztbericht PDF",
+        data=lambda: create_doctor_report(current_user, start_date, end_date, display_name=display_name).getvalue(),
+        file_name=f"arztbericht_{start_date}_{end_date}.pdf",
+        mime='application/pdf'
+    )
+
+# Export aller Daten eines Benutzers: CSV (ZIP), JSON Lines oder FHIR R4. Die Daten werden blockweise
+# gelesen und als Bytes-Stücke erzeugt. Gleichbleibender Speicherbedarf nur mit SQLite und Parquet und nur,
+# wenn die Stücke direkt in eine Datei gehen (cardiocheck_admin.py export); das GitHub-Backend hat die
+# ganze Datei im Speicher, und der Download-Button in der App braucht den ganzen Export als bytes.
+
+EXPORT_ENTITIES = ["measurements", "fitness", "medications", "emergency_numbers"]
+EXPORT_FORMATS = {
+    "csv": {"label": "CSV (ZIP mit einer Datei pro Datenart)", "extension": "zip", "mime": "application/zip"},
+    "jsonl": {"label": "JSON Lines", "extension": "jsonl", "mime": "application/x-ndjson"},
+    "fhir": {"label": "FHIR R4 Bundle (Observation/MedicationStatement)", "extension": "json", "mime": "application/fhir+json"},
+}
+
+def iter_export_batches(entity, username, storage=None):
+    # Blöcke von Datensätzen; fehlende Werte als None, damit sie als null/leer exportiert werden
+    storage = storage or get_storage()
+    columns = ENTITIES[entity]["columns"]
+    for batch in storage.iter_batches(entity, username):
+        frame = pd.DataFrame(batch, columns=columns).astype(object)
+        yield frame.where(frame.notna(), None).to_dict('records')
+
+class StreamBuffer:
+    """Schreibziel für zipfile, das die geschriebenen Bytes stückweise wieder abgibt."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def export_csv_zip(username, storage=None):
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for entity in EXPORT_ENTITIES:
+            columns = ENTITIES[entity]["columns"]
+            with archive.open(f"{entity}.csv", "w", force_zip64=True) as member:
+                member.write(pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8"))
+                for batch in iter_export_batches(entity, username, storage):
+                    member.write(pd.DataFrame(batch, columns=columns).to_csv(index=False, header=False).encode("utf-8"))
+                    yield buffer.drain()
+    yield buffer.drain()
+
+def export_jsonl(username, storage=None):
+    # Eine Zeile pro Datensatz: {"entity": ..., "record": {...}}. Die Datenart steht neben dem Datensatz,
+    # nicht darin, sonst überschreibt eine gleichnamige Spalte (Notfallnummern haben "type") die Angabe
+    for entity in EXPORT_ENTITIES:
+        for batch in iter_export_batches(entity, username, storage):
+            yield "".join(json.dumps({"entity": entity, "record": record}, ensure_ascii=False) + "\n" for record in batch).encode("utf-8")
+
+def fhir_datetime(datum, uhrzeit):
+    # FHIR verlangt bei Uhrzeiten eine Zeitzone; gespeichert wird Ortszeit
+    return datetime.fromisoformat(f"{datum}T{str(uhrzeit)[:8]}").astimezone().isoformat()
+
+def fhir_quantity(value, unit, code):
+    return {"value": value, "unit": unit, "system": "http://unitsofmeasure.org", "code": code}
+
+def fhir_loinc(code, display):
+    return {"coding": [{"system": "http://loinc.org", "code": code, "display": display}]}
+
+FHIR_VITAL_SIGNS = [{"coding": [{"system": "http://terminology.hl7.org/CodeSystem/observation-category", "code": "vital-signs"}]}]
+FHIR_ACTIVITY = [{"coding": [{"system": "http://terminology.hl7.org/CodeSystem/observation-category", "code": "activity"}]}]
+FHIR_DOSAGE_TIMES = {"morgens": "MORN", "mittags": "NOON", "abends": "EVE", "nachts": "NIGHT"}
+
+def fhir_measurement(record, subject):
+    # Blutdruck als Panel mit systolisch/diastolisch, der Puls als eigene Observation
+    effective = fhir_datetime(record["datum"], record["uhrzeit"])
+    blood_pressure = {
+        "resourceType": "Observation",
+        "status": "final",
+        "category": FHIR_VITAL_SIGNS,
+        "code": fhir_loinc("85354-9", "Blood pressure panel with all children optional"),
+        "subject": subject,
+        "effectiveDateTime": effective,
+        "component": [
+            {"code": fhir_loinc("8480-6", "Systolic blood pressure"), "valueQuantity": fhir_quantity(record["systolic"], "mmHg", "mm[Hg]")},
+            {"code": fhir_loinc("8462-4", "Diastolic blood pressure"), "valueQuantity": fhir_quantity(record["diastolic"], "mmHg", "mm[Hg]")},
+        ],
+    }
+    if record.get("comments"):
+        blood_pressure["note"] = [{"text": str(record["comments"])}]
+    heart_rate = {
+        "resourceType": "Observation",
+        "status": "final",
+        "category": FHIR_VITAL_SIGNS,
+        "code": fhir_loinc("8867-4", "Heart rate"),
+        "subject": subject,
+        "effectiveDateTime": effective,
+        "valueQuantity": fhir_quantity(record["pulse"], "beats/minute", "/min"),
+    }
+    return [blood_pressure, heart_rate]
+
+def fhir_fitness(record, subject):
+    duration = pd.to_numeric(record["dauer"], errors='coerce')
+    observation = {
+        "resourceType": "Observation",
+        "status": "final",
+        "category": FHIR_ACTIVITY,
+        "code": {**fhir_loinc("55411-3", "Exercise duration"), "text": record["art"]},
+        "subject": subject,
+        "effectiveDateTime": fhir_datetime(record["datum"], record["uhrzeit"]),
+    }
+    if pd.notna(duration):
+        observation["valueQuantity"] = fhir_quantity(float(duration), "min", "min")
+    else:
+        observation["valueString"] = str(record["dauer"])
+    notes = [f"Intensität: {record['intensitaet']}"] if record.get("intensitaet") else []
+    if record.get("kommentare"):
+        notes.append(str(record["kommentare"]))
+    if notes:
+        observation["note"] = [{"text": text} for text in notes]
+    return [observation]
+
+def fhir_medication(record, subject):
+    dosage = []
+    for column, when in FHIR_DOSAGE_TIMES.items():
+        amount = pd.to_numeric(record.get(column), errors='coerce')
+        if pd.notna(amount) and amount > 0:
+            dosage.append({
+                "text": f"{amount:g} {column}",
+                "timing": {"repeat": {"when": [when]}},
+                "doseAndRate": [{"doseQuantity": {"value": float(amount)}}],
+            })
+    return [{
+        "resourceType": "MedicationStatement",
+        "status": "active",
+        "medicationCodeableConcept": {"text": record["med_name"]},
+        "subject": subject,
+        "dosage": dosage,
+    }]
+
+FHIR_BUILDERS = {"measurements": fhir_measurement, "fitness": fhir_fitness, "medications": fhir_medication}
+
+def export_fhir(username, storage=None):
+    # Bundle vom Typ "collection"; der Patient trägt die Notfallnummern als Kontakte
+    patient_url = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, f'cardiocheck:{username}')}"
+    subject = {"reference": patient_url}
+    contacts = [
+        {"relationship": [{"text": record["type"]}], "telecom": [{"system": "phone", "value": str(record["number"])}]}
+        for batch in iter_export_batches("emergency_numbers", username, storage) for record in batch
+    ]
+    patient = {"resourceType": "Patient", "identifier": [{"system": "urn:cardiocheck:username", "value": username}]}
+    if contacts:
+        patient["contact"] = contacts
+    header = {"resourceType": "Bundle", "type": "collection", "timestamp": datetime.now().astimezone().isoformat()}
+    yield (json.dumps(header, ensure_ascii=False)[:-1] + ', "entry": [').encode("utf-8")
+    yield json.dumps({"fullUrl": patient_url, "resource": patient}, ensure_ascii=False).encode("utf-8")
+    for entity, builder in FHIR_BUILDERS.items():
+        for batch in iter_export_batches(entity, username, storage):
+            entries = (
+                json.dumps({"fullUrl": f"urn:uuid:{uuid.uuid4()}", "resource": resource}, ensure_ascii=False)
+                for record in batch for resource in builder(record, subject)
+            )
+            yield "".join(", " + entry for entry in entries).encode("utf-8")
+    yield b"]}"
+
+EXPORT_WRITERS = {"csv": export_csv_zip, "jsonl": export_jsonl, "fhir": export_fhir}
+
+def export_stream(username, export_format, storage=None):
+    return EXPORT_WRITERS[export_format](username, storage)
+
+def export_file(username, export_format):
+    # Für st.download_button: Streamlit liest auch Datei-Objekte ganz in bytes ein, der Export liegt also
+    # vollständig im Speicher (bei GitHub zusätzlich zur Datei im Cache). Ohne Umweg über eine Datei gleich als bytes
+    return b"".join(export_stream(username, export_format))
+
+@st.fragment
+def show_data_export(username):
+    st.markdown("### Daten exportieren")
+    export_format = st.selectbox("Format", list(EXPORT_FORMATS), format_func=lambda key: EXPORT_FORMATS[key]["label"])
+    spec = EXPORT_FORMATS[export_format]
+    st.download_button(
+        label="Alle Daten herunterladen",
+        data=lambda: export_file(username, export_format),
+        file_name=f"cardiocheck_export_{datetime.now().strftime('%Y-%m-%d')}.{spec['extension']}",
+        mime=spec["mime"]
+    )
+
+# Notfallnummern
+def go_to_home():
+    st.session_state['page'] = 'home_screen'
+def initialize_emergency_numbers():
+    if 'emergency_numbers' not in st.session_state:
+        st.session_state['emergency_numbers'] = []
+def add_emergency_number(username, number_type, number):
+    # Initialisiere die Notfallnummern, wenn noch nicht geschehen
+    initialize_emergency_numbers()
+    existing_entries = st.session_state['emergency_numbers']
+    updated = False
+
+    # Update des bestehenden Eintrags, wenn vorhanden
+    for entry in existing_entries:
+        if entry['username'] == username and entry['type'] == number_type:
+            entry['number'] = number
+            updated = True
+            break
+
+    # Neuer Eintrag, wenn nicht vorhanden
+    if not updated:
+        new_entry = {"username": username, "type": number_type, "number": number}
+        existing_entries.append(new_entry)
+
+    # Aktualisiere den globalen Zustand
+    st.session_state['emergency_numbers'] = existing_entries
+    get_storage().save("emergency_numbers", [entry for entry in existing_entries if entry['username'] == username and entry['type'] == number_type])
+
+def save_emergency_numbers_to_github(entries):
+    emergency_df = pd.DataFrame(entries)
+    emergency_df.to_csv(EMERGENCY_NUMBERS_FILE, index=False)
+
+    # Bestehende Einträge anderer Benutzer behalten, gleiche (username, type) ersetzen
+    write_records_to_github("emergency_numbers", entries, "Update emergency numbers data")
+    st.success('Emergency numbers data updated on GitHub successfully!')
+
+def load_emergency_numbers():
+    current_user = st.session_state.get('current_user')
+    try:
+        data = get_storage().load("emergency_numbers", current_user)
+        st.session_state['emergency_numbers'] = data.to_dict('records')
+    except Exception as e:
+        st.error(f"Fehler beim Laden der Notfallnummern: {str(e)}")
+        st.session_state['emergency_numbers'] = []
+
+def show_emergency_numbers():
+    display_logo()
+    if st.button("Zurück zum Homebildschirm"):
+        go_to_home()
+
+    st.title('Meine Notfallnummern')
+    current_user = st.session_state.get('current_user')
+    if not current_user:
+        st.error("Sie müssen angemeldet sein, um Ihre Notfallnummern anzuzeigen.")
+        return
+
+    load_emergency_numbers()  # Stellen Sie sicher, dass dies am Anfang steht
+
+    # Anzeigen allgemeiner Notfallnummern
+    st.write("Allgemeine Notfallnummern:")
+    st.write("- Polizei: 117")
+    st.write("- Feuerwehr: 118")
+    st.write("- Krankenwagen: 114")
+    st.write("- Rega: 1414")
+    st.write("- Toxzentrum: 143")
+
+    # Laden und Anzeigen benutzerspezifischer Notfallnummern
+    emergency_data = st.session_state.get('emergency_numbers', [])
+    current_numbers = {entry['type']: entry['number'] for entry in emergency_data if entry.get('username') == current_user}
+
+    # Anzeigen der aktuellen Notfallnummern
+    if current_numbers:
+        for number_type, number in current_numbers.items():
+            st.write(f"- {number_type}: {number}")
+    else:
+        st.write("Keine Notfallnummern gespeichert.")
+
+    # Eingabe neuer Notfallnummern
+    with st.form("emergency_numbers_form"):
+        number_types = ['Hausarzt', 'Notfallkontakt']
+        inputs = {}
+        for number_type in number_types:
+            inputs[number_type] = st.text_input(f'{number_type}', value=current_numbers.get(number_type, ''))
+        submit_button = st.form_submit_button("Speichern")
+
+        if submit_button:
+            for number_type, number in inputs.items():
+                if number and (number != current_numbers.get(number_type)):
+                    add_emergency_number(current_user, number_type, number)
+            st.rerun()  # Neu laden der Seite zur Aktualisierung der angezeigten Daten
+
+#Info- Page
+def go_to_home():
+    st.session_state['page'] = 'home_screen'
+def setup_sidebar():
+    st.sidebar.title("Optionen")  # Titel nur einmal aufrufen
+    info_options = st.sidebar.radio("Kategorie auswählen", ["Blutdruck", "Bewegung und Blutdruck"])
+    return info_options
+
+def show_info_pages():
+    display_logo()
+    display_logo(in_sidebar=True)
+    info_options = setup_sidebar()
+
+    if st.button("Zurück zum Homebildschirm"):
+        go_to_home()
+
+    st.title('Gesundheitsinformationen')
+
+    # Funktion zum Lesen des Textes aus der Datei
+    def read_text_from_file(filename):
+        base_path = os.path.dirname(__file__)  # Basispfad für relative Pfade
+        filepath = os.path.join(base_path, filename)  # Pfad zur Datei
+        encodings = ['utf-8', 'ISO-8859-1']  # Verschiedene Zeichenformate ausprobieren
+        for encoding in encodings:
+            try:
+                with open(filepath, "r", encoding=encoding) as file:
+                    return file.read()
+            except FileNotFoundError as e:
+                st.error(f"Datei nicht gefunden: {filepath}")
+                raise e
+            except UnicodeDecodeError:
+                continue
+        st.error("Fehler beim Lesen der Datei. Bitte überprüfen Sie das Zeichenformat.")
+        return ""
+
+    blutdruck_info = read_text_from_file("blutdruck_info.txt")
+    bewegung_blutdruck_info = read_text_from_file("bewegung_blutdruck_info.txt")
+
+    if info_options == "Blutdruck":
+        st.markdown("### Informationen zum Blutdruck")
+        st.markdown(blutdruck_info)
+    elif info_options == "Bewegung und Blutdruck":
+        st.markdown("### Informationen zu Bewegung und Blutdruck")
+        st.markdown(bewegung_blutdruck_info)
+
+    elif st.session_state['page'] == 'infos':
+        show_info_pages()
+
+# Infotexte fertig
+
+# Messpunkte für Administratoren ([metrics] admins = ["benutzername", ...] in den Secrets)
+def is_metrics_admin():
+    return st.session_state.get('current_user') in get_setting("metrics", "admins", [])
+
+def show_metrics_page():
+    if not is_metrics_admin():
+        go_to_home()
+        return
+    if st.button("Zurück zum Homebildschirm"):
+        go_to_home()
+    st.title('Messpunkte')
+    metrics = get_span_metrics()
+    st.caption(f"Gemessen wird ein Anteil von {metrics.sample_rate:.0%} der Vorgänge, seit dem Start des Prozesses bzw. dem letzten Zurücksetzen.")
+    st.dataframe(metrics.summary(), hide_index=True)
+    st.subheader('Seiten und Fragmente')
+    st.dataframe(get_rerun_timings().summary(), hide_index=True)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Prometheus", metrics.prometheus(), file_name="cardiocheck_metrics.prom", mime="text/plain")
+    with col2:
+        st.download_button("JSON", metrics.to_json(), file_name="cardiocheck_metrics.json", mime="application/json")
+    with col3:
+        if st.button("Zurücksetzen"):
+            metrics.reset()
+
+# Display pages based on session state
+# (nur beim Start über "streamlit run", damit Hilfsskripte die Funktionen importieren können)
+if __name__ == "__main__":
+    initialize_session_state()
+    st.session_state['session_cookies'] = None  # pro Durchlauf höchstens einmal erzeugt, siehe session_cookies()
+    restore_session()
+    # Laufzeit des ganzen Durchlaufs; Teil-Reruns der Fragmente werden dort einzeln gemessen
+    with measure(f"Seite {st.session_state['page']}"):
+        if st.session_state['page'] == 'home':
+            show_home()
+        elif st.session_state['page'] == 'home_screen':
+            show_home_screen()
+        elif st.session_state['page'] == 'profile':
+            show_profile()
+        elif st.session_state['page'] == 'measurements':
+            show_measurement_options()
+        elif st.session_state['page'] == 'medication-plan':
+            show_medication_plan()
+        elif st.session_state['page'] == 'Fitness':
+            show_fitness()
+        elif st.session_state['page'] == 'emergency_numbers':
+            show_emergency_numbers()
+        elif st.session_state['page'] == 'infos':
+            show_info_pages()
+        elif st.session_state['page'] == 'metrics':
+            show_metrics_page()
+    show_stale_data_notice()
+    show_rerun_timings()
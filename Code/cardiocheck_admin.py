@@ -0,0 +1,270 @@
+"""Verwaltungsbefehle für CardioCheck, ausserhalb von Streamlit auszuführen.
+
+Die GitHub-Zugangsdaten werden wie in der App aus .streamlit/secrets.toml gelesen.
+
+    python cardiocheck_admin.py shard-data [--dry-run] [--entity measurements ...]
+    python cardiocheck_admin.py to-parquet [--db cardiocheck.db] [--parquet-dir cardiocheck_parquet]
+    python cardiocheck_admin.py rebuild-rollups [--source sqlite|parquet|github] [--db cardiocheck.db]
+    python cardiocheck_admin.py reports --start 2024-01-01 --end 2024-03-31 [--out berichte] [--user name ...] [--workers 4]
+    python cardiocheck_admin.py export --user name [--format csv|jsonl|fhir] [--out datei]
+    python cardiocheck_admin.py normalize-hashes [--dry-run]
+    python cardiocheck_admin.py dedupe-data
+    python cardiocheck_admin.py import-report [--budget 1.0] [--top 15]
+    python cardiocheck_admin.py sync
+"""
+import argparse
+import os
+import subprocess
+import sys
+from datetime import date
+from urllib.parse import unquote
+
+import pandas as pd
+from github import UnknownObjectException
+
+import Version_05_cardiocheck as app
+
+
+def shard_data(repo, entities, dry_run=False):
+    # Teilt die globalen CSV-Dateien in eine Datei pro Benutzer auf (measurements/<user>.csv usw.)
+    for entity in entities:
+        source = app.ENTITIES[entity]["file"]
+        try:
+            contents = repo.get_contents(source)
+        except UnknownObjectException:
+            print(f"{source}: nicht vorhanden, übersprungen")
+            continue
+        data = app.read_csv_file(repo, contents)
+        for username, rows in data.groupby('username', sort=True):
+            path = app.shard_file_path(entity, username)
+            print(f"{source} -> {path}: {len(rows)} Zeilen")
+            if dry_run:
+                continue
+            try:
+                shard = repo.get_contents(path)
+            except UnknownObjectException:
+                repo.create_file(path, f"Create {entity} shard for {username}", rows.to_csv(index=False))
+            else:
+                # Bei erneutem Lauf mit der bestehenden Datei zusammenführen
+                existing = app.read_csv_file(repo, shard)
+                merged = pd.concat([existing, rows], ignore_index=True).drop_duplicates()
+                repo.update_file(shard.path, f"Update {entity} shard for {username}", merged.to_csv(index=False), shard.sha)
+    if not dry_run:
+        print('Fertig. Für die App jetzt in secrets.toml [storage] layout = "sharded" setzen.')
+
+
+def convert_to_parquet(db_path, parquet_dir):
+    # Messungen und Fitness aus der SQLite-Datenbank in das Parquet-Format übernehmen
+    source = app.SQLiteStorage(db_path)
+    target = app.ParquetStorage(db_path, parquet_dir)
+    for entity in app.PARQUET_ENTITIES:
+        usernames = [row[0] for row in source.conn.execute(f"SELECT DISTINCT username FROM {entity}")]
+        for username in usernames:
+            records = source.load(entity, username).to_dict('records')
+            target.save(entity, records)
+            print(f"{entity}/{username}: {len(records)} Zeilen")
+    print('Fertig. Für die App jetzt in secrets.toml [storage] backend = "parquet" setzen.')
+
+
+def configured_source():
+    # Standardquelle ist das Backend, das auch die App verwendet (get_storage); "local-first" liest lokal
+    backend = app.get_setting("storage", "backend", "github")
+    return "sqlite" if backend == "local-first" else backend
+
+
+def load_all_measurements(source, db_path):
+    # Rohdaten aller Benutzer: aus der lokalen Datenbank, den Parquet-Dateien oder den CSV-Dateien auf GitHub
+    if source == "sqlite":
+        return pd.read_sql_query("SELECT * FROM measurements", app.SQLiteStorage(db_path).conn)
+    if source == "parquet":
+        # Ein Verzeichnis username=<name> pro Benutzer (Hive-Partitionierung, Namen URL-kodiert)
+        storage = app.ParquetStorage(db_path, app.get_setting("storage", "parquet_dir", app.PARQUET_DIR))
+        root = storage.dataset_dir("measurements")
+        usernames = [unquote(name.split("=", 1)[1]) for name in sorted(os.listdir(root))] if os.path.isdir(root) else []
+        frames = [storage.load("measurements", username)[app.MEASUREMENTS_DATA_COLUMNS] for username in usernames]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=app.MEASUREMENTS_DATA_COLUMNS)
+    repo = app.init_github()
+    try:
+        files = [repo.get_contents(app.MEASUREMENTS_DATA_FILE)]
+    except UnknownObjectException:
+        # Aufgeteilte Ablage: measurements/<user>.csv
+        files = [item for item in repo.get_contents("measurements") if item.path.endswith(".csv")]
+    frames = [app.read_csv_file(repo, item) for item in files]
+    return pd.concat(frames, ignore_index=True).drop_duplicates()
+
+
+def rebuild_rollups(source, db_path):
+    data = load_all_measurements(source, db_path)
+    rows = app.RollupStore(db_path).rebuild(data)
+    print(f"{len(data)} Messungen gelesen, {rows} Kennzahl-Zeilen geschrieben")
+
+
+def generate_reports(usernames, start_date, end_date, out_dir, workers):
+    # Arztberichte für mehrere Patienten parallel erstellen und den Fortschritt ausgeben
+    failed = 0
+    for done, total, username, path, error in app.generate_reports(usernames, start_date, end_date, out_dir, workers):
+        if error is None:
+            print(f"[{done}/{total}] {username}: {path}")
+        else:
+            failed += 1
+            print(f"[{done}/{total}] {username}: Fehler: {error}")
+    print(f"Fertig. {len(usernames) - failed} Berichte erstellt, {failed} Fehler.")
+
+
+def export_user(username, export_format, out_path):
+    # Der Export wird stückweise in die Datei geschrieben
+    out_path = out_path or f"cardiocheck_export_{username}.{app.EXPORT_FORMATS[export_format]['extension']}"
+    size = 0
+    with open(out_path, "wb") as file:
+        for chunk in app.export_stream(username, export_format):
+            file.write(chunk)
+            size += len(chunk)
+    print(f"{out_path}: {size} Bytes")
+
+
+def normalize_hashes(dry_run=False):
+    # Einmalige Umstellung: alle Passwort-Hashes in user_data.csv als reiner Text ("$2b$12$...")
+    profiles = app.load_user_profiles()
+    hashes = profiles['password_hash'].dropna()
+    normalized = hashes.map(app.normalize_password_hash)
+    changed = normalized[normalized != hashes]
+    print(f"{len(hashes)} Hashes, {len(changed)} im alten Format")
+    if dry_run or changed.empty:
+        return
+    profiles.loc[changed.index, 'password_hash'] = changed
+    if app.save_user_profiles_and_upload(profiles):
+        print("Fertig.")
+
+
+def dedupe_data():
+    # Alte Duplikate im konfigurierten Backend entfernen und Dedup-Index und Kennzahlen neu aufbauen lassen
+    storage = app.get_storage()
+    for entity, spec in app.ENTITIES.items():
+        if spec["dedup_key"]:
+            print(f"{entity}: {storage.deduplicate(entity)} Duplikate entfernt")
+    # Dedup-Schlüssel und Kennzahlen enthalten noch die Duplikate; beides wird beim nächsten Zugriff neu aufgebaut
+    app.get_dedup_index().clear()
+    app.get_rollups().clear()
+    print("Fertig.")
+
+
+def sync_now():
+    # Einen Abgleich des Backends "local-first" mit GitHub sofort ausführen statt auf den Hintergrund-Thread zu warten
+    storage = app.get_storage()
+    if not isinstance(storage, app.LocalFirstStorage):
+        print('Nur mit [storage] backend = "local-first".')
+        return 1
+    failed = 0
+    for path, result in storage.sync().items():
+        if "fehler" in result:
+            failed += 1
+            print(f"{path}: Fehler: {result['fehler']}")
+        else:
+            print(f"{path}: {result['hochgeladen']} hochgeladen, {result['heruntergeladen']} heruntergeladen, {result['konflikte']} Konflikte")
+    print(f"Fertig. {storage.pending_changes()} Änderungen warten noch.")
+    return 1 if failed else 0
+
+
+def parse_importtime(output):
+    # Zeilen von "python -X importtime": (Eigenzeit, Gesamtzeit, Einrückung, Modul), Zeiten in Mikrosekunden
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((int(self_time), int(cumulative), len(name) - len(name.lstrip()), name.strip()))
+    return entries
+
+
+def import_report(budget, top):
+    # Startzeit der App in einem frischen Prozess messen. streamlit ist im Server schon geladen und wird
+    # deshalb vorher importiert; gemessen wird nur, was diese Datei zusätzlich lädt.
+    script = ("import streamlit, sys; before = set(sys.modules); import Version_05_cardiocheck as app; "
+              "print(','.join(name for name in app.LAZY_MODULES if name in sys.modules and name not in before))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        print(result.stderr)
+        return 1
+    entries = parse_importtime(result.stderr)
+    app_index = next(index for index, entry in enumerate(entries) if entry[3] == "Version_05_cardiocheck")
+    total = entries[app_index][1] / 1e6
+    # Direkte Importe der App: Einträge eine Ebene tiefer, zwischen dem vorherigen Modul der obersten Ebene und der App
+    start = max(index for index, entry in enumerate(entries[:app_index]) if entry[2] == 1) + 1
+    direct = [entry for entry in entries[start:app_index] if entry[2] == 3]
+    print(f"{'Modul':40} {'gesamt [ms]':>12} {'eigen [ms]':>11}")
+    for self_time, cumulative, _, name in sorted(direct, key=lambda entry: -entry[1])[:top]:
+        print(f"{name:40} {cumulative / 1000:12.1f} {self_time / 1000:11.1f}")
+    print(f"{'Version_05_cardiocheck':40} {total * 1000:12.1f}")
+    eager = [name for name in result.stdout.strip().split(",") if name]
+    if eager:
+        print(f"Beim Start geladen, sollte erst bei Bedarf kommen: {', '.join(eager)}")
+    ok = total <= budget and not eager
+    print(f"Budget {budget:.2f} s: {'eingehalten' if ok else 'überschritten'} ({total:.2f} s)")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verwaltungsbefehle für CardioCheck")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    shard_parser = commands.add_parser("shard-data", help="Globale CSV-Dateien in Dateien pro Benutzer aufteilen")
+    shard_parser.add_argument("--entity", action="append", choices=list(app.ENTITIES), help="Nur diese Datenart (mehrfach möglich)")
+    shard_parser.add_argument("--dry-run", action="store_true", help="Nur anzeigen, nichts schreiben")
+
+    parquet_parser = commands.add_parser("to-parquet", help="Messungen und Fitness aus SQLite ins Parquet-Format kopieren")
+    parquet_parser.add_argument("--db", default=app.LOCAL_DB_FILE, help="Pfad zur SQLite-Datenbank")
+    parquet_parser.add_argument("--parquet-dir", default=app.PARQUET_DIR, help="Zielverzeichnis")
+
+    rollup_parser = commands.add_parser("rebuild-rollups", help="Kennzahlen pro Tag, Woche und Monat neu berechnen")
+    rollup_parser.add_argument("--source", choices=["sqlite", "parquet", "github"], default=configured_source(),
+                               help="Woher die Rohdaten kommen (Standard: das eingestellte Backend der App)")
+    rollup_parser.add_argument("--db", default=app.get_setting("storage", "path", app.LOCAL_DB_FILE),
+                               help="Pfad zur SQLite-Datenbank, in der auch die Kennzahlen liegen")
+
+    report_parser = commands.add_parser("reports", help="Arztberichte (PDF) für mehrere Patienten erstellen")
+    report_parser.add_argument("--start", type=date.fromisoformat, required=True, help="Erster Tag (JJJJ-MM-TT)")
+    report_parser.add_argument("--end", type=date.fromisoformat, required=True, help="Letzter Tag (JJJJ-MM-TT)")
+    report_parser.add_argument("--out", default="berichte", help="Zielverzeichnis")
+    report_parser.add_argument("--user", action="append", help="Nur diese Benutzer (mehrfach möglich, Standard: alle)")
+    report_parser.add_argument("--workers", type=int, help="Anzahl Prozesse (Standard: Anzahl CPUs)")
+
+    export_parser = commands.add_parser("export", help="Alle Daten eines Benutzers exportieren")
+    export_parser.add_argument("--user", required=True, help="Benutzername")
+    export_parser.add_argument("--format", choices=list(app.EXPORT_FORMATS), default="csv", help="Exportformat")
+    export_parser.add_argument("--out", help="Zieldatei (Standard: cardiocheck_export_<user>.<endung>)")
+
+    hash_parser = commands.add_parser("normalize-hashes", help="Passwort-Hashes in user_data.csv vereinheitlichen")
+    hash_parser.add_argument("--dry-run", action="store_true", help="Nur zählen, nichts schreiben")
+
+    commands.add_parser("dedupe-data", help="Doppelte Messungen, Medikamente und Aktivitäten entfernen")
+
+    import_parser = commands.add_parser("import-report", help="Startzeit der App messen (Importzeiten pro Modul)")
+    import_parser.add_argument("--budget", type=float, default=app.STARTUP_BUDGET_SECONDS, help="Obergrenze in Sekunden")
+    import_parser.add_argument("--top", type=int, default=15, help="So viele Module anzeigen")
+
+    commands.add_parser("sync", help="Lokale Datenbank (local-first) jetzt mit GitHub abgleichen")
+
+    args = parser.parse_args()
+    if args.command == "shard-data":
+        shard_data(app.init_github(), args.entity or list(app.ENTITIES), args.dry_run)
+    elif args.command == "to-parquet":
+        convert_to_parquet(args.db, args.parquet_dir)
+    elif args.command == "rebuild-rollups":
+        rebuild_rollups(args.source, args.db)
+    elif args.command == "reports":
+        generate_reports(args.user or list(app.load_user_profiles().index), args.start, args.end, args.out, args.workers)
+    elif args.command == "export":
+        export_user(args.user, args.format, args.out)
+    elif args.command == "normalize-hashes":
+        normalize_hashes(args.dry_run)
+    elif args.command == "dedupe-data":
+        dedupe_data()
+    elif args.command == "import-report":
+        sys.exit(import_report(args.budget, args.top))
+    elif args.command == "sync":
+        sys.exit(sync_now())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""Benchmark der Datenpfade von CardioCheck mit synthetischen Daten.
+
+Erzeugt N Benutzer mit je M Messungen, Fitness-Aktivitäten und Medikamenten und misst Laden,
+Wochen-History, Trenddiagramm, PDFs und Speichern. GitHub wird durch eine Nachbildung der
+Contents-API im selben Prozess ersetzt (mit einstellbarer Latenz pro Anfrage); das echte
+Repository und die Dateien im Arbeitsverzeichnis werden nicht angefasst.
+
+    python cardiocheck_benchmark.py [--users 20] [--measurements 2000] [--fitness 500] [--medications 5]
+                                    [--latency-ms 50] [--repeat 5] [--layout single|sharded]
+                                    [--out ergebnis.json] [--baseline vorher.json] [--tolerance 0.25]
+    python cardiocheck_benchmark.py --writers 50 [--writes-per-writer 5] [--latency-ms 50]
+
+Das Ergebnis ist JSON (Median, P95 und Minimum in ms sowie GitHub-Anfragen pro Durchlauf).
+Mit --baseline endet der Befehl mit Exit-Code 1, wenn ein Median um mehr als --tolerance
+langsamer ist oder ein Pfad mehr GitHub-Anfragen braucht als in der Vergleichsdatei.
+
+Mit --writers läuft stattdessen ein Lasttest: so viele Sessions speichern gleichzeitig Messungen
+in dieselbe Datei. Fehlt danach ein Datensatz oder steht einer doppelt darin, ist der Exit-Code 1.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from github import GithubException, UnknownObjectException
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class FakeContentFile:
+    """Wie github.ContentFile: Pfad, SHA, Inhalt und bedingtes Neuladen über update().
+
+    Über 1 MB liefert die Contents-API wie auf GitHub keinen Inhalt (encoding "none").
+    """
+
+    def __init__(self, repo, path, content):
+        self.repo = repo
+        self.requester = repo
+        self.path = path
+        self.set_content(content)
+
+    def set_content(self, content):
+        self.content = content
+        self.sha = FakeGitHubRepo.blob_sha(content)
+        self.size = len(content)
+        self.encoding = "base64" if self.size <= self.repo.contents_limit else "none"
+
+    @property
+    def decoded_content(self):
+        # PyGithub prüft ebenfalls die Kodierung
+        assert self.encoding == "base64", f"unsupported encoding: {self.encoding}"
+        return self.content
+
+    def update(self):
+        # Entspricht der Anfrage mit If-None-Match: True nur, wenn sich die Datei geändert hat
+        content = self.repo.request("update", self.path)
+        if content is None or FakeGitHubRepo.blob_sha(content) == self.sha:
+            return False
+        self.set_content(content)
+        return True
+
+
+class FakeGitHubRepo:
+    """Die Teile von github.Repository, die die App für die CSV-Dateien nutzt, im Speicher."""
+
+    default_branch = "main"
+    url = "https://api.github.com/repos/benchmark/cardiocheck"
+    contents_limit = 1024 * 1024
+
+    def __init__(self, latency=0.0, rate_limit=None):
+        self.latency = latency
+        self.files = {}
+        self.requests = {}
+        self.conflicts = 0
+        self.lock = threading.Lock()
+        # Kontingent wie in den Headern X-RateLimit-*: (verbleibend, Limit), vor der ersten Antwort (-1, -1)
+        self.rate_limit = rate_limit
+        self.rate_limiting = (-1, -1)
+        self.rate_limiting_resettime = int(time.time()) + 3600
+
+    @property
+    def requester(self):
+        # Wie bei PyGithub liest die App das Kontingent über repo.requester
+        return self
+
+    def spend(self, kind):
+        # Aufruf mit gehaltenem Lock; ist das Kontingent aufgebraucht, antwortet GitHub mit 403
+        self.requests[kind] = self.requests.get(kind, 0) + 1
+        if self.rate_limit is None:
+            return
+        remaining = self.rate_limit - self.request_total()
+        self.rate_limiting = (max(remaining, 0), self.rate_limit)
+        if remaining < 0:
+            raise GithubException(403, {"message": "API rate limit exceeded"}, {})
+
+    @staticmethod
+    def blob_sha(content):
+        return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+    def request(self, kind, path):
+        # Jede Anfrage kostet die eingestellte Latenz und wird gezählt
+        time.sleep(self.latency)
+        with self.lock:
+            self.spend(kind)
+            return self.files.get(path)
+
+    def request_total(self):
+        return sum(self.requests.values())
+
+    def request_count(self):
+        with self.lock:
+            return self.request_total()
+
+    def get_contents(self, path, ref=None):
+        content = self.request("get", path)
+        if content is not None:
+            return FakeContentFile(self, path, content)
+        # Verzeichnis: wie GitHub nur die direkt darin liegenden Dateien ("" ist das Wurzelverzeichnis)
+        prefix = path.strip("/") + "/" if path.strip("/") else ""
+        with self.lock:
+            children = sorted(name for name in self.files if name.startswith(prefix) and "/" not in name[len(prefix):])
+        if not children:
+            raise UnknownObjectException(404, {"message": "Not Found"}, {})
+        return [FakeContentFile(self, name, self.files[name]) for name in children]
+
+    def iter_blob(self, sha, chunk_size):
+        # Git-Blob-API als Rohdaten-Stream (in der App iter_blob)
+        with self.lock:
+            content = next((content for content in self.files.values() if self.blob_sha(content) == sha), None)
+        self.request("blob", None)
+        if content is None:
+            raise UnknownObjectException(404, {"message": "Not Found"}, {})
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def write(self, kind, path, content, sha=None):
+        # Prüfen und Schreiben in einem Schritt, wie auf dem Server: 409 bei veralteter SHA,
+        # 422 beim Anlegen einer Datei, die es inzwischen gibt
+        time.sleep(self.latency)
+        content = content.encode("utf-8") if isinstance(content, str) else content
+        with self.lock:
+            self.spend(kind)
+            current = self.files.get(path)
+            if kind == "create" and current is not None:
+                self.conflicts += 1
+                raise GithubException(422, {"message": "Invalid request. \"sha\" wasn't supplied."}, {})
+            if kind == "update" and (current is None or self.blob_sha(current) != sha):
+                self.conflicts += 1
+                raise GithubException(409, {"message": f"{path} does not match {sha}"}, {})
+            self.files[path] = content
+        return {"content": FakeContentFile(self, path, content)}
+
+    def create_file(self, path, message, content):
+        return self.write("create", path, content)
+
+    def update_file(self, path, message, content, sha):
+        return self.write("update", path, content, sha)
+
+
+def generate_data(users, measurements, fitness, medications, seed=0):
+    # Synthetische Daten im Format der CSV-Dateien; Messungen zweimal täglich rückwärts ab heute
+    rng = np.random.default_rng(seed)
+    end = datetime.now().replace(minute=0, second=0, microsecond=0)
+    frames = {"measurements": [], "fitness": [], "medications": [], "emergency_numbers": []}
+    for index in range(users):
+        username = f"user{index:04d}"
+        stamps = (end - pd.to_timedelta(12 * np.arange(measurements), unit='h') - pd.to_timedelta(rng.integers(0, 60, measurements), unit='m'))[::-1]
+        frames["measurements"].append(pd.DataFrame({
+            "username": username,
+            "datum": stamps.strftime('%Y-%m-%d'),
+            "uhrzeit": stamps.strftime('%H:%M'),
+            "systolic": rng.normal(132, 14, measurements).round().astype(int),
+            "diastolic": rng.normal(84, 9, measurements).round().astype(int),
+            "pulse": rng.normal(72, 10, measurements).round().astype(int),
+            "comments": np.where(rng.random(measurements) < 0.1, "nach dem Sport", ""),
+        }))
+        stamps = (end.replace(hour=0) - pd.to_timedelta(np.arange(fitness), unit='D') + pd.to_timedelta(rng.integers(6, 20, fitness), unit='h'))[::-1]
+        frames["fitness"].append(pd.DataFrame({
+            "username": username,
+            "datum": stamps.strftime('%Y-%m-%d'),
+            "uhrzeit": stamps.strftime('%H:%M:%S'),
+            "dauer": rng.integers(10, 120, fitness).astype(str),
+            "intensitaet": rng.choice(["Niedrig", "Mittel", "Hoch"], fitness),
+            "art": rng.choice(["Laufen", "Velo", "Schwimmen", "Krafttraining"], fitness),
+            "kommentare": "",
+        }))
+        frames["medications"].append(pd.DataFrame({
+            "username": username,
+            "med_name": [f"Medikament {number}" for number in range(medications)],
+            "morgens": rng.integers(0, 2, medications),
+            "mittags": rng.integers(0, 2, medications),
+            "abends": rng.integers(0, 2, medications),
+            "nachts": 0,
+        }))
+        frames["emergency_numbers"].append(pd.DataFrame({
+            "username": username,
+            "type": ["Hausarzt", "Notfallkontakt"],
+            "number": ["044 000 00 00", "079 000 00 00"],
+        }))
+    return {entity: pd.concat(parts, ignore_index=True) for entity, parts in frames.items()}
+
+
+def upload_data(app, repo, data):
+    # Wie in der App: eine Datei pro Datenart oder, bei layout = "sharded", pro Benutzer
+    for entity, frame in data.items():
+        for path, rows in app.split_by_file(entity, frame[app.ENTITIES[entity]["columns"]]):
+            repo.files[path] = rows.to_csv(index=False).encode("utf-8")
+
+
+def measure_case(repo, name, function, repeat, setup=None):
+    # Ein Durchlauf zum Aufwärmen (Importe, Schriften von reportlab), der nicht gezählt wird
+    if setup is not None:
+        setup()
+    function()
+    durations = []
+    requests = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        before = repo.request_count()
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+        requests += repo.request_count() - before
+    durations = np.array(durations) * 1000
+    return {
+        "name": name,
+        "runs": repeat,
+        "median_ms": round(float(np.median(durations)), 2),
+        "p95_ms": round(float(np.percentile(durations, 95)), 2),
+        "min_ms": round(float(durations.min()), 2),
+        "github_requests": round(requests / repeat, 2),
+    }
+
+
+def run_benchmark(app, repo, data, repeat):
+    import streamlit as st
+
+    username = data["measurements"]["username"].iloc[0]
+    st.session_state['current_user'] = username
+    measurement_path = app.data_file_path("measurements", username)
+    cache = app.get_csv_cache()
+
+    measurements = app.load_measurement_data()
+    fitness = app.load_fitness_data()
+    last_day = pd.to_datetime(measurements['datum']).max().date()
+    week_start, week_end = app.get_start_end_dates_from_week_number(*last_day.isocalendar()[:2])
+    quarter_start, quarter_end = app.get_period_range("Quartal", last_day.year, (last_day.month - 1) // 3 + 1)
+    measurement_table = app.build_history_table("measurements", measurements, quarter_start, quarter_end)
+    fitness_table = app.build_history_table("fitness", fitness, quarter_start, quarter_end)
+    medications = app.get_storage().load("medications", username)
+
+    # Jeder Speicher-Durchlauf fügt einen neuen Datensatz an, wie ein Klick auf "Speichern"
+    counter = iter(range(10 ** 9))
+
+    def new_record(key, record):
+        st.session_state.setdefault(key, []).append(record)
+        return [record]
+
+    def new_measurement():
+        # save_measurements_to_github sendet die noch nicht hochgeladenen Einträge aus dem Session State
+        minute = next(counter)
+        new_record('measurements', {
+            "username": username, "datum": "2000-01-01", "uhrzeit": f"{minute // 60 % 24:02d}:{minute % 60:02d}",
+            "systolic": 120, "diastolic": 80, "pulse": 70, "comments": "Benchmark"})
+
+    def save_medication():
+        number = next(counter)
+        app.save_medications_to_github(new_record('medications', {
+            "username": username, "med_name": f"Benchmark {number}", "morgens": 1, "mittags": 0, "abends": 0, "nachts": 0}))
+
+    def save_fitness():
+        number = next(counter)
+        app.save_fitness_data_to_github(new_record('fitness_activities', {
+            "username": username, "datum": "2000-01-01", "uhrzeit": f"{number // 3600 % 24:02d}:{number // 60 % 60:02d}:{number % 60:02d}",
+            "dauer": "30", "intensitaet": "Mittel", "art": "Benchmark", "kommentare": ""}))
+
+    def save_emergency_number():
+        app.save_emergency_numbers_to_github([{"username": username, "type": "Hausarzt", "number": f"044 {next(counter):09d}"}])
+
+    cases = [
+        ("load_measurement_data (ohne Cache)", app.load_measurement_data, lambda: cache.invalidate(measurement_path)),
+        ("load_measurement_data (Cache)", app.load_measurement_data, None),
+        ("build_history_table Woche", lambda: app.build_history_table("measurements", measurements, week_start, week_end), None),
+        ("Trenddiagramm (build_trend_figure)", lambda: app.build_trend_figure(app.prepare_trend_data(measurements)), None),
+        ("create_measurement_pdf Quartal", lambda: app.create_measurement_pdf(measurement_table), None),
+        ("create_fitness_pdf Quartal", lambda: app.create_fitness_pdf(fitness_table), None),
+        ("create_medication_pdf", lambda: app.create_medication_pdf(medications), None),
+        ("save_measurements_to_github", app.save_measurements_to_github, new_measurement),
+        ("save_fitness_data_to_github", save_fitness, None),
+        ("save_medications_to_github", save_medication, None),
+        ("save_emergency_numbers_to_github", save_emergency_number, None),
+    ]
+    results = []
+    for name, function, setup in cases:
+        result = measure_case(repo, name, function, repeat, setup)
+        print(f"{name:<40} {result['median_ms']:>10.1f} ms  P95 {result['p95_ms']:>10.1f} ms  {result['github_requests']:>5.1f} Anfragen", file=sys.stderr)
+        results.append(result)
+    return results
+
+
+def run_load_test(app, repo, writers, writes_per_writer):
+    # Viele Sessions speichern gleichzeitig; danach muss jeder Datensatz genau einmal in der Datei stehen
+    barrier = threading.Barrier(writers)
+    latencies, failures = [], []
+
+    def writer(number):
+        username = f"writer{number:03d}"
+        barrier.wait()
+        for index in range(writes_per_writer):
+            record = {"username": username, "datum": "2000-01-01", "uhrzeit": f"{index // 60:02d}:{index % 60:02d}",
+                      "systolic": 120, "diastolic": 80, "pulse": 70, "comments": "Lasttest"}
+            started = time.perf_counter()
+            try:
+                app.write_records_to_github("measurements", [record], "Load test")
+            except Exception as e:
+                failures.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    stored = []
+    for path, content in repo.files.items():
+        if path.endswith(".csv") and path.split("/")[0] in ("measurements", app.MEASUREMENTS_DATA_FILE):
+            data = pd.read_csv(io.BytesIO(content))
+            stored.append(data[data['comments'] == "Lasttest"])
+    stored = pd.concat(stored, ignore_index=True)
+    counts = stored.groupby(['username', 'uhrzeit']).size()
+    expected = writers * writes_per_writer
+    latencies = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "writers": writers,
+        "writes": expected,
+        "stored": int(len(counts)),
+        "lost": int(expected - len(counts)),
+        "duplicates": int((counts - 1).sum()),
+        "failed": len(failures),
+        "conflicts": repo.conflicts,
+        "github_requests": dict(repo.requests),
+        "duration_s": round(duration, 2),
+        "median_ms": round(float(np.median(latencies)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "max_ms": round(float(latencies.max()), 2),
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    # Liefert die Pfade, die langsamer geworden sind oder mehr Anfragen an GitHub stellen
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        if result["median_ms"] > old["median_ms"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: {old['median_ms']} ms -> {result['median_ms']} ms")
+        if result["github_requests"] > old["github_requests"]:
+            regressions.append(f"{result['name']}: {old['github_requests']} -> {result['github_requests']} GitHub-Anfragen")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--measurements", type=int, default=2000, help="Messungen pro Benutzer")
+    parser.add_argument("--fitness", type=int, default=500, help="Fitness-Aktivitäten pro Benutzer")
+    parser.add_argument("--medications", type=int, default=5, help="Medikamente pro Benutzer")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latenz pro GitHub-Anfrage")
+    parser.add_argument("--repeat", type=int, default=5, help="Durchläufe pro Messung")
+    parser.add_argument("--layout", choices=["single", "sharded"], default="single")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Ergebnis als JSON in diese Datei statt auf die Standardausgabe")
+    parser.add_argument("--baseline", help="Früheres Ergebnis (JSON) zum Vergleich")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Erlaubte Verlangsamung des Medians, 0.25 = 25 %%")
+    parser.add_argument("--writers", type=int, help="Lasttest mit so vielen gleichzeitigen Sessions statt Benchmark")
+    parser.add_argument("--writes-per-writer", type=int, default=5, help="Lasttest: Messungen pro Session")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    out_path = os.path.abspath(args.out) if args.out else None
+
+    with tempfile.TemporaryDirectory(prefix="cardiocheck-benchmark-") as workdir:
+        # Eigene secrets.toml und lokale Dateien im temporären Verzeichnis; streamlit liest die Secrets
+        # relativ zum Arbeitsverzeichnis, daher wird die App erst danach importiert
+        os.makedirs(os.path.join(workdir, ".streamlit"))
+        with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as file:
+            file.write(f'[storage]\nbackend = "github"\nlayout = "{args.layout}"\npath = "{os.path.join(workdir, "cardiocheck.db")}"\n')
+        os.chdir(workdir)
+        sys.path.insert(0, APP_DIR)
+        from streamlit import config
+        from streamlit.logger import set_log_level
+
+        # Die Hinweise auf den Bare-Modus (ohne "streamlit run") würden die Ausgabe überdecken
+        config.set_option("logger.level", "error")
+        set_log_level("error")
+        import Version_05_cardiocheck as app
+
+        repo = FakeGitHubRepo()
+        # Mit denselben Hüllen wie in der App: Spans der GitHub-Anfragen, Kontingent und single-flight
+        wrapped = app.BudgetedRepo(app.InstrumentedRepo(repo), app.get_github_budget())
+        app.init_github = lambda: wrapped
+        app.iter_blob = lambda _, sha, chunk_size=app.GITHUB_STREAM_CHUNK_BYTES: repo.iter_blob(sha, chunk_size)
+        data = generate_data(args.users, args.measurements, args.fitness, args.medications, args.seed)
+        upload_data(app, repo, data)
+        repo.latency = args.latency_ms / 1000
+        if args.writers:
+            load_test = run_load_test(app, repo, args.writers, args.writes_per_writer)
+            print(f"{load_test['writes']} Messungen von {load_test['writers']} Sessions: {load_test['lost']} verloren, "
+                  f"{load_test['duplicates']} doppelt, {load_test['failed']} fehlgeschlagen, {load_test['conflicts']} Konflikte", file=sys.stderr)
+        else:
+            results = run_benchmark(app, repo, data, args.repeat)
+        spans = app.get_span_metrics().summary().to_dict('records')
+
+    report = {
+        "benchmark": "cardiocheck-load-test" if args.writers else "cardiocheck",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("out", "baseline")},
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "spans": spans,
+    }
+    if args.writers:
+        report["load_test"] = load_test
+    else:
+        report["results"] = results
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.writers:
+        if load_test["lost"] or load_test["duplicates"] or load_test["failed"]:
+            sys.exit(1)
+    elif baseline is not None:
+        if baseline.get("parameters") != report["parameters"]:
+            print("Hinweis: die Vergleichsdatei wurde mit anderen Parametern erstellt", file=sys.stderr)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"Langsamer: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
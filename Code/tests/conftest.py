@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Die App ist ein einzelnes Skript neben diesem Ordner, kein installiertes Paket
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+import Version_05_cardiocheck as app
+
+ROW = ["anna", "2024-03-01", "08:00", 120, 80, 60]
+
+
+def test_record_key_ignores_number_and_time_formatting():
+    key = app.record_key("measurements", ROW)
+
+    assert app.record_key("measurements", ["anna", "2024-03-01", "08:00:00", 120.0, "80", np.int64(60)]) == key
+    assert app.record_key("measurements", ["anna", "2024-03-01", "08:00", "120.0", 80.0, " 60 "]) == key
+    assert app.record_key("measurements", ["anna", "2024-03-01", "08:01", 120, 80, 60]) != key
+
+
+def test_text_columns_are_not_read_as_numbers():
+    assert app.canonical_value("number", "0441234567") != app.canonical_value("number", "441234567")
+    assert app.canonical_value("systolic", "0120") == app.canonical_value("systolic", 120)
+    assert app.canonical_value("comments", None) == app.canonical_value("comments", float("nan")) == ""
+
+
+def test_record_keys_match_record_key_for_a_frame():
+    data = pd.DataFrame([ROW, ["anna", "2024-03-02", "09:30", 118, 79, 64]], columns=app.ENTITIES["measurements"]["dedup_key"])
+
+    assert app.record_keys("measurements", data).tolist() == [app.record_key("measurements", row) for row in data.values.tolist()]
+
+
+def test_dedup_index_rejects_the_same_measurement_in_another_format(tmp_path, monkeypatch):
+    storage = app.SQLiteStorage(str(tmp_path / "dedup.db"))
+    storage.save("measurements", [dict(zip(app.MEASUREMENTS_DATA_COLUMNS, ROW + [""]))])
+    monkeypatch.setattr(app, "get_storage", lambda: storage)
+    index = app.DedupIndex(str(tmp_path / "dedup.db"))
+
+    same = {"username": "anna", "datum": "2024-03-01", "uhrzeit": "08:00:00", "systolic": "120", "diastolic": 80.0, "pulse": 60, "comments": "x"}
+    other = dict(same, uhrzeit="18:00")
+
+    assert index.add("measurements", [same, other]) == [other]
+    assert index.add("measurements", [other]) == []
+    # Nach einem fehlgeschlagenen Speichern ist der Datensatz wieder frei
+    index.discard("measurements", [other])
+    assert index.add("measurements", [other]) == [other]
@@ -0,0 +1,24 @@
+import json
+
+import Version_05_cardiocheck as app
+
+
+def test_jsonl_lines_keep_their_entity(tmp_path):
+    storage = app.SQLiteStorage(str(tmp_path / "export.db"))
+    storage.save("measurements", [{"username": "anna", "datum": "2024-03-01", "uhrzeit": "08:00", "systolic": 120,
+                                   "diastolic": 80, "pulse": 60, "comments": ""}])
+    storage.save("fitness", [{"username": "anna", "datum": "2024-03-01", "uhrzeit": "18:00", "dauer": "30",
+                              "intensitaet": "mittel", "art": "Laufen", "kommentare": ""}])
+    storage.save("medications", [{"username": "anna", "med_name": "Ramipril", "morgens": 1, "mittags": 0, "abends": 0, "nachts": 0}])
+    # Notfallnummern haben eine eigene Spalte "type"; sie darf die Datenart nicht überschreiben
+    storage.save("emergency_numbers", [{"username": "anna", "type": "Hausarzt", "number": "0441234567"}])
+
+    lines = b"".join(app.export_jsonl("anna", storage)).decode("utf-8").splitlines()
+    entries = [json.loads(line) for line in lines]
+
+    assert [entry["entity"] for entry in entries] == app.EXPORT_ENTITIES
+    for entry in entries:
+        assert set(entry["record"]) == set(app.ENTITIES[entry["entity"]]["columns"])
+    contact = entries[-1]["record"]
+    assert contact["type"] == "Hausarzt"
+    assert contact["number"] == "0441234567"
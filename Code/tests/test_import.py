@@ -0,0 +1,54 @@
+import io
+
+import Version_05_cardiocheck as app
+
+
+def import_csv(text, known_keys=()):
+    return app.prepare_import(io.BytesIO(text.encode("utf-8")), "export.csv", "anna", known_keys)
+
+
+def test_german_export_with_semicolons():
+    data, stats = import_csv("Datum;Uhrzeit;SYS;DIA;Puls;Notiz\n"
+                             "03.02.2024;07:45;135;85;70;nach dem Aufstehen\n"
+                             "04.02.2024;19:10;128 mmHg;82;66;\n")
+
+    assert stats == {"gelesen": 2, "unplausibel": 0, "doppelt": 0, "neu": 2}
+    assert data[["datum", "uhrzeit", "systolic", "diastolic", "pulse"]].values.tolist() == [
+        ["2024-02-03", "07:45", 135, 85, 70],
+        ["2024-02-04", "19:10", 128, 82, 66],
+    ]
+    assert data["comments"].tolist() == ["nach dem Aufstehen", ""]
+
+
+def test_twelve_hour_times():
+    times = app.parse_import_times(app.pd.Series(["8:05 PM", "12:30 AM", "12:15 pm", "08:05:00Z", "25:00", ""]))
+
+    assert times.tolist()[:4] == ["20:05", "00:30", "12:15", "08:05"]
+    assert times.iloc[4:].isna().all()
+
+
+def test_date_format_with_most_valid_values_wins():
+    # 13/02 passt nur zu TT/MM/JJJJ, also werden auch die mehrdeutigen Werte so gelesen
+    dates = app.parse_import_dates(app.pd.Series(["01/02/2024", "13/02/2024", "05/03/2024"]))
+
+    assert dates.dt.strftime("%Y-%m-%d").tolist() == ["2024-02-01", "2024-02-13", "2024-03-05"]
+
+
+def test_combined_timestamp_column_and_rejected_rows():
+    data, stats = import_csv("Date/Time,Systolic,Diastolic,Pulse\n"
+                             "2024-01-05 08:00,120,80,60\n"
+                             "2024-01-05 09:00,80,120,60\n"    # diastolisch über systolisch
+                             "2024-01-05 10:00,300,80,60\n"    # ausserhalb der Grenzen
+                             "2024-01-05 08:00,120.0,80,60\n")  # Duplikat in der Datei
+
+    assert stats == {"gelesen": 4, "unplausibel": 2, "doppelt": 1, "neu": 1}
+    assert data[["datum", "uhrzeit"]].values.tolist() == [["2024-01-05", "08:00"]]
+
+
+def test_known_measurements_are_skipped():
+    existing = app.record_key("measurements", ["anna", "2024-01-05", "08:00:00", 120.0, 80.0, 60.0])
+
+    data, stats = import_csv("Datum,Uhrzeit,Sys,Dia,Puls\n05.01.2024,08:00,120,80,60\n", known_keys=[existing])
+
+    assert data.empty
+    assert stats["doppelt"] == 1
@@ -0,0 +1,38 @@
+import Version_05_cardiocheck as app
+
+
+def measurement(datum, systolic):
+    return {"username": "anna", "datum": datum, "uhrzeit": "08:00", "systolic": systolic, "diastolic": 80, "pulse": 60, "comments": ""}
+
+
+def test_local_add_and_remote_delete_both_survive_the_merge():
+    kept, deleted = measurement("2024-03-01", 120), measurement("2024-03-02", 125)
+    added = measurement("2024-03-03", 130)
+    base = [kept, deleted]
+    local = [kept, deleted, added]   # lokal neu erfasst
+    remote = [kept]                  # auf GitHub in der Zwischenzeit gelöscht
+
+    merged, conflicts = app.merge_records("measurements", base, local, remote)
+
+    assert conflicts == 0
+    assert sorted(record["datum"] for record in merged) == ["2024-03-01", "2024-03-03"]
+
+
+def test_local_edit_wins_over_remote_delete():
+    base = [{"username": "anna", "type": "Hausarzt", "number": "0441234567"}]
+    local = [{"username": "anna", "type": "Hausarzt", "number": "0447654321"}]
+
+    merged, conflicts = app.merge_records("emergency_numbers", base, local, [])
+
+    assert conflicts == 1
+    assert merged == local
+
+
+def test_remote_edit_is_taken_when_local_is_unchanged():
+    base = [{"username": "anna", "type": "Hausarzt", "number": "0441234567"}]
+    remote = [{"username": "anna", "type": "Hausarzt", "number": "0447654321"}]
+
+    merged, conflicts = app.merge_records("emergency_numbers", base, base, remote)
+
+    assert conflicts == 0
+    assert merged == remote
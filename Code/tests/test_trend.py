@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+import Version_05_cardiocheck as app
+
+
+def test_lttb_keeps_first_and_last_point():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+
+    indices = app.lttb_indices(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_spikes():
+    x = np.arange(1000, dtype=float)
+    y = np.full(1000, 120.0)
+    y[400], y[700] = 210.0, 70.0
+
+    indices = app.lttb_indices(x, y, 50)
+
+    assert {400, 700} <= set(indices.tolist())
+
+
+def test_lttb_returns_everything_below_the_threshold():
+    x = np.arange(10, dtype=float)
+
+    assert app.lttb_indices(x, x, 50).tolist() == list(range(10))
+
+
+def test_downsample_series_keeps_marked_extremes():
+    times = pd.Series(pd.date_range("2024-01-01", periods=2000, freq="h"))
+    values = pd.Series(np.random.default_rng(1).normal(130, 5, 2000)).round()
+    values.iloc[1234] = 240
+    values.iloc[10] = np.nan
+
+    kept_times, kept_values = app.downsample_series(times, values, 100, keep=values >= 180)
+
+    assert 240 in kept_values.tolist()
+    assert kept_times.iloc[0] == times.iloc[0] and kept_times.iloc[-1] == times.iloc[-1]
+    assert kept_values.notna().all()